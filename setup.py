@@ -38,6 +38,11 @@ setup(
     install_requires=REQUIRES,
     python_requires=">=3.6",
     package_dir={'': 'src'},
+    entry_points={
+        "console_scripts": [
+            "tango-embed = tango_python_sdk.cli:main",
+        ]
+    },
     project_urls={
         "Bug Reports": 'https://github.com/prividentity/tango-python-sdk',
         "Source": 'https://github.com/prividentity/tango-python-sdk',
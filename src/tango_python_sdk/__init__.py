@@ -0,0 +1,27 @@
+import importlib
+
+# Public API, imported from their submodules on first access so `import tango_python_sdk` stays cheap
+_LAZY_ATTRIBUTES = {
+    "FaceFactor": ".factor",
+    "AsyncFaceFactor": ".async_factor",
+    "FaceGallery": ".gallery",
+    "MappedFaceGallery": ".mapped_gallery",
+    "ProcessFaceEngine": ".process_engine",
+    "EmbeddingCache": ".helper.cache",
+    "metrics": ".helper.metrics",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,331 @@
+import os
+import threading
+import traceback
+from typing import Hashable, Iterable
+
+import numpy as np
+
+from .factor_modules.FaceModule import Face
+from .helper import distance as distance_utils
+from .helper.metrics import STAGE_DISTANCE, metrics
+from .helper.result_objects.IdentifyResult import IdentifyResult
+
+# Rows processed at a time when assigning points to centroids
+_ASSIGN_BLOCK = 16384
+# Default cap on the number of rows used to train the coarse and product quantizers
+_MAX_TRAIN_ROWS = 262144
+# Rows copied at a time when writing the re-ranking store
+_STORE_BLOCK = 65536
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Lloyd's k-means with random initialization. Empty clusters are re-seeded from random rows.
+
+    Returns
+    -------
+    np.ndarray
+        float32 centroids of shape (k, D).
+    """
+    data = distance_utils.as_embedding_matrix(data)
+    if data.shape[0] < k:
+        raise ValueError(f"Need at least {k} training rows, got {data.shape[0]}")
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(data.shape[0], k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = assign(data, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        # Per-cluster sums by sorting rows by cluster and reducing each run
+        order = np.argsort(assignment, kind="stable")
+        present = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts[present])[:-1]])
+        sums = np.add.reduceat(data[order], starts, axis=0, dtype=np.float64)
+        centroids[present] = (sums / counts[present, None]).astype(np.float32)
+        empty = counts == 0
+        if empty.any():
+            centroids[empty] = data[rng.choice(data.shape[0], int(empty.sum()), replace=False)]
+    return centroids
+
+
+def assign(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid of every row, computed in blocks."""
+    assignment = np.empty(data.shape[0], dtype=np.int64)
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    for start in range(0, data.shape[0], _ASSIGN_BLOCK):
+        block = data[start:start + _ASSIGN_BLOCK]
+        # ||x||^2 is the same for every centroid and does not change the argmin
+        scores = centroid_norms[None, :] - 2.0 * (block @ centroids.T)
+        assignment[start:start + _ASSIGN_BLOCK] = scores.argmin(axis=1)
+    return assignment
+
+
+class IVFPQIndex:
+    """
+    Approximate nearest-neighbour index for large 1:N galleries, in pure NumPy.
+
+    Embeddings are partitioned by a k-means coarse quantizer into `nlist` inverted lists (IVF); a search
+    only scans the `nprobe` lists closest to the probe. With `pq_subvectors` set, each embedding's
+    residual to its list centroid is also encoded by a product quantizer (PQ) into `pq_subvectors` bytes.
+    The probed lists are then scanned with one lookup table per query instead of full distances, and
+    the best `rerank` candidates are re-ranked with exact Euclidean distances on the float32 embeddings,
+    the metric used by `NativeMethods.get_distance`. Returned distances are exact and only recall is
+    approximate.
+
+    The float32 embeddings are kept in RAM unless `rerank_store` is given, in which case they are written
+    to that file and memory-mapped: PQ search reads only `rerank` of their rows per query, so the
+    resident memory is the codes (`pq_subvectors` + 4 bytes per row) plus the page cache. IVF-Flat scans
+    every probed row in full, so it is the faster choice when the embeddings fit in RAM, and PQ pays off
+    with a memory-mapped store or when the embedding length is large.
+
+    Rows are stored grouped by list, so the scan of a list reads contiguous memory.
+
+        Parameters
+        ----------
+        nlist : int, optional
+            Number of coarse partitions. Around sqrt(N) to 4 * sqrt(N) is typical.
+
+        pq_subvectors : int, optional
+            Number of PQ sub-vectors (bytes per code). Must divide the embedding length. None disables PQ:
+            probed lists are scanned exactly (IVF-Flat).
+
+        nprobe : int, optional
+            Default number of lists searched per query. Higher is slower and more accurate.
+
+        rerank : int, optional
+            Number of PQ candidates re-ranked exactly. Defaults to max(10 * k, 100).
+
+        rerank_store : str, optional
+            File holding the float32 embeddings as a memory map. They are kept in RAM when omitted.
+
+        Methods
+        -------
+        train
+        add
+        identify
+        search
+    """
+
+    def __init__(self, nlist: int = 1024, pq_subvectors: int = None, nprobe: int = 8, rerank: int = None,
+                 rerank_store: str = None):
+        if nlist < 1 or nprobe < 1:
+            raise ValueError("nlist and nprobe must be at least 1")
+        if pq_subvectors is not None and pq_subvectors < 1:
+            raise ValueError("pq_subvectors must be at least 1")
+        self.nlist = nlist
+        self.pq_subvectors = pq_subvectors
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.rerank_store = None if rerank_store is None else os.fspath(rerank_store)
+        self._centroids = None
+        self._codebooks = None
+        self._dimension = None
+        self._list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        self._lists = np.empty(0, dtype=np.int64)
+        self._embeddings = None
+        self._codes = None
+        # Per-row part of the PQ distance that does not depend on the query, see _encode
+        self._code_terms = None
+        self._ids = np.empty(0, dtype=object)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._ids.shape[0]
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def train(self, embeddings, iterations: int = 20, max_rows: int = _MAX_TRAIN_ROWS, seed: int = 0) -> None:
+        """
+        Learn the coarse centroids and, with PQ, the sub-vector codebooks from a representative sample.
+
+        Parameters
+        ----------
+        embeddings : np.ndarray
+            Training embeddings of shape (N, D), N >= nlist (and >= 256 with PQ).
+
+        iterations : int, optional
+            k-means iterations.
+
+        max_rows : int, optional
+            Train on a random subset of at most this many rows.
+        """
+        data = distance_utils.as_embedding_matrix(embeddings)
+        if self.pq_subvectors is not None and data.shape[1] % self.pq_subvectors:
+            raise ValueError("pq_subvectors must divide the embedding length")
+        rng = np.random.default_rng(seed)
+        if data.shape[0] > max_rows:
+            data = data[np.sort(rng.choice(data.shape[0], max_rows, replace=False))]
+
+        centroids = kmeans(data, self.nlist, iterations=iterations, seed=seed)
+        codebooks = None
+        if self.pq_subvectors is not None:
+            residuals = data - centroids[assign(data, centroids)]
+            width = data.shape[1] // self.pq_subvectors
+            codebooks = np.stack([
+                kmeans(np.ascontiguousarray(residuals[:, part * width:(part + 1) * width]), 256,
+                       iterations=iterations, seed=seed + part + 1)
+                for part in range(self.pq_subvectors)])
+        with self._lock:
+            self._centroids, self._codebooks, self._dimension = centroids, codebooks, data.shape[1]
+
+    def add(self, embedding_ids: Iterable[Hashable], embeddings) -> None:
+        """
+        Add embeddings to a trained index. Every call regroups all rows by list, so add in large batches.
+        """
+        if not self.is_trained:
+            raise RuntimeError("The index must be trained before adding embeddings")
+        embedding_ids = list(embedding_ids)
+        matrix = distance_utils.as_embedding_matrix(embeddings)
+        if matrix.shape[0] != len(embedding_ids):
+            raise ValueError("Number of ids does not match number of embeddings")
+        if matrix.shape[1] != self._dimension:
+            raise ValueError(f"Embedding length {matrix.shape[1]} does not match index dimension {self._dimension}")
+
+        lists = assign(matrix, self._centroids)
+        codes, code_terms = self._encode(matrix, lists) if self._codebooks is not None else (None, None)
+        new_ids = np.empty(len(embedding_ids), dtype=object)
+        new_ids[:] = embedding_ids
+        with self._lock:
+            previous = self._embeddings
+            if previous is not None:
+                lists = np.concatenate([self._lists, lists])
+                new_ids = np.concatenate([self._ids, new_ids])
+                if codes is not None:
+                    codes = np.concatenate([self._codes, codes])
+                    code_terms = np.concatenate([self._code_terms, code_terms])
+            order = np.argsort(lists, kind="stable")
+            self._embeddings = self._store_rows(previous, matrix, order)
+            self._lists = lists[order]
+            self._ids = new_ids[order]
+            self._codes = None if codes is None else np.ascontiguousarray(codes[order])
+            self._code_terms = None if code_terms is None else code_terms[order]
+            self._list_offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self._lists, minlength=self.nlist), out=self._list_offsets[1:])
+
+    def _store_rows(self, previous, matrix: np.ndarray, order: np.ndarray) -> np.ndarray:
+        # Rows of [previous; matrix] in the given order, in RAM or in the memory-mapped store
+        previous_count = 0 if previous is None else previous.shape[0]
+        if self.rerank_store is None:
+            combined = matrix if previous is None else np.concatenate([previous, matrix])
+            return np.ascontiguousarray(combined[order])
+        tmp_path = self.rerank_store + ".tmp"
+        store = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(order.shape[0], self._dimension))
+        for start in range(0, order.shape[0], _STORE_BLOCK):
+            rows = order[start:start + _STORE_BLOCK]
+            from_previous = rows < previous_count
+            block = np.empty((rows.shape[0], self._dimension), dtype=np.float32)
+            if previous_count:
+                block[from_previous] = previous[rows[from_previous]]
+            block[~from_previous] = matrix[rows[~from_previous] - previous_count]
+            store[start:start + rows.shape[0]] = block
+        store.flush()
+        del store
+        os.replace(tmp_path, self.rerank_store)
+        return np.memmap(self.rerank_store, dtype=np.float32, mode="r", shape=(order.shape[0], self._dimension))
+
+    def _encode(self, matrix: np.ndarray, lists: np.ndarray):
+        """
+        PQ codes of the residuals, and for every row the query-independent part of its ADC distance.
+
+        With c the list centroid and r the reconstructed residual, ||q - c - r||^2 is
+        ||q - c||^2 + (||r||^2 + 2 c.r) - 2 q.r: the first term is the coarse distance, the second is
+        returned here, and the last is one lookup table per query shared by all lists.
+        """
+        centroids = self._centroids[lists]
+        residuals = matrix - centroids
+        width = self._dimension // self.pq_subvectors
+        codes = np.empty((matrix.shape[0], self.pq_subvectors), dtype=np.uint8)
+        terms = np.zeros(matrix.shape[0], dtype=np.float32)
+        for part in range(self.pq_subvectors):
+            columns = slice(part * width, (part + 1) * width)
+            codes[:, part] = assign(np.ascontiguousarray(residuals[:, columns]), self._codebooks[part])
+            reconstructed = self._codebooks[part][codes[:, part]]
+            terms += np.einsum("ij,ij->i", reconstructed, reconstructed + 2.0 * centroids[:, columns])
+        return codes, terms
+
+    def search(self, embedding, k: int = 1, nprobe: int = None, rerank: int = None):
+        """
+        The (approximately) `k` nearest rows to a probe.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (ids, distances), closest first, with exact Euclidean distances.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        query = distance_utils.as_embedding_vector(embedding)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        with self._lock:
+            if self._embeddings is None:
+                return np.empty(0, dtype=object), np.empty(0, dtype=np.float32)
+            if query.shape[0] != self._dimension:
+                raise ValueError(f"Embedding length {query.shape[0]} does not match index dimension {self._dimension}")
+            centroids, offsets = self._centroids, self._list_offsets
+            embeddings, codes, code_terms, ids = self._embeddings, self._codes, self._code_terms, self._ids
+
+        with metrics.timed(STAGE_DISTANCE):
+            probed, coarse = distance_utils.select_top_k(distance_utils.get_distances(query, centroids), nprobe)
+            sizes = offsets[probed + 1] - offsets[probed]
+            if not sizes.any():
+                return np.empty(0, dtype=object), np.empty(0, dtype=np.float32)
+            candidates = np.concatenate([np.arange(offsets[index], offsets[index + 1]) for index in probed[sizes > 0]])
+
+            if codes is not None:
+                shortlist = rerank or self.rerank or max(10 * k, 100)
+                if shortlist < candidates.shape[0]:
+                    # One table for the query, one gather over the codes of every probed list
+                    table = -2.0 * np.einsum("pcw,pw->pc", self._codebooks, query.reshape(self.pq_subvectors, -1))
+                    flat_codes = codes[candidates] + (np.arange(self.pq_subvectors, dtype=np.intp) * 256)[None, :]
+                    approximate = table.ravel()[flat_codes].sum(axis=1)
+                    approximate += code_terms[candidates]
+                    approximate += np.repeat(coarse[sizes > 0] ** 2, sizes[sizes > 0])
+                    candidates = np.sort(candidates[np.argpartition(approximate, shortlist - 1)[:shortlist]])
+
+            # Exact re-ranking on the float32 embeddings
+            block = embeddings[candidates] - query
+            distances = np.sqrt(np.einsum("ij,ij->i", block, block))
+            selected, distances = distance_utils.select_top_k(distances, k)
+        return ids[candidates[selected]], distances
+
+    def identify(self, embedding, k: int = 1, threshold: float = None, nprobe: int = None) -> IdentifyResult:
+        """
+        Find the enrolled embeddings that match a probe, like `FaceGallery.identify` but approximate.
+
+        Parameters
+        ----------
+        embedding : np.ndarray or list
+            The probe embedding vector.
+
+        k : int, optional
+            Maximum number of matches to return.
+
+        threshold : float, optional
+            Distance threshold. Defaults to `Face.COMPARE_THRESHOLD`.
+
+        nprobe : int, optional
+            Lists to search. Defaults to the index's `nprobe`.
+
+        Returns
+        -------
+        IdentifyResult
+            - status: int [0 if successful, -1 if any error]
+            - message: str [Message from the operation]
+            - ids: list [Ids of the matches, closest first. Empty when nothing matches]
+            - distances: np.ndarray [Exact distances matching `ids`]
+        """
+        if threshold is None:
+            threshold = Face.COMPARE_THRESHOLD
+        try:
+            ids, distances = self.search(embedding, k=k, nprobe=nprobe)
+            matched = distances < threshold
+            return IdentifyResult(ids=ids[matched].tolist(), distances=distances[matched],
+                                  status=IdentifyResult.CALL_STATUS_SUCCESS, message="OK")
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return IdentifyResult(message="Error occurred while identifying embedding.")
@@ -0,0 +1,139 @@
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+
+import numpy as np
+
+from .factor import FaceFactor
+from .helper.result_objects.GetEmbeddingResult import GetEmbeddingResult
+from .helper.result_objects.compareResult import CompareResult
+from .helper.result_objects.GetDistanceResult import GetDistanceResult
+from .helper.utils import is_image_bytes
+
+# asyncio.get_running_loop is new in Python 3.7; inside a coroutine get_event_loop returns the same loop
+_get_running_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+
+
+class AsyncFaceFactor:
+    """
+    asyncio front end for FaceFactor.
+
+    Decoding and native inference run on a dedicated, bounded thread pool so the event loop is never
+    blocked. At most `max_concurrency` calls run at once; further calls wait without occupying a
+    thread. A cancelled call (for example through `asyncio.wait_for`) stops waiting immediately. If its
+    native work already started, that work finishes in the background and still counts towards the
+    concurrency limit until it does, so the limit holds even under cancellation.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            Size of the thread pool. Defaults to the number of CPUs.
+
+        max_concurrency : int, optional
+            Maximum number of calls running at once. Defaults to `max_workers`.
+
+        face_factor : FaceFactor, optional
+            The FaceFactor to wrap. Defaults to the process-wide instance.
+
+        Methods
+        -------
+        get_embedding
+        get_embeddings
+        get_distance
+        compare
+        close
+    """
+
+    def __init__(self, max_workers: int = None, max_concurrency: int = None, face_factor: FaceFactor = None):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_concurrency is None:
+            max_concurrency = max_workers
+        if max_workers < 1 or max_concurrency < 1:
+            raise ValueError("max_workers and max_concurrency must be at least 1")
+        self.face_factor = face_factor if face_factor is not None else FaceFactor()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tango-async")
+        self._max_concurrency = max_concurrency
+        # One semaphore per event loop: an asyncio.Semaphore is bound to the loop it is first used on
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._semaphores_lock = threading.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def get_embedding(self, image_path: str = None, image_data: np.ndarray = None, image_bytes=None) -> GetEmbeddingResult:
+        """
+        Awaitable `FaceFactor.get_embedding`.
+        """
+        return await self._run(self.face_factor.get_embedding, image_path=image_path, image_data=image_data, image_bytes=image_bytes)
+
+    async def get_embeddings(self, images: Iterable) -> List[GetEmbeddingResult]:
+        """
+        Embed several images concurrently, within the concurrency limit. Results are in input order.
+        """
+        return list(await asyncio.gather(*(self._get_embedding_for_image(image) for image in images)))
+
+    async def get_distance(self, embedding_one: np.ndarray, embedding_two: np.ndarray) -> GetDistanceResult:
+        """
+        Awaitable `FaceFactor.get_distance`.
+        """
+        return await self._run(self.face_factor.get_distance, embedding_one, embedding_two)
+
+    async def compare(self, image_path_1: str = None, image_data_1: np.ndarray = None,
+                      image_path_2: str = None, image_data_2: np.ndarray = None,
+                      image_bytes_1=None, image_bytes_2=None) -> CompareResult:
+        """
+        Awaitable `FaceFactor.compare`.
+        """
+        return await self._run(self.face_factor.compare,
+                               image_path_1=image_path_1, image_data_1=image_data_1,
+                               image_path_2=image_path_2, image_data_2=image_data_2,
+                               image_bytes_1=image_bytes_1, image_bytes_2=image_bytes_2)
+
+    def close(self, wait: bool = True) -> None:
+        """Shut down the thread pool."""
+        self._executor.shutdown(wait=wait)
+
+    async def _get_embedding_for_image(self, image) -> GetEmbeddingResult:
+        if isinstance(image, np.ndarray):
+            return await self.get_embedding(image_data=image)
+        if isinstance(image, (str, os.PathLike)):
+            return await self.get_embedding(image_path=os.fspath(image))
+        if is_image_bytes(image):
+            return await self.get_embedding(image_bytes=image)
+        return GetEmbeddingResult(message="Required image path, encoded image bytes or numpy array in RGB/RGBA/BGR format")
+
+    def _semaphore(self, loop) -> asyncio.Semaphore:
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self._max_concurrency)
+            return semaphore
+
+    async def _run(self, function, *args, **kwargs):
+        loop = _get_running_loop()
+        semaphore = self._semaphore(loop)
+        await semaphore.acquire()
+        try:
+            future = self._executor.submit(functools.partial(function, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                # The loop is already closed, nobody is left waiting on the semaphore
+                pass
+
+        # Released when the work is really done, not when the caller stops waiting
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future, loop=loop)
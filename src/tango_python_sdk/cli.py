@@ -0,0 +1,278 @@
+"""
+tango-embed: bulk-embed a directory or a manifest of images into a compact binary output.
+
+    tango-embed /data/photos --output /data/embeddings --workers 8
+    tango-embed manifest.txt --output /data/embeddings --shard 3/16
+
+The output directory holds:
+    embeddings.f32   (rows, dimension) little-endian float32 matrix, appended in input order
+    ids.txt          one id per line (UTF-8), row i of the matrix belongs to line i
+    failed.tsv       id, tab, message for every image that could not be embedded
+    checkpoint.json  progress; the job is complete when "complete" is true
+
+Progress is checkpointed after every chunk: rerunning the same command resumes after the last
+completed chunk. With --shard i/N only ids whose CRC-32 is i modulo N are processed, so N machines can
+split a job without coordination; give each shard its own output directory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import zlib
+from timeit import default_timer
+
+import numpy as np
+
+from .helper.pipeline import iter_image_paths
+
+EMBEDDINGS_FILE = "embeddings.f32"
+IDS_FILE = "ids.txt"
+FAILED_FILE = "failed.tsv"
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_VERSION = 1
+# ids.txt is one id per line and failed.tsv is tab-separated, so ids cannot contain these
+INVALID_ID_CHARACTERS = "\t\n\r"
+
+
+class CheckpointMismatch(Exception):
+    """The output directory belongs to a different job."""
+
+
+class InvalidInputId(ValueError):
+    """An input id contains a tab or a line break."""
+
+
+def read_inputs(source: str):
+    """
+    List `(id, path)` pairs. A directory is walked recursively and ids are paths relative to it; a
+    manifest file has one `path` or `id<TAB>path` per line.
+
+    Raises
+    ------
+    InvalidInputId
+        If an id contains a tab or a line break, which would shift every later id off its row.
+    """
+    if os.path.isdir(source):
+        inputs = [(os.path.relpath(path, source), path) for path in iter_image_paths(source)]
+    else:
+        inputs = []
+        # newline="\n" splits on \n only, so a lone \r stays inside its line and is rejected below
+        with open(source, encoding="utf-8", newline="\n") as fp:
+            for line in fp:
+                line = line[:-1] if line.endswith("\n") else line
+                line = line[:-1] if line.endswith("\r") else line
+                if not line:
+                    continue
+                embedding_id, _, path = line.partition("\t")
+                inputs.append((embedding_id, path or embedding_id))
+    invalid = [embedding_id for embedding_id, _ in inputs if any(char in embedding_id for char in INVALID_ID_CHARACTERS)]
+    if invalid:
+        raise InvalidInputId(f"{len(invalid)} input ids contain a tab or a line break, e.g. {invalid[0]!r}; "
+                             "rename the files or give them other ids in a manifest")
+    return inputs
+
+
+def parse_shard(value: str):
+    """Parse "i/N" into (i, N)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("--shard must look like i/N, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("--shard i/N needs 0 <= i < N")
+    return index, count
+
+
+def select_shard(inputs, shard):
+    """Inputs of shard (i, N): ids whose CRC-32 is i modulo N. Stable per id whatever else is listed."""
+    index, count = shard
+    if count == 1:
+        return inputs
+    return [item for item in inputs if zlib.crc32(item[0].encode("utf-8")) % count == index]
+
+
+def inputs_fingerprint(inputs) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for embedding_id, path in inputs:
+        digest.update(embedding_id.encode("utf-8") + b"\0" + path.encode("utf-8") + b"\n")
+    return digest.hexdigest()
+
+
+def load_embeddings(output_dir: str):
+    """
+    Open a tango-embed output directory.
+
+    Returns
+    -------
+    tuple
+        (ids, embeddings): a list of str and a read-only (rows, dimension) float32 memory map.
+    """
+    with open(os.path.join(output_dir, CHECKPOINT_FILE)) as fp:
+        checkpoint = json.load(fp)
+    rows, dimension = checkpoint["rows"], checkpoint["dimension"]
+    with open(os.path.join(output_dir, IDS_FILE), "rb") as fp:
+        # Split on "\n" only: str.splitlines would also break ids at \x1c, \x85, \u2028, ...
+        ids = fp.read(checkpoint["ids_bytes"]).decode("utf-8").split("\n")[:-1]
+    if rows == 0:
+        return ids, np.empty((0, dimension or 0), dtype=np.float32)
+    embeddings = np.memmap(os.path.join(output_dir, EMBEDDINGS_FILE), dtype="<f4", mode="r", shape=(rows, dimension))
+    return ids, embeddings
+
+
+def _single_line(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+class EmbeddingWriter:
+    """Appends embedding chunks to an output directory and checkpoints after each one."""
+
+    def __init__(self, output_dir: str, fingerprint: str, shard, total: int, restart: bool = False, max_side: int = None):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint = {
+            "version": CHECKPOINT_VERSION, "fingerprint": fingerprint, "shard": f"{shard[0]}/{shard[1]}",
+            "max_side": max_side,
+            "total": total, "processed": 0, "rows": 0, "failed": 0, "dimension": None,
+            "embeddings_bytes": 0, "ids_bytes": 0, "failed_bytes": 0, "complete": False,
+        }
+        checkpoint_path = self._path(CHECKPOINT_FILE)
+        if not restart and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as fp:
+                previous = json.load(fp)
+            if previous.get("fingerprint") != fingerprint or previous.get("shard") != self.checkpoint["shard"]:
+                raise CheckpointMismatch(f"{output_dir} holds a checkpoint for different inputs; "
+                                         "use another output directory or --restart")
+            # Rows decoded at another resolution would not be comparable with the ones already written
+            if previous.get("max_side") != max_side:
+                raise CheckpointMismatch(f"{output_dir} was started with --max-side {previous.get('max_side')}; "
+                                         "rerun with the same value, use another output directory or --restart")
+            self.checkpoint = previous
+
+        # Cut off anything written after the last checkpoint, e.g. by a crash in the middle of a chunk
+        self._files = {}
+        for name, size_key in ((EMBEDDINGS_FILE, "embeddings_bytes"), (IDS_FILE, "ids_bytes"), (FAILED_FILE, "failed_bytes")):
+            fp = open(self._path(name), "r+b" if os.path.exists(self._path(name)) else "w+b")
+            fp.truncate(self.checkpoint[size_key])
+            fp.seek(self.checkpoint[size_key])
+            self._files[name] = fp
+
+    @property
+    def processed(self) -> int:
+        return self.checkpoint["processed"]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def write_chunk(self, chunk, batch) -> None:
+        """Append the results of `chunk` (a list of (id, path)) and checkpoint."""
+        valid = batch.valid
+        if valid.any():
+            embeddings = batch.embeddings[valid]
+            if self.checkpoint["dimension"] is None:
+                self.checkpoint["dimension"] = int(embeddings.shape[1])
+            elif embeddings.shape[1] != self.checkpoint["dimension"]:
+                raise ValueError("Embedding length changed during the job")
+            self._files[EMBEDDINGS_FILE].write(np.ascontiguousarray(embeddings, dtype="<f4").tobytes())
+        ids = "".join(embedding_id + "\n" for (embedding_id, _), ok in zip(chunk, valid) if ok)
+        self._files[IDS_FILE].write(ids.encode("utf-8"))
+        failures = "".join(f"{chunk[index][0]}\t{_single_line(message)}\n" for index, message in sorted(batch.messages.items()))
+        self._files[FAILED_FILE].write(failures.encode("utf-8"))
+
+        for fp in self._files.values():
+            fp.flush()
+            os.fsync(fp.fileno())
+        self.checkpoint["processed"] += len(chunk)
+        self.checkpoint["rows"] += int(valid.sum())
+        self.checkpoint["failed"] += len(batch.messages)
+        self.checkpoint["embeddings_bytes"] = self._files[EMBEDDINGS_FILE].tell()
+        self.checkpoint["ids_bytes"] = self._files[IDS_FILE].tell()
+        self.checkpoint["failed_bytes"] = self._files[FAILED_FILE].tell()
+        self.checkpoint["complete"] = self.checkpoint["processed"] >= self.checkpoint["total"]
+        self._save_checkpoint()
+
+    def _save_checkpoint(self) -> None:
+        tmp_path = self._path(CHECKPOINT_FILE + ".tmp")
+        with open(tmp_path, "w") as fp:
+            json.dump(self.checkpoint, fp, indent=2)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, self._path(CHECKPOINT_FILE))
+
+    def close(self) -> None:
+        if self.checkpoint["processed"] >= self.checkpoint["total"] and not self.checkpoint["complete"]:
+            self.checkpoint["complete"] = True
+            self._save_checkpoint()
+        for fp in self._files.values():
+            fp.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="tango-embed", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Image directory, or manifest file with one path or id<TAB>path per line")
+    parser.add_argument("--output", "-o", required=True, help="Output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Decoding/inference threads")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Run inference in this many worker processes (ProcessFaceEngine) instead of threads")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Images per checkpoint")
+    parser.add_argument("--shard", type=parse_shard, default=(0, 1), help="Process shard i of N, e.g. 3/16")
+    parser.add_argument("--max-side", type=int, help="Decode large images at reduced resolution (decode_max_side)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--quiet", action="store_true", help="No progress output")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.chunk_size < 1 or args.processes < 0:
+        parser.error("--workers and --chunk-size must be at least 1, --processes at least 0")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        inputs = select_shard(read_inputs(args.source), args.shard)
+    except InvalidInputId as e:
+        print(f"tango-embed: {e}", file=sys.stderr)
+        return 2
+    try:
+        writer = EmbeddingWriter(args.output, inputs_fingerprint(inputs), args.shard, len(inputs), restart=args.restart,
+                                 max_side=args.max_side)
+    except CheckpointMismatch as e:
+        print(f"tango-embed: {e}", file=sys.stderr)
+        return 2
+
+    from .factor import FaceFactor
+
+    face_factor = FaceFactor()
+    face_factor.decode_max_side = args.max_side
+    engine = None
+    if args.processes:
+        from .process_engine import ProcessFaceEngine
+        engine = ProcessFaceEngine(workers=args.processes)
+        face_factor.set_inference_engine(engine)
+
+    start_time, done = default_timer(), 0
+    if writer.processed and not args.quiet:
+        print(f"tango-embed: resuming after {writer.processed} of {len(inputs)} images", file=sys.stderr)
+    try:
+        for start in range(writer.processed, len(inputs), args.chunk_size):
+            chunk = inputs[start:start + args.chunk_size]
+            batch = face_factor.get_embeddings_batch([path for _, path in chunk], max_workers=args.workers)
+            writer.write_chunk(chunk, batch)
+            done += len(chunk)
+            if not args.quiet:
+                rate = done / (default_timer() - start_time)
+                print(f"tango-embed: {writer.processed}/{len(inputs)} images, {writer.checkpoint['failed']} failed, "
+                      f"{rate:.1f} images/s", file=sys.stderr)
+    finally:
+        writer.close()
+        if engine is not None:
+            face_factor.set_inference_engine(None)
+            engine.close()
+
+    if not args.quiet:
+        print(f"tango-embed: done, {writer.checkpoint['rows']} embeddings in {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
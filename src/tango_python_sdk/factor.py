@@ -2,18 +2,34 @@ import os
 
 import platform
 import sys
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Tuple, Union
 
 import numpy as np
 
 from .factor_modules.FaceModule import Face
-from .helper.decorators import Singleton
+from .helper.decorators import Singleton, record_outcome
 from .helper.messages import Message
 
+from .helper.result_objects.BatchEmbeddingResult import BatchEmbeddingResult
 from .helper.result_objects.GetEmbeddingResult import GetEmbeddingResult
 from .helper.result_objects.compareResult import CompareResult
+from .helper.result_objects.CompareManyResult import CompareManyResult
+from .helper.result_objects.CompareAllResult import CompareAllResult
+from .helper.result_objects.ClusterResult import ClusterResult
 from .helper.result_objects.GetDistanceResult import GetDistanceResult
-from .helper.utils import image_path_to_array
+from .helper.result_objects.IdentifyResult import IdentifyResult
+from .helper.result_objects.TopKResult import TopKResult
+from .handler import distance_backends
+from .handler.nativeMethods import NativeMethods
+from .helper import distance as distance_utils
+from .helper.clustering import threshold_components
+from .helper.frame_stream import FrameStream
+from .helper.metrics import STAGE_FILE_READ, metrics
+from .helper.pipeline import iter_image_paths, run_stages
+from .helper.utils import image_bytes_to_array, is_image_bytes
 from .settings.supportedPlatforms import SupportedPlatforms
 
 
@@ -26,11 +42,29 @@ class FaceFactor(metaclass=Singleton):
         FaceFactor
             Instance of the FaceFactor class.
 
+        Attributes
+        ----------
+        decode_max_side : int or None
+            When set, images given by path are decoded at reduced resolution so that their longest
+            side is at most this many pixels. None (the default) decodes at full resolution.
+
+        embedding_cache : EmbeddingCache or None
+            When set, embeddings are looked up by image content before running inference. Used by
+            get_embedding, get_embeddings, embed_stream and compare. None (the default) disables caching.
+
         Methods
         -------
         get_embedding
+        get_embeddings
+        embed_stream
         get_distance
+        get_distances
+        get_distance_matrix
+        top_k
         compare
+        set_inference_engine
+        preload
+        warmup
     
     """
 
@@ -42,6 +76,8 @@ class FaceFactor(metaclass=Singleton):
                 
             self.face_factor = Face()
             self.message = Message()
+            self.decode_max_side = None
+            self.embedding_cache = None
         except ValueError as exp:
             print("Initialization Failed: {}\n".format(exp))
             sys.exit(1)
@@ -51,24 +87,30 @@ class FaceFactor(metaclass=Singleton):
 
 
 
-    def get_embedding(self, image_path: str = None, image_data: np.array = None) -> GetEmbeddingResult:
+    @record_outcome("get_embedding", 108)
+    def get_embedding(self, image_path: str = None, image_data: np.array = None, image_bytes=None) -> GetEmbeddingResult:
         """
-        Obtain the embedding for a given image. The image can be provided either via a path or as numpy data.
+        Obtain the embedding for a given image. The image can be provided via a path, as numpy data or as encoded bytes.
 
         Parameters
         ----------
         image_path : str, optional
-            Directory path to the image file. Either `image_path` or `image_data` should be provided, not both.
+            Directory path to the image file. Exactly one of `image_path`, `image_data` or `image_bytes` should be provided.
         
         image_data : np.array, optional
-            Image data in numpy RGB format. Either `image_path` or `image_data` should be provided, not both.
+            Image data in numpy RGB format. Exactly one of `image_path`, `image_data` or `image_bytes` should be provided.
+
+        image_bytes : bytes, bytearray, memoryview or binary file object, optional
+            Encoded image file contents (JPEG, PNG, ...), decoded straight from memory.
+            Exactly one of `image_path`, `image_data` or `image_bytes` should be provided.
 
         Returns
         -------
         GetEmbeddingResult
             - status: int [0 if successful, -1 if any error]
             - message: str [Message from the operation]
-            - embedding: list [Embedding of the image]
+            - embedding: np.ndarray [Embedding of the image, float32]
+            - embedding_list: list [Embedding of the image as a list of floats]
 
         Raises
         ------
@@ -77,37 +119,231 @@ class FaceFactor(metaclass=Singleton):
         """
         
         try:
-            if (image_path is not None and image_data is not None) or (image_path is None and image_data is None):
-                return GetEmbeddingResult(message="Specify either image_path or image_data, not both or none.")
-
-            if image_data:
-                if not isinstance(image_data, np.ndarray):
-                    return GetEmbeddingResult(message="Required numpy array in RGB/RGBA/BGR format")
-                img_data = image_data
-
-            if image_path:
-                if not os.path.exists(image_path):
-                    return GetEmbeddingResult(message="Image path does not exist.")
-                img_data = image_path_to_array(image_path, input_format="rgb")
-
-            if img_data is None:
-                return GetEmbeddingResult(message="Failed to load image data.")
+            error_message = self._check_image_input(image_path, image_data, image_bytes)
+            if error_message is not None:
+                return GetEmbeddingResult(message=error_message)
 
-            return self.face_factor.get_embedding(image_data=img_data)
+            return self._embed_image_input(image_path, image_data, image_bytes)
 
         except Exception as e:
             print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
             return GetEmbeddingResult(message="Error occurred while getting embedding.")
-    def get_distance(self, embedding_one: list, embedding_two: list) -> GetDistanceResult:
+
+    def get_embeddings(self, images: Iterable[Union[str, os.PathLike, np.ndarray]], max_workers: int = None) -> List[GetEmbeddingResult]:
+        """
+        Obtain the embeddings for several images at once. Decoding and native inference run concurrently
+        on a thread pool; ctypes releases the GIL for the duration of each native call.
+
+        Parameters
+        ----------
+        images : iterable of str, os.PathLike, np.ndarray or bytes-like
+            Image file paths, image data in numpy RGB format and/or encoded image bytes. Kinds can be mixed.
+
+        max_workers : int, optional
+            Number of worker threads. Defaults to the number of CPUs.
+
+        Returns
+        -------
+        list of GetEmbeddingResult
+            One result per input image, in input order. A failed image gets a result with status -1
+            and does not affect the others.
+        """
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tango-embed") as executor:
+            return list(executor.map(self._get_embedding_for_image, images))
+
+    def get_embeddings_batch(self, images: Iterable[Union[str, os.PathLike, np.ndarray]], max_workers: int = None) -> BatchEmbeddingResult:
+        """
+        Like `get_embeddings`, but the results are returned column-wise in a BatchEmbeddingResult: one
+        (N, D) float32 matrix plus status and code arrays. Per-image result objects are dropped as soon
+        as their row is copied, so memory and garbage-collector work stay flat for large batches, and the
+        matrix can be passed straight to `get_distance_matrix`, `top_k` or `FaceGallery.enroll_many`.
+
+        Parameters
+        ----------
+        images : iterable of str, os.PathLike, np.ndarray or bytes-like
+            Image file paths, image data in numpy RGB format and/or encoded image bytes. Kinds can be mixed.
+
+        max_workers : int, optional
+            Number of worker threads. Defaults to the number of CPUs.
+
+        Returns
+        -------
+        BatchEmbeddingResult
+            - status: int [0 if every image was embedded, -1 otherwise]
+            - embeddings: np.ndarray [(N, D) float32, zero rows for failed images]
+            - statuses: np.ndarray [Per-image status, int8]
+            - codes: np.ndarray [Per-image Message code, int32, 0 on success]
+            - valid: np.ndarray [Boolean mask of embedded images]
+            - messages: dict [Messages of failed images, by index]
+        """
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        images = images if isinstance(images, (list, tuple)) else list(images)
+        statuses = np.full(len(images), BatchEmbeddingResult.CALL_STATUS_ERROR, dtype=np.int8)
+        codes = np.zeros(len(images), dtype=np.int32)
+        messages = {}
+        embeddings = None
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tango-embed") as executor:
+            for index, result in enumerate(executor.map(self._get_embedding_for_image, images)):
+                if result.status != GetEmbeddingResult.CALL_STATUS_SUCCESS:
+                    codes[index] = self.message.get_code(result.message, 108)
+                    messages[index] = result.message
+                    continue
+                if embeddings is None:
+                    embeddings = np.zeros((len(images), result.embedding.shape[0]), dtype=np.float32)
+                embeddings[index] = result.embedding
+                statuses[index] = BatchEmbeddingResult.CALL_STATUS_SUCCESS
+
+        if embeddings is None:
+            embeddings = np.zeros((len(images), 0), dtype=np.float32)
+        failed = len(messages)
+        return BatchEmbeddingResult(
+            embeddings=embeddings, statuses=statuses, codes=codes, messages=messages,
+            status=BatchEmbeddingResult.CALL_STATUS_SUCCESS if not failed else BatchEmbeddingResult.CALL_STATUS_ERROR,
+            message="OK" if not failed else f"{failed} of {len(images)} images failed.")
+
+    def embed_stream(self, source: Union[str, os.PathLike, Iterable[Union[str, os.PathLike]]],
+                     read_workers: int = 2, decode_workers: int = None, inference_workers: int = None,
+                     queue_size: int = 32) -> Iterator[Tuple[str, GetEmbeddingResult]]:
+        """
+        Embed a stream of image files, overlapping file reads, decoding and native inference.
+
+        The three stages run on their own threads and are connected by bounded queues, so memory stays
+        flat however large the source is. Results are yielded as soon as each image finishes, which is
+        not necessarily input order.
+
+        Parameters
+        ----------
+        source : str, os.PathLike or iterable of paths
+            A directory (walked recursively for image files), a glob pattern, or an iterable of paths.
+
+        read_workers : int, optional
+            Threads reading files.
+
+        decode_workers : int, optional
+            Threads decoding images. Defaults to the number of CPUs.
+
+        inference_workers : int, optional
+            Threads running native inference. Defaults to the number of CPUs.
+
+        queue_size : int, optional
+            Capacity of each queue between stages.
+
+        Yields
+        ------
+        tuple of (str, GetEmbeddingResult)
+            The image path and its result. Unreadable images yield a result with status -1.
+        """
+        cpu_count = os.cpu_count() or 1
+        items = ((path, path) for path in iter_image_paths(source))
+        stages = [
+            (self._read_image_file, read_workers),
+            (self._decode_image_bytes, decode_workers or cpu_count),
+            (self._embed_image_data, inference_workers or cpu_count),
+        ]
+        for image_path, result in run_stages(items, stages, queue_size=queue_size, on_error=self._stream_error):
+            metrics.count_outcome("embed_stream", 0 if result.status == 0 else self.message.get_code(result.message, 108))
+            yield image_path, result
+
+    def embed_frames(self, frames: Iterable[np.ndarray], target_fps: float = None, min_change: float = 2.0,
+                     source_fps: float = None) -> FrameStream:
+        """
+        Embed a stream of video frames at a bounded rate.
+
+        A frame is skipped if it comes less than 1 / `target_fps` seconds after the last embedded frame,
+        or if a downsampled copy of it barely differs from the last embedded frame. In live mode (the
+        default) frames are read on a background thread and frames that arrive while inference is busy
+        are dropped, so results lag the feed by at most about one inference.
+
+        Parameters
+        ----------
+        frames : iterable of np.ndarray
+            Frames in numpy RGB format, e.g. from a camera or a video decoder.
+
+        target_fps : float, optional
+            Maximum number of frames embedded per second. None embeds as fast as inference allows.
+
+        min_change : float, optional
+            Minimum mean absolute difference (0-255 scale) between the thumbnails of a frame and of the
+            last embedded frame. 0 disables the check.
+
+        source_fps : float, optional
+            Frame rate of a recording. When set, frames are read in step with inference and never
+            dropped, and `target_fps` is applied to the recording's timeline instead of the wall clock.
+
+        Returns
+        -------
+        FrameStream
+            Iterable of `(frame_index, GetEmbeddingResult)` pairs. Its `stats` attribute counts
+            received, embedded, skipped_rate, skipped_unchanged and dropped_stale frames. Call
+            `close()`, or use it as a context manager, to stop early.
+        """
+        return FrameStream(frames, lambda frame: self.get_embedding(image_data=frame), target_fps=target_fps,
+                           min_change=min_change, source_fps=source_fps)
+
+    @staticmethod
+    def _read_image_file(image_path: str) -> bytes:
+        with metrics.timed(STAGE_FILE_READ):
+            with open(image_path, "rb") as fp:
+                return fp.read()
+
+    def _decode_image_bytes(self, image_bytes: bytes):
+        # Returns a ready result on a cache hit, otherwise the cache key and the decoded image
+        key = None
+        cache = self.embedding_cache
+        if cache is not None:
+            key = cache.key_for_bytes(image_bytes, *self._cache_key_params())
+            embedding = cache.get(key)
+            if embedding is not None:
+                return GetEmbeddingResult(embedding=embedding, status=GetEmbeddingResult.CALL_STATUS_SUCCESS, message="OK")
+        return key, image_bytes_to_array(image_bytes, input_format="rgb", max_side=self.decode_max_side)
+
+    def _embed_image_data(self, decoded) -> GetEmbeddingResult:
+        if isinstance(decoded, GetEmbeddingResult):
+            return decoded
+        key, image_data = decoded
+        return self._embed_and_cache(key, image_data)
+
+    def _stream_error(self, image_path: str, error: Exception) -> GetEmbeddingResult:
+        if isinstance(error, FileNotFoundError):
+            return GetEmbeddingResult(message=self.message.get_message(101))
+        print(f"Oops: {error}\nImage: {image_path}")
+        return GetEmbeddingResult(message="Error occurred while getting embedding.")
+
+    def _load_image(self, image_path, input_format: str = "rgb") -> np.ndarray:
+        # Read the file in one go so file I/O and decoding are timed separately
+        image_bytes = self._read_image_file(image_path)
+        return image_bytes_to_array(image_bytes, input_format=input_format, max_side=self.decode_max_side)
+
+    def _get_embedding_for_image(self, image: Union[str, os.PathLike, np.ndarray]) -> GetEmbeddingResult:
+        if isinstance(image, np.ndarray):
+            return self.get_embedding(image_data=image)
+        if isinstance(image, (str, os.PathLike)):
+            return self.get_embedding(image_path=os.fspath(image))
+        if is_image_bytes(image):
+            return self.get_embedding(image_bytes=image)
+        return GetEmbeddingResult(message="Required image path, encoded image bytes or numpy array in RGB/RGBA/BGR format")
+    @record_outcome("get_distance", 107)
+    def get_distance(self, embedding_one: np.ndarray, embedding_two: np.ndarray) -> GetDistanceResult:
         """
         Compute the distance between two embeddings.
 
         Parameters
         ----------
-        embedding_one : list
+        embedding_one : np.ndarray or list
             The first embedding vector.
         
-        embedding_two : list
+        embedding_two : np.ndarray or list
             The second embedding vector.
 
         Returns
@@ -128,7 +364,7 @@ class FaceFactor(metaclass=Singleton):
         
         """
         try:
-            if not embedding_one or not embedding_two:
+            if embedding_one is None or embedding_two is None or len(embedding_one) == 0 or len(embedding_two) == 0:
                 return GetDistanceResult(message="Both embeddings must be provided and non-empty.")
 
             distance_obj = self.face_factor.get_distance(embedding_one, embedding_two)
@@ -141,24 +377,117 @@ class FaceFactor(metaclass=Singleton):
             print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
             return GetDistanceResult(message="Error occurred while computing distance.")
     
+    @record_outcome("get_distances", 107)
+    def get_distances(self, query: np.ndarray, gallery: np.ndarray) -> GetDistanceResult:
+        """
+        Compute the distances between one embedding and many embeddings in a single vectorized pass.
+
+        Parameters
+        ----------
+        query : np.ndarray or list
+            The query embedding vector, shape (D,).
+
+        gallery : np.ndarray or list
+            The embeddings to compare against, shape (N, D).
+
+        Returns
+        -------
+        GetDistanceResult
+            - status: int [0 if successful, -1 if any error]
+            - message: str [Message from the operation]
+            - distance: np.ndarray [float32 distances, shape (N,)]
+        """
+        try:
+            distances = distance_utils.get_distances(query, gallery)
+            return GetDistanceResult(distance=distances, status=GetDistanceResult.CALL_STATUS_SUCCESS, message="OK")
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return GetDistanceResult(message="Error occurred while computing distances.")
+
+    @record_outcome("get_distance_matrix", 107)
+    def get_distance_matrix(self, embeddings_a: np.ndarray, embeddings_b: np.ndarray) -> GetDistanceResult:
+        """
+        Compute the distances between every pair of rows of two embedding matrices.
+
+        Parameters
+        ----------
+        embeddings_a : np.ndarray or list
+            Embeddings of shape (N, D).
+
+        embeddings_b : np.ndarray or list
+            Embeddings of shape (M, D).
+
+        Returns
+        -------
+        GetDistanceResult
+            - status: int [0 if successful, -1 if any error]
+            - message: str [Message from the operation]
+            - distance: np.ndarray [float32 distances, shape (N, M)]
+        """
+        try:
+            distances = distance_utils.get_distance_matrix(embeddings_a, embeddings_b)
+            return GetDistanceResult(distance=distances, status=GetDistanceResult.CALL_STATUS_SUCCESS, message="OK")
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return GetDistanceResult(message="Error occurred while computing distance matrix.")
+
+    @record_outcome("top_k", 107)
+    def top_k(self, query: np.ndarray, gallery: np.ndarray, k: int) -> TopKResult:
+        """
+        Find the `k` embeddings of a gallery closest to a query embedding.
+
+        Parameters
+        ----------
+        query : np.ndarray or list
+            The query embedding vector, shape (D,).
+
+        gallery : np.ndarray or list
+            The embeddings to search, shape (N, D).
+
+        k : int
+            Number of nearest embeddings to return.
+
+        Returns
+        -------
+        TopKResult
+            - status: int [0 if successful, -1 if any error]
+            - message: str [Message from the operation]
+            - indices: np.ndarray [Gallery row indices, closest first]
+            - distances: np.ndarray [Distances matching `indices`]
+        """
+        try:
+            indices, distances = distance_utils.top_k(query, gallery, k)
+            return TopKResult(indices=indices, distances=distances, status=TopKResult.CALL_STATUS_SUCCESS, message="OK")
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return TopKResult(message="Error occurred while searching embeddings.")
+
+    @record_outcome("compare", 110)
     def compare(self, image_path_1: str = None, image_data_1: np.array = None, 
-                image_path_2: str = None, image_data_2: np.array = None) -> CompareResult:
+                image_path_2: str = None, image_data_2: np.array = None,
+                image_bytes_1=None, image_bytes_2=None) -> CompareResult:
         """
         Compare two images to determine if they are similar.
 
         Parameters
         ----------
         image_path_1 : str, optional
-            Directory path to the first image file. Either `image_path_1` or `image_data_1` should be provided, not both.
+            Directory path to the first image file. Exactly one of `image_path_1`, `image_data_1` or `image_bytes_1` should be provided.
         
         image_data_1 : np.array, optional
-            Image data of the first image in numpy RGB format. Either `image_path_1` or `image_data_1` should be provided, not both.
+            Image data of the first image in numpy RGB format. Exactly one of `image_path_1`, `image_data_1` or `image_bytes_1` should be provided.
 
         image_path_2 : str, optional
-            Directory path to the second image file. Either `image_path_2` or `image_data_2` should be provided, not both.
+            Directory path to the second image file. Exactly one of `image_path_2`, `image_data_2` or `image_bytes_2` should be provided.
         
         image_data_2 : np.array, optional
-            Image data of the second image in numpy RGB format. Either `image_path_2` or `image_data_2` should be provided, not both.
+            Image data of the second image in numpy RGB format. Exactly one of `image_path_2`, `image_data_2` or `image_bytes_2` should be provided.
+
+        image_bytes_1 : bytes, bytearray, memoryview or binary file object, optional
+            Encoded contents of the first image file.
+
+        image_bytes_2 : bytes, bytearray, memoryview or binary file object, optional
+            Encoded contents of the second image file.
 
         Returns
         -------
@@ -167,31 +496,302 @@ class FaceFactor(metaclass=Singleton):
         """
     
         try:
-        
-            
-            input_format = "rgb"
-            if (image_path_1 is not None and image_path_2 is not None and
-                image_data_1 is not None and image_data_2 is not None) or (
-                    image_path_1 is None and image_path_2 is None and image_data_1 is None and image_data_2 is None):
-                return CompareResult(message="Specify either image_path or image_data")
-            img_data_1, img_data_2 = None, None
-            if image_data_1 is not None and image_data_2 is not None:
-                if not isinstance(image_data_1, np.ndarray) or not isinstance(image_data_2, np.ndarray):
-                    return CompareResult(message="Required numpy array in RGB/RGBA/BGR format")
-                img_data_1 = image_data_1
-                img_data_2 = image_data_2
-            if image_path_1 or image_path_2:
-                if not os.path.exists(image_path_1) or not os.path.exists(image_path_2):
-                    return CompareResult(message=self.message.get_message(101))
-                img_data_1 = image_path_to_array(image_path_1, input_format=input_format)
-                img_data_2 = image_path_to_array(image_path_2, input_format=input_format)
-                if img_data_1 is None or img_data_2 is None:
-                    return CompareResult(message=self.message.EXCEPTION_ERROR_COMPARE)
-            return self.face_factor.compare(image_data_1=img_data_1, image_data_2=img_data_2)
+            error_message = (self._check_image_input(image_path_1, image_data_1, image_bytes_1)
+                             or self._check_image_input(image_path_2, image_data_2, image_bytes_2))
+            if error_message is not None:
+                return CompareResult(message=error_message)
+            embedding_1 = self._embed_image_input(image_path_1, image_data_1, image_bytes_1)
+            embedding_2 = self._embed_image_input(image_path_2, image_data_2, image_bytes_2)
+            return self.face_factor.compare_embeddings(embedding_1, embedding_2)
         except Exception as e:
             print("Oops: {}\nTrace: {}".format(e, traceback.format_exc()))
             return CompareResult(message=self.message.EXCEPTION_ERROR_COMPARE)
-        
+
+    @record_outcome("compare_many", 110)
+    def compare_many(self, pairs) -> CompareManyResult:
+        """
+        Compare many pairs of embeddings in one call.
+
+        All pairs are evaluated by the selected distance backend (see `set_distance_backend`) in a single
+        pass, instead of one `get_distance` call per pair.
+
+        Parameters
+        ----------
+        pairs : np.ndarray, list of (embedding, embedding) or tuple of two np.ndarray
+            An array of shape (N, 2, D), a list of N embedding pairs, or two (N, D) matrices whose rows
+            are paired up.
+
+        Returns
+        -------
+        CompareManyResult
+            - status: int [0 if successful, -1 if any error]
+            - message: str [Message from the operation]
+            - distances: np.ndarray [float32 distance of each pair, shape (N,)]
+            - is_similar: np.ndarray [bool, True where the distance is below the compare threshold]
+        """
+        try:
+            if isinstance(pairs, tuple) and len(pairs) == 2 and all(np.ndim(side) == 2 for side in pairs):
+                embeddings_a, embeddings_b = pairs
+            else:
+                pairs = np.asarray(pairs, dtype=np.float32)
+                if pairs.ndim != 3 or pairs.shape[1] != 2:
+                    return CompareManyResult(message="pairs must have shape (N, 2, D).")
+                embeddings_a, embeddings_b = pairs[:, 0], pairs[:, 1]
+            distances = self.face_factor.get_pair_distances(embeddings_a, embeddings_b)
+            return CompareManyResult(distances=distances, is_similar=distances < Face.COMPARE_THRESHOLD,
+                                     status=CompareManyResult.CALL_STATUS_SUCCESS, message="Comparison successful.")
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return CompareManyResult(message=self.message.EXCEPTION_ERROR_COMPARE)
+
+    @record_outcome("compare_all", 110)
+    def compare_all(self, images: Iterable[Union[str, os.PathLike, np.ndarray]], max_workers: int = None) -> CompareAllResult:
+        """
+        Compare every image of a set with every other one, embedding each image exactly once.
+
+        The distance matrix is computed blockwise from one (N, D) embedding matrix, instead of running
+        `compare` on every pair, which embeds each image once per pair it is in.
+
+        Parameters
+        ----------
+        images : iterable of str, os.PathLike, np.ndarray or bytes-like
+            Image file paths, image data in numpy RGB format and/or encoded image bytes.
+
+        max_workers : int, optional
+            Number of embedding threads. Defaults to the number of CPUs.
+
+        Returns
+        -------
+        CompareAllResult
+            - status: int [0 if every image was embedded, -1 otherwise]
+            - message: str [Message from the operation]
+            - distances: np.ndarray [(N, N) float32, NaN for images that failed]
+            - is_similar: np.ndarray [(N, N) bool, True where the distance is below the compare threshold]
+            - valid: np.ndarray [Boolean mask of the images that were embedded]
+        """
+        try:
+            batch = self.get_embeddings_batch(images, max_workers=max_workers)
+            valid = batch.valid
+            distances = np.full((len(batch), len(batch)), np.nan, dtype=np.float32)
+            distances[np.ix_(valid, valid)] = distance_utils.get_distance_matrix(batch.embeddings[valid], batch.embeddings[valid])
+            with np.errstate(invalid="ignore"):
+                is_similar = distances < Face.COMPARE_THRESHOLD
+            return CompareAllResult(distances=distances, is_similar=is_similar, valid=valid,
+                                    status=batch.status, message="Comparison successful." if batch.status == 0 else batch.message)
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return CompareAllResult(message=self.message.EXCEPTION_ERROR_COMPARE)
+
+    @record_outcome("cluster", 110)
+    def cluster(self, images: Iterable[Union[str, os.PathLike, np.ndarray]], threshold: float = None,
+                max_workers: int = None) -> ClusterResult:
+        """
+        Group the images of a set into same-person or near-duplicate clusters.
+
+        Each image is embedded once; two images are linked when their distance is below `threshold`
+        and clusters are the connected components of those links. The distance matrix is evaluated
+        tile by tile and never held in full, so memory stays bounded for very large sets.
+
+        Parameters
+        ----------
+        images : iterable of str, os.PathLike, np.ndarray or bytes-like
+            Image file paths, image data in numpy RGB format and/or encoded image bytes.
+
+        threshold : float, optional
+            Link distance. Defaults to the compare threshold (same person); use a smaller value to find
+            near-duplicates only.
+
+        max_workers : int, optional
+            Number of embedding threads. Defaults to the number of CPUs.
+
+        Returns
+        -------
+        ClusterResult
+            - status: int [0 if every image was embedded, -1 otherwise]
+            - message: str [Message from the operation]
+            - labels: np.ndarray [int64 cluster label of each image, -1 for images that failed]
+            - groups: list [Clusters of more than one image, as arrays of input indices]
+        """
+        try:
+            if threshold is None:
+                threshold = Face.COMPARE_THRESHOLD
+            batch = self.get_embeddings_batch(images, max_workers=max_workers)
+            valid = batch.valid
+            labels = np.full(len(batch), -1, dtype=np.int64)
+            labels[valid] = threshold_components(batch.embeddings[valid], threshold)
+            return ClusterResult(labels=labels, status=batch.status,
+                                 message="OK" if batch.status == 0 else batch.message)
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return ClusterResult(message="Error occurred while clustering images.")
+
+    @record_outcome("identify", 108)
+    def identify(self, gallery, image_path: str = None, image_data: np.array = None, image_bytes=None, k: int = 1,
+                 threshold: float = None) -> IdentifyResult:
+        """
+        Embed an image and search a gallery for the enrolled embeddings that match it.
+
+        Parameters
+        ----------
+        gallery : FaceGallery, MappedFaceGallery, IVFPQIndex or ShardedGallery
+            The gallery to search; anything with an `identify(embedding, k=..., threshold=...)` method.
+
+        image_path : str, optional
+            Directory path to the image file. Exactly one of `image_path`, `image_data` or `image_bytes` should be provided.
+
+        image_data : np.array, optional
+            Image data in numpy RGB format. Exactly one of `image_path`, `image_data` or `image_bytes` should be provided.
+
+        image_bytes : bytes, bytearray, memoryview or binary file object, optional
+            Encoded contents of an image file.
+
+        k : int, optional
+            Maximum number of matches to return.
+
+        threshold : float, optional
+            Distance threshold. Defaults to the compare threshold.
+
+        Returns
+        -------
+        IdentifyResult
+            The gallery's result: ShardedIdentifyResult for a ShardedGallery, IdentifyResult otherwise.
+        """
+        try:
+            error_message = self._check_image_input(image_path, image_data, image_bytes)
+            if error_message is not None:
+                return IdentifyResult(message=error_message)
+            embedding = self._embed_image_input(image_path, image_data, image_bytes)
+            if embedding.status != GetEmbeddingResult.CALL_STATUS_SUCCESS:
+                return IdentifyResult(message=embedding.message)
+            return gallery.identify(embedding.embedding, k=k, threshold=threshold)
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return IdentifyResult(message="Error occurred while identifying image.")
+
+    def set_distance_backend(self, backend: str = "numpy") -> str:
+        """
+        Choose how distances are computed by `get_distance`, `compare`, and `compare_many`.
+
+        Parameters
+        ----------
+        backend : str, optional
+            "numpy" (the default), "native" (libtango's tango_get_embeddings_distance, one call per pair),
+            "native_batched" (the same native function over whole matrices, converting the inputs once)
+            or "auto", which times the available backends on this host and picks the fastest.
+
+        Returns
+        -------
+        str
+            The name of the backend in use.
+        """
+        if backend == "auto":
+            backend, _ = distance_backends.select_fastest_backend(self.face_factor.face_factor_processor
+                                                                  if isinstance(self.face_factor, Face) else None)
+        self.face_factor.set_distance_backend(backend)
+        return backend
+
+    def set_inference_engine(self, engine=None) -> None:
+        """
+        Choose what runs native inference for this FaceFactor.
+
+        Parameters
+        ----------
+        engine : optional
+            An object with the Face inference interface (get_embedding, get_distance, compare_embeddings),
+            e.g. a ProcessFaceEngine. None restores the default in-process Face.
+        """
+        self.face_factor = engine if engine is not None else Face()
+
+    def preload(self) -> None:
+        """
+        Load the native libraries (OpenCV, TensorFlow Lite and libtango) now.
+
+        They are otherwise loaded on the first inference. Calling this in a pre-fork server master lets
+        forked workers share the mapped libraries copy-on-write.
+
+        Raises
+        ------
+        RuntimeError
+            If the native libraries cannot be loaded.
+        """
+        self.face_factor.preload()
+
+    def warmup(self, image_data: np.array = None, iterations: int = 1) -> float:
+        """
+        Run dummy inferences so one-time model initialization does not land on the first real request.
+
+        Parameters
+        ----------
+        image_data : np.array, optional
+            Image to run, in numpy RGB format. Defaults to a blank 256x256 image; whether a face is found
+            does not matter.
+
+        iterations : int, optional
+            Number of inferences to run.
+
+        Returns
+        -------
+        float
+            Seconds spent warming up.
+        """
+        if image_data is None:
+            image_data = np.full((256, 256, 3), 128, dtype=np.uint8)
+        start_time = time.perf_counter()
+        self.preload()
+        for _ in range(iterations):
+            self.face_factor.warmup(image_data)
+        return time.perf_counter() - start_time
+
+    def _check_image_input(self, image_path, image_data, image_bytes):
+        """Returns an error message unless exactly one valid image input was given."""
+        if sum(value is not None for value in (image_path, image_data, image_bytes)) != 1:
+            return "Specify exactly one of image_path, image_data or image_bytes."
+        if image_data is not None and not isinstance(image_data, np.ndarray):
+            return "Required numpy array in RGB/RGBA/BGR format"
+        if image_bytes is not None and not is_image_bytes(image_bytes):
+            return "Required bytes-like object or binary file object"
+        if image_path is not None and not os.path.exists(image_path):
+            return self.message.get_message(101)
+        return None
+
+    def _embed_image_input(self, image_path, image_data, image_bytes) -> GetEmbeddingResult:
+        """Decode and embed an input accepted by `_check_image_input`, through the embedding cache when one is set."""
+        cache = self.embedding_cache
+        if cache is None:
+            if image_data is None:
+                if image_bytes is not None:
+                    image_data = image_bytes_to_array(image_bytes, input_format="rgb", max_side=self.decode_max_side)
+                else:
+                    image_data = self._load_image(image_path)
+            return self.face_factor.get_embedding(image_data=image_data)
+
+        if image_data is not None:
+            key = cache.key_for_array(image_data, NativeMethods.model_identity())
+        else:
+            if image_path is not None:
+                image_bytes = self._read_image_file(image_path)
+            elif hasattr(image_bytes, "read"):
+                image_bytes = image_bytes.read()
+            key = cache.key_for_bytes(image_bytes, *self._cache_key_params())
+
+        embedding = cache.get(key)
+        if embedding is not None:
+            return GetEmbeddingResult(embedding=embedding, status=GetEmbeddingResult.CALL_STATUS_SUCCESS, message="OK")
+
+        if image_data is None:
+            image_data = image_bytes_to_array(image_bytes, input_format="rgb", max_side=self.decode_max_side)
+        return self._embed_and_cache(key, image_data)
+
+    def _cache_key_params(self) -> tuple:
+        # Decode settings and the native model both change the embedding of the same encoded bytes
+        return "rgb", self.decode_max_side, NativeMethods.model_identity()
+
+    def _embed_and_cache(self, key: str, image_data: np.ndarray) -> GetEmbeddingResult:
+        result = self.face_factor.get_embedding(image_data=image_data)
+        if result.status == GetEmbeddingResult.CALL_STATUS_SUCCESS and self.embedding_cache is not None:
+            result.embedding = self.embedding_cache.put(key, result.embedding)
+        return result
+
 
 
 
@@ -14,12 +14,21 @@ logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 class Face(metaclass=Singleton):
+    # Two embeddings closer than this belong to the same person
+    COMPARE_THRESHOLD = 1.01
 
     def __init__(self):
         self.message = Message()
-        self.COMPARE_THRESHOLD=1.01
         self.face_factor_processor = NativeMethods()
 
+    def preload(self) -> None:
+        """Load the native libraries now instead of on the first inference."""
+        self.face_factor_processor.load()
+
+    def warmup(self, image_data: np.array) -> GetEmbeddingResult:
+        """Run one inference so one-time model initialization happens now."""
+        return self.get_embedding(image_data=image_data)
+
     def _handle_error(self, e, message):
         logger.error(f"Exception: {e}, Traceback: {traceback.format_exc()}")
         return message
@@ -27,7 +36,7 @@ class Face(metaclass=Singleton):
     def get_embedding(self, image_data: np.array) -> GetEmbeddingResult:
         try:
             embeddings = self.face_factor_processor.get_embedding(image_data)
-            if not embeddings:
+            if embeddings is None or embeddings.size == 0:
                 return GetEmbeddingResult(message=self.message.EXCEPTION_ERROR_GET_EMB)
             return GetEmbeddingResult(embedding=embeddings,
                                       status=GetEmbeddingResult.CALL_STATUS_SUCCESS, 
@@ -35,7 +44,7 @@ class Face(metaclass=Singleton):
         except Exception as e:
             return self._handle_error(e, GetEmbeddingResult(message=self.message.EXCEPTION_ERROR_GET_EMB))
 
-    def get_distance(self, embedding_one: list, embedding_two: list) -> GetDistanceResult:
+    def get_distance(self, embedding_one: np.ndarray, embedding_two: np.ndarray) -> GetDistanceResult:
         try:
             distance = self.face_factor_processor.get_distance(embedding_one, embedding_two)
             if distance is None:
@@ -45,6 +54,14 @@ class Face(metaclass=Singleton):
                                      message="OK")
         except Exception as e:
             return self._handle_error(e, GetDistanceResult(message=self.message.EXCEPTION_ERROR_GET_DISTANCE))
+    def set_distance_backend(self, name: str) -> None:
+        """Compute distances with the named backend: "numpy", "native" or "native_batched"."""
+        self.face_factor_processor.set_distance_backend(name)
+
+    def get_pair_distances(self, embeddings_a: np.ndarray, embeddings_b: np.ndarray) -> np.ndarray:
+        """Distance of each row of `embeddings_a` to the same row of `embeddings_b`."""
+        return self.face_factor_processor.get_pair_distances(embeddings_a, embeddings_b)
+
     def compare(self, image_data_1: np.array = None, image_data_2: np.array = None) -> CompareResult:
         """
         Compare two images to determine if they are similar.
@@ -65,7 +82,12 @@ class Face(metaclass=Singleton):
         """
         embedding_1 = self.get_embedding( image_data=image_data_1)
         embedding_2 = self.get_embedding( image_data=image_data_2)
+        return self.compare_embeddings(embedding_1, embedding_2)
 
+    def compare_embeddings(self, embedding_1: GetEmbeddingResult, embedding_2: GetEmbeddingResult) -> CompareResult:
+        """
+        Compare two already computed embedding results with the compare threshold.
+        """
         if embedding_1.status != 0 or embedding_2.status != 0:
             return CompareResult(is_similar=False, status=CompareResult.CALL_STATUS_ERROR, message="Failed to get embeddings for one or both images.")
 
@@ -0,0 +1,311 @@
+import threading
+import traceback
+from typing import Hashable, Iterable
+
+import numpy as np
+
+from .factor_modules.FaceModule import Face
+from .helper import distance as distance_utils
+from .helper import quantization
+from .helper.result_objects.IdentifyResult import IdentifyResult
+
+
+class FaceGallery:
+    """
+    In-memory store of enrolled embeddings for 1:N search.
+
+    Embeddings live in one contiguous float32 matrix with a parallel id array. The matrix grows by
+    doubling, so enrollment is amortized O(1), and removal swaps the last row into the freed slot,
+    so it is O(1) as well. Row order is therefore not stable across removals.
+
+    With `storage="float16"` or `storage="int8"` the matrix holds quantized embeddings (see
+    helper/quantization.py), cutting memory per template by 2x or almost 4x. Distances are still
+    computed against a float32 probe.
+
+        Parameters
+        ----------
+        dimension : int, optional
+            Embedding length. Taken from the first enrolled embedding when omitted.
+
+        initial_capacity : int, optional
+            Number of rows to allocate up front.
+
+        storage : str, optional
+            "float32" (default), "float16" or "int8".
+
+        Methods
+        -------
+        enroll
+        enroll_many
+        remove
+        identify
+        save
+    """
+
+    def __init__(self, dimension: int = None, initial_capacity: int = 1024, storage: str = quantization.FLOAT32):
+        if initial_capacity < 1:
+            raise ValueError("initial_capacity must be at least 1")
+        if storage not in quantization.SCHEMES:
+            raise ValueError(f"storage must be one of {quantization.SCHEMES}")
+        self._dimension = dimension
+        self._initial_capacity = initial_capacity
+        self._storage = storage
+        self._embeddings = None
+        self._scales = None
+        self._ids = np.empty(0, dtype=object)
+        self._rows = {}
+        self._size = 0
+        self._lock = threading.RLock()
+        if dimension is not None:
+            self._allocate(initial_capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, embedding_id) -> bool:
+        return embedding_id in self._rows
+
+    @property
+    def dimension(self) -> int:
+        """
+        Returns the embedding length, or None before the first enrollment
+        """
+        return self._dimension
+
+    @property
+    def storage(self) -> str:
+        """
+        Returns the storage representation: "float32", "float16" or "int8"
+        """
+        return self._storage
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the bytes held by enrolled embeddings
+        """
+        return self._size * quantization.bytes_per_embedding(self._dimension or 0, self._storage)
+
+    @property
+    def capacity(self) -> int:
+        """
+        Returns the number of rows currently allocated
+        """
+        return 0 if self._embeddings is None else self._embeddings.shape[0]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """
+        Returns the enrolled ids, in row order
+        """
+        return self._ids[:self._size]
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """
+        Returns the enrolled embeddings as float32, in row order. A read-only view with float32
+        storage, a dequantized copy otherwise.
+        """
+        if self._embeddings is None:
+            return np.empty((0, self._dimension or 0), dtype=np.float32)
+        if self._storage != quantization.FLOAT32:
+            return quantization.dequantize(self._embeddings[:self._size], self._row_scales())
+        view = self._embeddings[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def get(self, embedding_id: Hashable) -> np.ndarray:
+        """
+        Returns a copy of the embedding enrolled under `embedding_id`
+
+        Raises
+        ------
+        KeyError
+            If the id is not enrolled.
+        """
+        with self._lock:
+            row = self._rows[embedding_id]
+            if self._storage == quantization.FLOAT32:
+                return self._embeddings[row].copy()
+            scales = None if self._scales is None else self._scales[row:row + 1]
+            return quantization.dequantize(self._embeddings[row:row + 1], scales)[0]
+
+    def enroll(self, embedding_id: Hashable, embedding) -> None:
+        """
+        Add an embedding, or replace the one already enrolled under `embedding_id`.
+
+        Parameters
+        ----------
+        embedding_id : hashable
+            Identifier returned by `identify` when this embedding matches.
+
+        embedding : np.ndarray or list
+            Embedding vector, e.g. `GetEmbeddingResult.embedding`.
+
+        Raises
+        ------
+        ValueError
+            If the embedding length does not match the gallery.
+        """
+        vector = distance_utils.as_embedding_vector(embedding)
+        codes, scales = quantization.quantize(vector, self._storage)
+        with self._lock:
+            self._check_dimension(vector.shape[0])
+            self._set_row(embedding_id, codes[0], None if scales is None else scales[0])
+
+    def _set_row(self, embedding_id, codes, scale) -> None:
+        row = self._rows.get(embedding_id)
+        if row is None:
+            self._reserve(self._size + 1)
+            row = self._size
+            self._rows[embedding_id] = row
+            self._ids[row] = embedding_id
+            self._size += 1
+        self._embeddings[row] = codes
+        if scale is not None:
+            self._scales[row] = scale
+
+    def enroll_many(self, embedding_ids: Iterable[Hashable], embeddings) -> None:
+        """
+        Add several embeddings at once.
+
+        Parameters
+        ----------
+        embedding_ids : iterable of hashable
+            One identifier per embedding row.
+
+        embeddings : np.ndarray or list
+            Embeddings of shape (N, D).
+        """
+        embedding_ids = list(embedding_ids)
+        matrix = distance_utils.as_embedding_matrix(embeddings)
+        if len(embedding_ids) != matrix.shape[0]:
+            raise ValueError("Number of ids does not match number of embeddings")
+        codes, scales = quantization.quantize(matrix, self._storage)
+        with self._lock:
+            self._check_dimension(matrix.shape[1])
+            self._reserve(self._size + matrix.shape[0])
+            for index, embedding_id in enumerate(embedding_ids):
+                self._set_row(embedding_id, codes[index], None if scales is None else scales[index])
+
+    def remove(self, embedding_id: Hashable) -> None:
+        """
+        Remove the embedding enrolled under `embedding_id`. The last row is moved into its slot.
+
+        Raises
+        ------
+        KeyError
+            If the id is not enrolled.
+        """
+        with self._lock:
+            row = self._rows.pop(embedding_id)
+            last = self._size - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._embeddings[row] = self._embeddings[last]
+                if self._scales is not None:
+                    self._scales[row] = self._scales[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._ids[last] = None
+            self._size = last
+
+    def identify(self, embedding, k: int = 1, threshold: float = None) -> IdentifyResult:
+        """
+        Find the enrolled embeddings that match a probe embedding.
+
+        A match follows the same rule as `Face.compare`: its distance is strictly below the threshold.
+
+        Parameters
+        ----------
+        embedding : np.ndarray or list
+            The probe embedding vector.
+
+        k : int, optional
+            Maximum number of matches to return.
+
+        threshold : float, optional
+            Distance threshold. Defaults to `Face.COMPARE_THRESHOLD`.
+
+        Returns
+        -------
+        IdentifyResult
+            - status: int [0 if successful, -1 if any error]
+            - message: str [Message from the operation]
+            - ids: list [Ids of the matches, closest first. Empty when nothing matches]
+            - distances: np.ndarray [Distances matching `ids`]
+        """
+        if threshold is None:
+            threshold = Face.COMPARE_THRESHOLD
+        try:
+            with self._lock:
+                if self._size == 0:
+                    return IdentifyResult(ids=[], distances=np.empty(0, dtype=np.float32),
+                                          status=IdentifyResult.CALL_STATUS_SUCCESS, message="Gallery is empty.")
+                if self._storage == quantization.FLOAT32:
+                    rows, distances = distance_utils.top_k(embedding, self._embeddings[:self._size], k)
+                else:
+                    if k < 1:
+                        raise ValueError("k must be at least 1")
+                    distances = quantization.quantized_distances(embedding, self._embeddings[:self._size], self._row_scales())
+                    rows, distances = distance_utils.select_top_k(distances, k)
+                matched = distances < threshold
+                rows, distances = rows[matched], distances[matched]
+                ids = self._ids[rows].tolist()
+            return IdentifyResult(ids=ids, distances=distances,
+                                  status=IdentifyResult.CALL_STATUS_SUCCESS, message="OK")
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return IdentifyResult(message="Error occurred while identifying embedding.")
+
+    def save(self, path: str):
+        """
+        Write the gallery to a directory in the memory-mapped format and open it.
+
+        Parameters
+        ----------
+        path : str
+            Target directory. Ids must be str.
+
+        Returns
+        -------
+        MappedFaceGallery
+            The saved gallery, opened in append mode.
+        """
+        from .mapped_gallery import MappedFaceGallery
+
+        with self._lock:
+            if self._dimension is None:
+                raise ValueError("Cannot save a gallery before its dimension is known")
+            return MappedFaceGallery.create(path, self._dimension, self.ids.tolist(), self.embeddings)
+
+    def _check_dimension(self, dimension: int) -> None:
+        if self._dimension is None:
+            self._dimension = dimension
+        elif dimension != self._dimension:
+            raise ValueError(f"Embedding length {dimension} does not match gallery dimension {self._dimension}")
+
+    def _row_scales(self):
+        return None if self._scales is None else self._scales[:self._size]
+
+    def _allocate(self, capacity: int) -> None:
+        embeddings = np.empty((capacity, self._dimension), dtype=self._storage)
+        ids = np.empty(capacity, dtype=object)
+        scales = np.empty(capacity, dtype=np.float32) if self._storage == quantization.INT8 else None
+        if self._embeddings is not None:
+            embeddings[:self._size] = self._embeddings[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+            if scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+        self._embeddings = embeddings
+        self._ids = ids
+        self._scales = scales
+
+    def _reserve(self, required: int) -> None:
+        capacity = self.capacity
+        if required <= capacity:
+            return
+        new_capacity = max(capacity, self._initial_capacity)
+        while new_capacity < required:
+            new_capacity *= 2
+        self._allocate(new_capacity)
@@ -0,0 +1,156 @@
+import ctypes
+from ctypes import POINTER, c_float, c_int, c_void_p
+from timeit import default_timer
+
+import numpy as np
+
+from ..helper import distance as distance_utils
+from ..helper.metrics import STAGE_DISTANCE, metrics
+
+NUMPY = "numpy"
+NATIVE = "native"
+NATIVE_BATCHED = "native_batched"
+
+
+class NumpyDistanceBackend:
+    """Euclidean distances computed with NumPy, vectorized over pairs."""
+    name = NUMPY
+
+    def distance(self, embedding_one, embedding_two) -> float:
+        embedding_one = np.asarray(embedding_one, dtype=np.float32)
+        embedding_two = np.asarray(embedding_two, dtype=np.float32)
+        return float(np.linalg.norm(embedding_one - embedding_two))
+
+    def pair_distances(self, embeddings_a, embeddings_b) -> np.ndarray:
+        return distance_utils.get_pair_distances(embeddings_a, embeddings_b)
+
+
+class NativeDistanceBackend:
+    """libtango's tango_get_embeddings_distance, one foreign call per pair."""
+    name = NATIVE
+
+    def __init__(self, native):
+        self._native = native
+
+    def distance(self, embedding_one, embedding_two) -> float:
+        library = self._native.load()._libtango
+        embedding_one = np.ascontiguousarray(embedding_one, dtype=np.float32)
+        embedding_two = np.ascontiguousarray(embedding_two, dtype=np.float32)
+        return float(library.tango_get_embeddings_distance(
+            embedding_one.ctypes.data_as(POINTER(c_float)), embedding_one.shape[0],
+            embedding_two.ctypes.data_as(POINTER(c_float)), embedding_two.shape[0]))
+
+    def pair_distances(self, embeddings_a, embeddings_b) -> np.ndarray:
+        embeddings_a, embeddings_b = _as_pair_matrices(embeddings_a, embeddings_b)
+        with metrics.timed(STAGE_DISTANCE):
+            return np.fromiter((self.distance(a, b) for a, b in zip(embeddings_a, embeddings_b)),
+                               dtype=np.float32, count=embeddings_a.shape[0])
+
+
+class BatchedNativeDistanceBackend(NativeDistanceBackend):
+    """
+    tango_get_embeddings_distance over whole matrices. libtango has no batched entry point, so this
+    still makes one foreign call per pair, but converts the inputs once and passes raw row addresses
+    through a prototype without per-argument type conversion.
+    """
+    name = NATIVE_BATCHED
+
+    def __init__(self, native):
+        super().__init__(native)
+        self._function = None
+
+    def _raw_function(self):
+        if self._function is None:
+            library = self._native.load()._libtango
+            address = ctypes.cast(library.tango_get_embeddings_distance, c_void_p).value
+            self._function = ctypes.CFUNCTYPE(c_float, c_void_p, c_int, c_void_p, c_int)(address)
+        return self._function
+
+    def pair_distances(self, embeddings_a, embeddings_b) -> np.ndarray:
+        embeddings_a, embeddings_b = _as_pair_matrices(embeddings_a, embeddings_b)
+        function = self._raw_function()
+        count, dimension = embeddings_a.shape
+        stride = dimension * 4
+        address_a, address_b = embeddings_a.ctypes.data, embeddings_b.ctypes.data
+        distances = np.empty(count, dtype=np.float32)
+        with metrics.timed(STAGE_DISTANCE):
+            for row in range(count):
+                offset = row * stride
+                distances[row] = function(address_a + offset, dimension, address_b + offset, dimension)
+        return distances
+
+
+BACKENDS = {
+    NUMPY: NumpyDistanceBackend,
+    NATIVE: NativeDistanceBackend,
+    NATIVE_BATCHED: BatchedNativeDistanceBackend,
+}
+
+
+def create_distance_backend(name: str, native=None):
+    """
+    Create the backend registered as `name`.
+
+    Parameters
+    ----------
+    name : str
+        "numpy", "native" or "native_batched".
+
+    native : NativeMethods, optional
+        Library handle used by the native backends.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown distance backend {name!r}, expected one of {sorted(BACKENDS)}")
+    if name == NUMPY:
+        return NumpyDistanceBackend()
+    if native is None:
+        raise ValueError(f"The {name!r} distance backend needs a NativeMethods instance")
+    return BACKENDS[name](native)
+
+
+def select_fastest_backend(native=None, dimension: int = 128, pairs: int = 4096, repeat: int = 3):
+    """
+    Time every available backend on random pairs and return the fastest.
+
+    Backends that cannot run (e.g. the native library is missing) or whose distances differ from the
+    NumPy reference by more than 1e-4 relative are skipped.
+
+    Returns
+    -------
+    tuple
+        (name, timings) where timings maps each backend name to its best time per pair in seconds,
+        or None if it was skipped.
+    """
+    rng = np.random.default_rng(0)
+    embeddings_a = rng.random((pairs, dimension), dtype=np.float32)
+    embeddings_b = rng.random((pairs, dimension), dtype=np.float32)
+    reference = distance_utils.get_pair_distances(embeddings_a, embeddings_b)
+
+    timings = {}
+    for name in BACKENDS:
+        try:
+            backend = create_distance_backend(name, native)
+            distances = backend.pair_distances(embeddings_a, embeddings_b)
+        except (RuntimeError, OSError, AttributeError, ValueError):
+            timings[name] = None
+            continue
+        if not np.allclose(distances, reference, rtol=1e-4, atol=1e-5):
+            timings[name] = None
+            continue
+        best = float("inf")
+        for _ in range(repeat):
+            start_time = default_timer()
+            backend.pair_distances(embeddings_a, embeddings_b)
+            best = min(best, default_timer() - start_time)
+        timings[name] = best / pairs
+
+    fastest = min((name for name in timings if timings[name] is not None), key=timings.get)
+    return fastest, timings
+
+
+def _as_pair_matrices(embeddings_a, embeddings_b):
+    embeddings_a = distance_utils.as_embedding_matrix(embeddings_a)
+    embeddings_b = distance_utils.as_embedding_matrix(embeddings_b)
+    if embeddings_a.shape != embeddings_b.shape:
+        raise ValueError("Both sides of the pairs must have the same shape")
+    return embeddings_a, embeddings_b
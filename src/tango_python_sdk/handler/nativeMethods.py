@@ -1,23 +1,90 @@
+import hashlib
+import os
 import sys
 import platform
 import pathlib
 import ctypes
+import threading
 import numpy as np
 
 from ctypes import POINTER, c_uint8, c_int, c_float, c_bool, byref
 
+from .distance_backends import NumpyDistanceBackend, create_distance_backend
+from ..helper.metrics import STAGE_DISTANCE, STAGE_NATIVE_INFERENCE, STAGE_OUTPUT_CONVERSION, metrics
 
-class NativeMethods:
-    def __init__(self):
-        try:
-            self._library_path = pathlib.Path(__file__).parent.joinpath("lib")
 
-            if platform.system() == "Linux":
-                self._load_dependencies_for_linux()
+# Path of a library exporting the libtango ABI to load instead of the bundled one, e.g. the benchmark stub
+LIBRARY_PATH_ENV = "TANGO_LIBRARY_PATH"
+
+
+class NativeMethods:
+    # The native libraries are loaded once per process and shared by every instance
+    _shared_libtango = None
+    _load_lock = threading.Lock()
+    # Native embedding buffers handed out by tango_get_embedding and handed back with tango_free_embedding
+    _allocation_lock = threading.Lock()
+    _allocated = 0
+    _freed = 0
+    _model_identity = None
 
-            self._face_setup()
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize NativeMethods: {e}")
+    def __init__(self):
+        self._library_path = pathlib.Path(__file__).parent.joinpath("lib")
+        self._libtango = None
+        self.distance_backend = NumpyDistanceBackend()
+
+    def set_distance_backend(self, name: str) -> None:
+        """Compute distances with the backend registered as `name` in distance_backends.BACKENDS."""
+        self.distance_backend = create_distance_backend(name, self)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._libtango is not None or NativeMethods._shared_libtango is not None
+
+    def load(self):
+        """
+        Load OpenCV, TensorFlow Lite and libtango if this process has not done so yet.
+        If the TANGO_LIBRARY_PATH environment variable is set, only the library it names is loaded.
+        Called automatically on first use; call it explicitly to pay the cost up front, e.g. before forking.
+        """
+        if self._libtango is not None:
+            return self
+        with NativeMethods._load_lock:
+            if NativeMethods._shared_libtango is None:
+                try:
+                    library_override = os.environ.get(LIBRARY_PATH_ENV)
+                    if library_override:
+                        self._load_library(pathlib.Path(library_override))
+                    elif platform.system() == "Linux":
+                        self._load_dependencies_for_linux()
+
+                    self._face_setup()
+                except Exception as e:
+                    self._libtango = None
+                    raise RuntimeError(f"Failed to initialize NativeMethods: {e}")
+                NativeMethods._shared_libtango = self._libtango
+            self._libtango = NativeMethods._shared_libtango
+        return self
+
+    @classmethod
+    def model_identity(cls) -> str:
+        """
+        Digest of the libtango file this process loads (the TANGO_LIBRARY_PATH override or the bundled
+        library), so results of one model are never mistaken for another's. Computed once per process,
+        like the library is loaded once, and without loading it.
+        """
+        if cls._model_identity is None:
+            override = os.environ.get(LIBRARY_PATH_ENV)
+            path = pathlib.Path(override) if override else pathlib.Path(__file__).parent.joinpath("lib", "libtango.so")
+            digest = hashlib.blake2b(digest_size=16)
+            try:
+                with open(path, "rb") as fp:
+                    for block in iter(lambda: fp.read(1 << 20), b""):
+                        digest.update(block)
+            except OSError:
+                # Loading will fail as well; the path still keeps keys of different libraries apart
+                digest.update(os.fsencode(str(path)))
+            cls._model_identity = digest.hexdigest()
+        return cls._model_identity
 
     def _load_dependencies_for_linux(self):
         """Load necessary shared libraries for Linux."""
@@ -52,6 +119,8 @@ class NativeMethods:
         self._libtango.tango_get_embeddings_distance.restype = c_float
 
     def get_embedding(self,image: np.array):
+        self.load()
+
         # Ensure the image is in uint8 format
         if image.dtype != np.uint8:
             raise ValueError("Image should be of dtype uint8")
@@ -63,30 +132,54 @@ class NativeMethods:
         embedding_buffer_out = POINTER(c_float)()
         embedding_buffer_length_out = c_int()
 
-        result = self._libtango.tango_get_embedding(
-            image_bytes, image_width, image_height,
-            byref(embedding_buffer_out), byref(embedding_buffer_length_out)
-        )
+        with metrics.timed(STAGE_NATIVE_INFERENCE):
+            result = self._libtango.tango_get_embedding(
+                image_bytes, image_width, image_height,
+                byref(embedding_buffer_out), byref(embedding_buffer_length_out)
+            )
 
-        if result:
-            embedding_list = [embedding_buffer_out[i] for i in range(embedding_buffer_length_out.value)]
-            self._libtango.tango_free_embedding(embedding_buffer_out)
-            return embedding_list
-        else:
+        if not result:
             return None
-        
-    def get_distance(self, embedding_one: list, embedding_two: list) -> float:
-        # array_type_one = c_float * len(embedding_one)
-        # array_type_two = c_float * len(embedding_two)
-
-        # embedding_one_array = array_type_one(*embedding_one)
-        # embedding_two_array = array_type_two(*embedding_two)
-
-        # distance = self._libtango.tango_get_embeddings_distance(
-        #     embedding_one_array, len(embedding_one),
-        #     embedding_two_array, len(embedding_two)
-        # )
-
-        
-        # calculate euclidean distance
-        return np.linalg.norm(np.array(embedding_one) - np.array(embedding_two))
\ No newline at end of file
+        if not embedding_buffer_out:
+            # Success without a buffer: nothing to copy and nothing to free
+            return np.empty(0, dtype=np.float32)
+
+        # The buffer belongs to us from here on and is handed back to the library whatever happens
+        NativeMethods._track_allocation(1)
+        try:
+            with metrics.timed(STAGE_OUTPUT_CONVERSION):
+                # Copy the native buffer out in one go before handing it back to the library
+                embedding_length = embedding_buffer_length_out.value
+                if embedding_length > 0:
+                    return np.ctypeslib.as_array(embedding_buffer_out, shape=(embedding_length,)).astype(np.float32, copy=True)
+                return np.empty(0, dtype=np.float32)
+        finally:
+            self._libtango.tango_free_embedding(embedding_buffer_out)
+            NativeMethods._track_allocation(-1)
+
+    @classmethod
+    def _track_allocation(cls, change: int) -> None:
+        with cls._allocation_lock:
+            if change > 0:
+                cls._allocated += change
+            else:
+                cls._freed -= change
+
+    @classmethod
+    def allocation_stats(cls) -> dict:
+        """
+        Embedding buffers received from and returned to the native library by this process:
+        {"allocated", "freed", "outstanding"}. Outstanding is only non-zero while calls are in flight.
+        """
+        with cls._allocation_lock:
+            return {"allocated": cls._allocated, "freed": cls._freed, "outstanding": cls._allocated - cls._freed}
+
+    def get_distance(self, embedding_one: np.ndarray, embedding_two: np.ndarray) -> float:
+        # Euclidean distance through the selected backend, NumPy unless set_distance_backend was called
+        with metrics.timed(STAGE_DISTANCE):
+            return self.distance_backend.distance(embedding_one, embedding_two)
+
+    def get_pair_distances(self, embeddings_a: np.ndarray, embeddings_b: np.ndarray) -> np.ndarray:
+        # Distance of each row of embeddings_a to the same row of embeddings_b, in one call.
+        # Backends record their own distance timing here, so it is not timed twice.
+        return self.distance_backend.pair_distances(embeddings_a, embeddings_b)
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of embeddings.
+
+    Entries are keyed by a BLAKE2b digest of the encoded file bytes or of the decoded pixels, so the
+    same image hits the cache whatever path or object it arrives through. A bounded in-memory LRU
+    tier sits in front of an optional on-disk tier that survives restarts, so FaceFactor also puts the
+    identity of the native model into every key: a new libtango does not see the old one's embeddings.
+    Cached embeddings are returned as read-only arrays shared between callers.
+
+        Parameters
+        ----------
+        max_entries : int, optional
+            Capacity of the in-memory tier. The least recently used entry is evicted beyond it.
+
+        directory : str, optional
+            Directory of the on-disk tier. Disabled when omitted.
+
+        dimension : int, optional
+            Length of the embeddings. Disk entries of another length are treated as misses and deleted.
+            Learned from the first embedding stored or read when omitted.
+
+        Methods
+        -------
+        key_for_bytes
+        key_for_array
+        get
+        put
+        clear
+        stats
+    """
+
+    def __init__(self, max_entries: int = 10000, directory: str = None, dimension: int = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if dimension is not None and dimension < 1:
+            raise ValueError("dimension must be at least 1")
+        self._dimension = dimension
+        self._max_entries = max_entries
+        self._directory = os.fspath(directory) if directory is not None else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_hits = 0
+        self._disk_writes = 0
+        if self._directory is not None:
+            os.makedirs(self._directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key_for_bytes(data, *params) -> str:
+        """
+        Key for an encoded image. `params` are decode settings and the model, which change the resulting embedding.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(params).encode("utf-8"))
+        digest.update(data)
+        return "b" + digest.hexdigest()
+
+    @staticmethod
+    def key_for_array(array: np.ndarray, *params) -> str:
+        """
+        Key for decoded image data. Shape and dtype are part of the key, as are `params`, e.g. the model.
+        """
+        array = np.ascontiguousarray(array)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((array.shape, array.dtype.str) + params).encode("utf-8"))
+        digest.update(array.data)
+        return "a" + digest.hexdigest()
+
+    def get(self, key: str):
+        """
+        Returns the cached embedding for `key`, or None.
+        """
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return embedding
+
+        embedding = self._read_disk(key)
+        with self._lock:
+            if embedding is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+            self._remember(key, embedding)
+        return embedding
+
+    def put(self, key: str, embedding) -> np.ndarray:
+        """
+        Store an embedding under `key`. Returns the read-only array that was cached.
+        """
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        with self._lock:
+            if self._dimension is None and embedding.size:
+                self._dimension = embedding.size
+            self._remember(key, embedding)
+        self._write_disk(key, embedding)
+        return embedding
+
+    def clear(self) -> None:
+        """Empty the in-memory tier. The on-disk tier is left untouched."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the hit, miss and eviction counters.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "disk_hits": self._disk_hits,
+                "disk_writes": self._disk_writes,
+            }
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self._directory, key[1:3], key + ".f32")
+
+    def _read_disk(self, key: str):
+        if self._directory is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            embedding = np.fromfile(path, dtype="<f4")
+        except OSError:
+            return None
+        with self._lock:
+            if self._dimension is None and embedding.size:
+                self._dimension = embedding.size
+            valid = embedding.size != 0 and embedding.size == self._dimension
+        if not valid:
+            # Truncated or foreign file: drop it so the embedding is computed and written again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        embedding = embedding.astype(np.float32, copy=False)
+        embedding.flags.writeable = False
+        return embedding
+
+    def _write_disk(self, key: str, embedding: np.ndarray) -> None:
+        if self._directory is None:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed into place, so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            embedding.astype("<f4", copy=False).tofile(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._disk_writes += 1
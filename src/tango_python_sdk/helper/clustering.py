@@ -0,0 +1,113 @@
+import numpy as np
+
+from . import distance as distance_utils
+from .metrics import STAGE_DISTANCE, metrics
+
+# Tile of the implicit n x n distance matrix evaluated at a time: 1024 x 8192 float32 is 32 MB
+DEFAULT_ROW_BLOCK = 1024
+DEFAULT_COLUMN_BLOCK = 8192
+
+
+def threshold_components(embeddings, threshold: float, row_block: int = DEFAULT_ROW_BLOCK,
+                         column_block: int = DEFAULT_COLUMN_BLOCK) -> np.ndarray:
+    """
+    Connected components of the graph linking every two embeddings closer than `threshold`.
+
+    The upper triangle of the distance matrix is walked tile by tile and only the edges found in each
+    tile are kept, so memory is bounded by the tile size however many embeddings there are.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        Embeddings of shape (N, D).
+
+    threshold : float
+        Two embeddings are linked when their Euclidean distance is strictly below this.
+
+    row_block, column_block : int, optional
+        Tile shape.
+
+    Returns
+    -------
+    np.ndarray
+        int64 component label of each row, numbered from 0 in order of first appearance.
+    """
+    embeddings = distance_utils.as_embedding_matrix(embeddings)
+    if row_block < 1 or column_block < 1:
+        raise ValueError("Block sizes must be at least 1")
+    count = embeddings.shape[0]
+    parent = np.arange(count, dtype=np.int64)
+    if count == 0:
+        return parent
+
+    squared_threshold = float(threshold) ** 2
+    squared_norms = np.einsum("ij,ij->i", embeddings, embeddings)
+    # Bound on the float32 rounding error of ||a||^2 + ||b||^2 - 2 a.b, relative to ||a||^2 + ||b||^2
+    relative_error = 2 * (embeddings.shape[1] + 4) * float(np.finfo(np.float32).eps)
+    with metrics.timed(STAGE_DISTANCE):
+        for row_start in range(0, count, row_block):
+            rows = embeddings[row_start:row_start + row_block]
+            row_norms = squared_norms[row_start:row_start + row_block, None]
+            for column_start in range(row_start, count, column_block):
+                columns = embeddings[column_start:column_start + column_block]
+                column_norms = squared_norms[None, column_start:column_start + column_block]
+                tile = rows @ columns.T
+                tile *= -2.0
+                tile += row_norms
+                tile += column_norms
+                # The expansion cancels badly for near-identical rows: pairs within the rounding error
+                # of the threshold are decided again from their exact differences
+                margin = relative_error * (float(row_norms.max()) + float(column_norms.max()))
+                row_index, column_index = np.nonzero(tile < squared_threshold + margin)
+                uncertain = tile[row_index, column_index] > squared_threshold - margin
+                row_index += row_start
+                column_index += column_start
+                upper = row_index < column_index
+                row_index, column_index, uncertain = row_index[upper], column_index[upper], uncertain[upper]
+                if uncertain.any():
+                    exact = _squared_distances(embeddings, row_index[uncertain], column_index[uncertain])
+                    keep = np.ones(row_index.shape[0], dtype=bool)
+                    keep[uncertain] = exact < squared_threshold
+                    row_index, column_index = row_index[keep], column_index[keep]
+                if row_index.shape[0]:
+                    _union(parent, row_index, column_index)
+
+    roots = _find(parent, np.arange(count, dtype=np.int64))
+    _, first, labels = np.unique(roots, return_index=True, return_inverse=True)
+    # np.unique numbers roots in sorted order; renumber by first appearance
+    order = np.argsort(np.argsort(first))
+    return order[labels].astype(np.int64)
+
+
+def _squared_distances(embeddings: np.ndarray, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    # Exact squared distances of the given pairs, from float64 differences, a chunk of pairs at a time
+    result = np.empty(rows.shape[0], dtype=np.float64)
+    for start in range(0, rows.shape[0], DEFAULT_ROW_BLOCK):
+        stop = start + DEFAULT_ROW_BLOCK
+        difference = embeddings[rows[start:stop]].astype(np.float64) - embeddings[columns[start:stop]]
+        result[start:stop] = np.einsum("ij,ij->i", difference, difference)
+    return result
+
+
+def _find(parent: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    roots = parent[nodes]
+    while True:
+        next_roots = parent[roots]
+        if np.array_equal(next_roots, roots):
+            return roots
+        roots = next_roots
+
+
+def _union(parent: np.ndarray, nodes_a: np.ndarray, nodes_b: np.ndarray) -> None:
+    # Vectorized union-find: hook the larger root under the smaller one. Parents always point to smaller
+    # indices, so conflicting writes cannot create cycles; pairs left unmerged are retried.
+    while nodes_a.shape[0]:
+        roots_a = _find(parent, nodes_a)
+        roots_b = _find(parent, nodes_b)
+        differ = roots_a != roots_b
+        roots_a, roots_b = roots_a[differ], roots_b[differ]
+        nodes_a, nodes_b = nodes_a[differ], nodes_b[differ]
+        parent[np.maximum(roots_a, roots_b)] = np.minimum(roots_a, roots_b)
+        # Compress the touched paths so later finds stay short
+        parent[nodes_a] = _find(parent, nodes_a)
+        parent[nodes_b] = _find(parent, nodes_b)
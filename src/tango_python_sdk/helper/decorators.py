@@ -20,6 +20,9 @@
 import functools
 import warnings
 
+from .messages import Message
+from .metrics import metrics
+
 
 class Singleton(type):
     _instances = {}
@@ -61,3 +64,24 @@ def log_error(logger):
         return wrapped
 
     return decorated
+
+
+def record_outcome(operation, error_code):
+    """Count every result returned by the decorated method in the metrics registry, keyed by
+    `Message` code: 0 on success, the code of the result message if it is a known one, else `error_code`."""
+    messages = Message()
+
+    def decorated(f):
+        @functools.wraps(f)
+        def wrapped(*args, **kwargs):
+            result = f(*args, **kwargs)
+            if result.status == 0:
+                code = 0
+            else:
+                code = messages.get_code(result.message, error_code)
+            metrics.count_outcome(operation, code)
+            return result
+
+        return wrapped
+
+    return decorated
@@ -0,0 +1,191 @@
+import numpy as np
+
+from .metrics import STAGE_DISTANCE, metrics
+
+# Number of rows processed at a time, keeps temporaries at a few MB for typical embedding sizes
+DEFAULT_BLOCK_SIZE = 4096
+
+# Upper bound on the elements of one float64 tile of get_distance_matrix (32 MB)
+_MATRIX_BLOCK_ELEMENTS = 1 << 22
+
+
+def as_embedding_matrix(embeddings) -> np.ndarray:
+    """Return the embeddings as a 2-D C-contiguous float32 array, copying only when needed."""
+    matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.ndim != 2:
+        raise ValueError("Embeddings must be a 1-D vector or a 2-D matrix")
+    return matrix
+
+
+def as_embedding_vector(embedding) -> np.ndarray:
+    """Return the embedding as a 1-D float32 array, copying only when needed."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    if vector.ndim != 1:
+        raise ValueError("Embedding must be a 1-D vector")
+    return vector
+
+
+def get_distances(query, gallery, block_size: int = DEFAULT_BLOCK_SIZE) -> np.ndarray:
+    """
+    Euclidean distances between one embedding and every row of a gallery.
+
+    Parameters
+    ----------
+    query : np.ndarray or list
+        Embedding of shape (D,).
+
+    gallery : np.ndarray or list
+        Embeddings of shape (N, D).
+
+    block_size : int, optional
+        Number of gallery rows processed at a time.
+
+    Returns
+    -------
+    np.ndarray
+        float32 array of shape (N,).
+    """
+    query = as_embedding_vector(query)
+    gallery = as_embedding_matrix(gallery)
+    if gallery.shape[1] != query.shape[0]:
+        raise ValueError("Query and gallery embeddings must have the same length")
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+
+    with metrics.timed(STAGE_DISTANCE):
+        distances = np.empty(gallery.shape[0], dtype=np.float32)
+        for start in range(0, gallery.shape[0], block_size):
+            block = gallery[start:start + block_size] - query
+            np.sqrt(np.einsum("ij,ij->i", block, block), out=distances[start:start + block_size])
+    return distances
+
+
+def get_pair_distances(embeddings_a, embeddings_b, block_size: int = DEFAULT_BLOCK_SIZE) -> np.ndarray:
+    """
+    Euclidean distance between each row of `embeddings_a` and the same row of `embeddings_b`.
+
+    Parameters
+    ----------
+    embeddings_a, embeddings_b : np.ndarray or list
+        Embeddings of shape (N, D).
+
+    block_size : int, optional
+        Number of pairs processed at a time.
+
+    Returns
+    -------
+    np.ndarray
+        float32 array of shape (N,).
+    """
+    embeddings_a = as_embedding_matrix(embeddings_a)
+    embeddings_b = as_embedding_matrix(embeddings_b)
+    if embeddings_a.shape != embeddings_b.shape:
+        raise ValueError("Both sides of the pairs must have the same shape")
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+
+    with metrics.timed(STAGE_DISTANCE):
+        distances = np.empty(embeddings_a.shape[0], dtype=np.float32)
+        for start in range(0, embeddings_a.shape[0], block_size):
+            block = embeddings_a[start:start + block_size] - embeddings_b[start:start + block_size]
+            np.sqrt(np.einsum("ij,ij->i", block, block), out=distances[start:start + block_size])
+    return distances
+
+
+def get_distance_matrix(embeddings_a, embeddings_b, block_size: int = DEFAULT_BLOCK_SIZE) -> np.ndarray:
+    """
+    Euclidean distances between every row of `embeddings_a` and every row of `embeddings_b`.
+
+    Uses ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b so each block is one matrix product. The expansion
+    is accumulated in float64: in float32 it cancels badly for near-identical embeddings, which could
+    flip compare decisions against `get_distance`.
+
+    Parameters
+    ----------
+    embeddings_a : np.ndarray or list
+        Embeddings of shape (N, D).
+
+    embeddings_b : np.ndarray or list
+        Embeddings of shape (M, D).
+
+    block_size : int, optional
+        Number of rows of `embeddings_a` processed at a time. Columns of `embeddings_b` are processed
+        in blocks as well, so the float64 temporaries stay bounded.
+
+    Returns
+    -------
+    np.ndarray
+        float32 array of shape (N, M).
+    """
+    embeddings_a = as_embedding_matrix(embeddings_a)
+    embeddings_b = as_embedding_matrix(embeddings_b)
+    if embeddings_a.shape[1] != embeddings_b.shape[1]:
+        raise ValueError("Embeddings must have the same length")
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+
+    with metrics.timed(STAGE_DISTANCE):
+        distances = np.empty((embeddings_a.shape[0], embeddings_b.shape[0]), dtype=np.float32)
+        # Both the float64 copies of the row and column blocks and the tile stay within _MATRIX_BLOCK_ELEMENTS
+        dimension = max(embeddings_a.shape[1], 1)
+        rows = max(1, min(block_size, embeddings_a.shape[0], _MATRIX_BLOCK_ELEMENTS // dimension))
+        columns = max(1, _MATRIX_BLOCK_ELEMENTS // max(rows, dimension))
+        for start in range(0, embeddings_a.shape[0], rows):
+            block = embeddings_a[start:start + rows].astype(np.float64)
+            squared_norms = np.einsum("ij,ij->i", block, block)[:, None]
+            for column_start in range(0, embeddings_b.shape[0], columns):
+                # Cast one column block at a time so no float64 copy of the whole of B is made
+                column_block = embeddings_b[column_start:column_start + columns].astype(np.float64)
+                squared = np.dot(block, column_block.T)
+                squared *= -2.0
+                squared += squared_norms
+                squared += np.einsum("ij,ij->i", column_block, column_block)[None, :]
+                # Rounding can still make the squared distance of identical rows slightly negative
+                np.maximum(squared, 0.0, out=squared)
+                np.sqrt(squared, out=squared)
+                distances[start:start + rows, column_start:column_start + columns] = squared
+    return distances
+
+
+def top_k(query, gallery, k: int, block_size: int = DEFAULT_BLOCK_SIZE):
+    """
+    The `k` gallery rows closest to the query.
+
+    Uses a partial selection (np.argpartition) and only sorts the selected rows.
+
+    Parameters
+    ----------
+    query : np.ndarray or list
+        Embedding of shape (D,).
+
+    gallery : np.ndarray or list
+        Embeddings of shape (N, D).
+
+    k : int
+        Number of neighbours to return. Capped at N.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        (indices, distances), both of shape (min(k, N),), ordered from closest to farthest.
+    """
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    distances = get_distances(query, gallery, block_size=block_size)
+    return select_top_k(distances, k)
+
+
+def select_top_k(distances: np.ndarray, k: int):
+    """Indices and values of the `k` smallest distances, sorted ascending."""
+    k = min(k, distances.shape[0])
+    if k == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    if k < distances.shape[0]:
+        indices = np.argpartition(distances, k - 1)[:k]
+    else:
+        indices = np.arange(distances.shape[0])
+    order = np.argsort(distances[indices], kind="stable")
+    indices = indices[order]
+    return indices, distances[indices]
@@ -0,0 +1,154 @@
+import threading
+from timeit import default_timer
+from typing import Callable, Iterable, Iterator, Tuple
+
+import numpy as np
+
+# Longest side of the thumbnails compared to detect unchanged frames
+THUMBNAIL_SIZE = 32
+
+
+def frame_thumbnail(frame: np.ndarray, size: int = THUMBNAIL_SIZE) -> np.ndarray:
+    """
+    Cheap grayscale thumbnail of a frame for change detection: strided sampling, no filtering,
+    so the cost is a few thousand pixel reads whatever the frame size.
+    """
+    step = max(1, max(frame.shape[0], frame.shape[1]) // size)
+    sampled = frame[::step, ::step]
+    if sampled.ndim == 3:
+        return sampled[..., :3].mean(axis=2, dtype=np.float32)
+    return sampled.astype(np.float32)
+
+
+class FrameStreamStats:
+    """Frame counters of a FrameStream."""
+    __slots__ = ("received", "embedded", "skipped_rate", "skipped_unchanged", "dropped_stale")
+
+    def __init__(self):
+        self.received = 0
+        self.embedded = 0
+        self.skipped_rate = 0
+        self.skipped_unchanged = 0
+        self.dropped_stale = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FrameStream:
+    """
+    Iterator embedding a subset of a stream of frames.
+
+    A frame is embedded only if at least 1 / `target_fps` seconds have passed since the last embedded
+    frame and its thumbnail differs from that frame's thumbnail by at least `min_change` (mean absolute
+    difference, 0-255 scale).
+
+    In live mode (`source_fps` is None) frames are read on a background thread and only the newest one
+    is kept: frames that arrive while inference is busy are dropped as stale, so latency stays bounded by
+    one inference instead of growing with a backlog. Time is wall-clock time.
+
+    With `source_fps` set, frames are treated as a recording: they are read in step with inference,
+    none are dropped, and time is the frame index divided by `source_fps`.
+
+    Iterating yields `(frame_index, result)` pairs; `stats` counts what happened to every frame.
+    """
+
+    def __init__(self, frames: Iterable[np.ndarray], embed: Callable, target_fps: float = None,
+                 min_change: float = 2.0, source_fps: float = None):
+        if target_fps is not None and target_fps <= 0:
+            raise ValueError("target_fps must be positive")
+        if source_fps is not None and source_fps <= 0:
+            raise ValueError("source_fps must be positive")
+        self._frames = frames
+        self._embed = embed
+        self._interval = 1.0 / target_fps if target_fps else 0.0
+        self._min_change = min_change
+        self._source_fps = source_fps
+        self._stop = threading.Event()
+        self._iterator = None
+        self.stats = FrameStreamStats()
+
+    def __iter__(self):
+        if self._iterator is None:
+            self._iterator = self._run()
+        return self._iterator
+
+    def __next__(self):
+        return next(iter(self))
+
+    def close(self) -> None:
+        """Stop reading frames."""
+        self._stop.set()
+        if self._iterator is not None:
+            self._iterator.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _run(self) -> Iterator[Tuple[int, object]]:
+        source = self._recorded_frames() if self._source_fps else self._latest_frames()
+        last_time, last_thumbnail = None, None
+        try:
+            for index, timestamp, frame in source:
+                # The tolerance keeps frame-index timestamps (e.g. 6 / 30 vs 1 / 5) from rounding below the interval
+                if last_time is not None and timestamp - last_time < self._interval - 1e-9:
+                    self.stats.skipped_rate += 1
+                    continue
+                thumbnail = frame_thumbnail(frame) if self._min_change > 0 else None
+                if (thumbnail is not None and last_thumbnail is not None and thumbnail.shape == last_thumbnail.shape
+                        and np.abs(thumbnail - last_thumbnail).mean() < self._min_change):
+                    self.stats.skipped_unchanged += 1
+                    continue
+                last_time, last_thumbnail = timestamp, thumbnail
+                self.stats.embedded += 1
+                yield index, self._embed(frame)
+        finally:
+            self._stop.set()
+            source.close()
+
+    def _recorded_frames(self):
+        for index, frame in enumerate(self._frames):
+            self.stats.received += 1
+            yield index, index / self._source_fps, frame
+
+    def _latest_frames(self):
+        condition = threading.Condition()
+        slot = {"frame": None, "done": False, "error": None}
+
+        def read():
+            try:
+                for index, frame in enumerate(self._frames):
+                    with condition:
+                        self.stats.received += 1
+                        if slot["frame"] is not None:
+                            self.stats.dropped_stale += 1
+                        slot["frame"] = (index, default_timer(), frame)
+                        condition.notify()
+                    if self._stop.is_set():
+                        break
+            except Exception as e:
+                slot["error"] = e
+            finally:
+                with condition:
+                    slot["done"] = True
+                    condition.notify()
+
+        # Daemon: a camera read blocked forever must not keep the interpreter alive
+        reader = threading.Thread(target=read, name="tango-frames", daemon=True)
+        reader.start()
+        try:
+            while True:
+                with condition:
+                    while slot["frame"] is None and not slot["done"]:
+                        condition.wait()
+                    item, slot["frame"] = slot["frame"], None
+                    if item is None:
+                        break
+                yield item
+            if slot["error"] is not None:
+                raise slot["error"]
+        finally:
+            self._stop.set()
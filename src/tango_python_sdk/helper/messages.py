@@ -33,8 +33,16 @@ class Message:
             105: "Error Description: Something went wrong while initializing.",
             107: self.EXCEPTION_ERROR_GET_DISTANCE,
             108: self.EXCEPTION_ERROR_GET_EMB,
-            109: "Error Description: Incorrect Usage."
+            109: "Error Description: Incorrect Usage.",
+            110: self.EXCEPTION_ERROR_COMPARE
         }
 
     def get_message(self, code):
         return self.APP_MESSAGES[code]
+
+    def get_code(self, message, default=None):
+        """Returns the code of a known message, `default` otherwise."""
+        for code, text in self.APP_MESSAGES.items():
+            if text == message:
+                return code
+        return default
@@ -0,0 +1,163 @@
+import bisect
+import threading
+from contextlib import contextmanager
+from timeit import default_timer
+from typing import Callable
+
+# Stage names recorded by the SDK
+STAGE_FILE_READ = "file_read"
+STAGE_DECODE = "decode"
+STAGE_COLOR_CONVERSION = "color_conversion"
+STAGE_NATIVE_INFERENCE = "native_inference"
+STAGE_OUTPUT_CONVERSION = "output_conversion"
+STAGE_DISTANCE = "distance"
+
+# Histogram bucket upper bounds in seconds, from 50 microseconds to 10 seconds
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * (bucket_count + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    Per-stage durations and per-outcome counts for the SDK hot path.
+
+    Durations go into fixed-bucket histograms, outcomes into counters keyed by operation and `Message`
+    code. Hooks receive every observation as it happens, for forwarding to another metrics system.
+    `to_prometheus` renders the Prometheus text exposition format; `opentelemetry_hooks` bridges to an
+    OpenTelemetry meter.
+
+        Methods
+        -------
+        timed
+        observe
+        count_outcome
+        add_duration_hook
+        add_outcome_hook
+        snapshot
+        reset
+        to_prometheus
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, enabled: bool = True):
+        self.enabled = enabled
+        self._buckets = tuple(sorted(buckets))
+        self._histograms = {}
+        self._outcomes = {}
+        # Replaced, never mutated, so recording can iterate them without taking the lock
+        self._duration_hooks = ()
+        self._outcome_hooks = ()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Context manager recording the duration of its body under `stage`."""
+        if not self.enabled:
+            yield
+            return
+        start_time = default_timer()
+        try:
+            yield
+        finally:
+            self.observe(stage, default_timer() - start_time)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one duration for `stage`."""
+        if not self.enabled:
+            return
+        index = bisect.bisect_left(self._buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _Histogram(len(self._buckets))
+            histogram.counts[index] += 1
+            histogram.total += seconds
+            histogram.count += 1
+        for hook in self._duration_hooks:
+            hook(stage, seconds)
+
+    def count_outcome(self, operation: str, code: int) -> None:
+        """Count one result of `operation` with the given `Message` code."""
+        if not self.enabled:
+            return
+        key = (operation, code)
+        with self._lock:
+            self._outcomes[key] = self._outcomes.get(key, 0) + 1
+        for hook in self._outcome_hooks:
+            hook(operation, code)
+
+    def add_duration_hook(self, hook: Callable[[str, float], None]) -> None:
+        """Call `hook(stage, seconds)` for every recorded duration."""
+        with self._lock:
+            self._duration_hooks = self._duration_hooks + (hook,)
+
+    def add_outcome_hook(self, hook: Callable[[str, int], None]) -> None:
+        """Call `hook(operation, code)` for every counted outcome."""
+        with self._lock:
+            self._outcome_hooks = self._outcome_hooks + (hook,)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current values as plain data:
+        {"stages": {stage: {"count", "sum", "buckets": [(upper bound, cumulative count), ...]}},
+         "outcomes": {(operation, code): count}}
+        """
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._histograms.items():
+                cumulative, buckets = 0, []
+                for bound, count in zip(self._buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    buckets.append((bound, cumulative))
+                stages[stage] = {"count": histogram.count, "sum": histogram.total, "buckets": buckets}
+            return {"stages": stages, "outcomes": dict(self._outcomes)}
+
+    def reset(self) -> None:
+        """Drop all recorded values. Hooks are kept."""
+        with self._lock:
+            self._histograms.clear()
+            self._outcomes.clear()
+
+    def to_prometheus(self, prefix: str = "tango") -> str:
+        """Render the registry in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Time spent in each SDK stage.",
+            f"# TYPE {prefix}_stage_duration_seconds histogram",
+        ]
+        for stage, values in sorted(snapshot["stages"].items()):
+            for bound, cumulative in values["buckets"]:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{stage}"}} {values["sum"]!r}')
+            lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{stage}"}} {values["count"]}')
+        lines.append(f"# HELP {prefix}_outcomes_total Results returned, by operation and message code.")
+        lines.append(f"# TYPE {prefix}_outcomes_total counter")
+        for (operation, code), count in sorted(snapshot["outcomes"].items()):
+            lines.append(f'{prefix}_outcomes_total{{operation="{operation}",code="{code}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def opentelemetry_hooks(meter, registry: "MetricsRegistry" = None, prefix: str = "tango") -> None:
+    """
+    Forward observations to OpenTelemetry instruments created from `meter`
+    (an `opentelemetry.metrics.Meter`). The opentelemetry package itself is not imported here.
+    """
+    registry = registry if registry is not None else metrics
+    durations = meter.create_histogram(f"{prefix}.stage.duration", unit="s",
+                                       description="Time spent in each SDK stage.")
+    outcomes = meter.create_counter(f"{prefix}.outcomes", description="Results returned, by operation and message code.")
+    registry.add_duration_hook(lambda stage, seconds: durations.record(seconds, {"stage": stage}))
+    registry.add_outcome_hook(lambda operation, code: outcomes.add(1, {"operation": operation, "code": code}))
+
+
+# Process-wide registry the SDK records into
+metrics = MetricsRegistry()
@@ -0,0 +1,139 @@
+import glob
+import os
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+# How long blocked workers wait before re-checking whether the consumer went away
+_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class _Failed:
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def iter_image_paths(source: Union[str, os.PathLike, Iterable]) -> Iterator[str]:
+    """
+    Expand a pipeline source into image paths, lazily.
+
+    A directory is walked recursively for files with an image extension, a string containing glob
+    characters is expanded with `glob.iglob`, any other path is returned as is and any other iterable
+    is iterated.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif any(char in source for char in "*?["):
+            yield from glob.iglob(source, recursive=True)
+        else:
+            yield source
+        return
+    for path in source:
+        yield os.fspath(path)
+
+
+def _put(target: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(source: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return source.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_stages(items: Iterable[Tuple[object, object]],
+               stages: List[Tuple[Callable, int]],
+               queue_size: int,
+               on_error: Callable) -> Iterator[Tuple[object, object]]:
+    """
+    Run `(key, value)` items through a chain of threaded stages connected by bounded queues.
+
+    Each stage is a `(function, workers)` pair; `function` maps a value to the next stage's value.
+    Bounded queues make slow stages apply backpressure to faster ones, so at most about
+    `queue_size` items per stage are in flight. Results are yielded in completion order.
+    A stage that raises hands the exception to `on_error(key, exception)`, whose return value is
+    yielded in place of a result; later stages skip the item.
+
+    Closing the generator early stops all workers.
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    remaining = [workers for _, workers in stages]
+    remaining_lock = threading.Lock()
+
+    def feed():
+        try:
+            for item in items:
+                if not _put(queues[0], item, stop):
+                    return
+        except Exception as e:
+            _put(queues[0], (None, _Failed(e)), stop)
+        for _ in range(stages[0][1]):
+            _put(queues[0], _DONE, stop)
+
+    def work(index: int, function: Callable):
+        source, target = queues[index], queues[index + 1]
+        while True:
+            item = _get(source, stop)
+            if item is _DONE:
+                break
+            key, value = item
+            if not isinstance(value, _Failed):
+                try:
+                    value = function(value)
+                except Exception as e:
+                    value = _Failed(e)
+            if not _put(target, (key, value), stop):
+                return
+        with remaining_lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last:
+            downstream = stages[index + 1][1] if index + 1 < len(stages) else 1
+            for _ in range(downstream):
+                _put(target, _DONE, stop)
+
+    threads = [threading.Thread(target=feed, name="tango-pipeline-feed", daemon=True)]
+    for index, (function, workers) in enumerate(stages):
+        if workers < 1:
+            raise ValueError("Every stage needs at least one worker")
+        threads.extend(threading.Thread(target=work, args=(index, function), name=f"tango-pipeline-{index}", daemon=True)
+                       for _ in range(workers))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            key, value = item
+            if isinstance(value, _Failed):
+                value = on_error(key, value.error)
+            yield key, value
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
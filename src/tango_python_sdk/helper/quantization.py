@@ -0,0 +1,142 @@
+import numpy as np
+
+from . import distance as distance_utils
+from .metrics import STAGE_DISTANCE, metrics
+
+FLOAT32 = "float32"
+FLOAT16 = "float16"
+INT8 = "int8"
+SCHEMES = (FLOAT32, FLOAT16, INT8)
+
+_INT8_MAX = 127
+
+
+def quantize(embeddings, scheme: str):
+    """
+    Convert embeddings to a compact representation.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray or list
+        Embeddings of shape (N, D) or a single embedding of shape (D,).
+
+    scheme : str
+        "float32" (no-op), "float16" (2 bytes per value) or "int8" (1 byte per value plus one float32
+        scale per vector; values are rounded to the nearest multiple of max(|x|) / 127).
+
+    Returns
+    -------
+    tuple
+        (codes, scales). `scales` is a float32 array of shape (N,) for "int8" and None otherwise.
+    """
+    matrix = distance_utils.as_embedding_matrix(embeddings)
+    if scheme == FLOAT32:
+        return matrix, None
+    if scheme == FLOAT16:
+        return matrix.astype(np.float16), None
+    if scheme == INT8:
+        scales = np.abs(matrix).max(axis=1) / _INT8_MAX
+        scales[scales == 0] = 1.0
+        codes = np.rint(matrix / scales[:, None])
+        np.clip(codes, -_INT8_MAX, _INT8_MAX, out=codes)
+        return codes.astype(np.int8), scales.astype(np.float32)
+    raise ValueError(f"Unknown quantization scheme {scheme!r}, expected one of {SCHEMES}")
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray = None) -> np.ndarray:
+    """Convert quantized embeddings back to float32."""
+    matrix = np.asarray(codes).astype(np.float32)
+    if scales is not None:
+        matrix *= np.asarray(scales, dtype=np.float32).reshape(-1, 1)
+    return matrix
+
+
+def quantized_distances(query, codes: np.ndarray, scales: np.ndarray = None,
+                        block_size: int = distance_utils.DEFAULT_BLOCK_SIZE) -> np.ndarray:
+    """
+    Euclidean distances between a float32 query and quantized gallery rows.
+
+    Rows are widened to float32 one block at a time, so memory traffic is that of the compact
+    representation and temporaries stay bounded.
+
+    Returns
+    -------
+    np.ndarray
+        float32 array of shape (N,).
+    """
+    query = distance_utils.as_embedding_vector(query)
+    if codes.ndim != 2 or codes.shape[1] != query.shape[0]:
+        raise ValueError("Query and gallery embeddings must have the same length")
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+
+    with metrics.timed(STAGE_DISTANCE):
+        distances = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], block_size):
+            block = codes[start:start + block_size].astype(np.float32)
+            if scales is not None:
+                block *= scales[start:start + block_size, None]
+            block -= query
+            np.sqrt(np.einsum("ij,ij->i", block, block), out=distances[start:start + block_size])
+    return distances
+
+
+def bytes_per_embedding(dimension: int, scheme: str) -> int:
+    """Storage size of one embedding under `scheme`."""
+    if scheme == FLOAT32:
+        return dimension * 4
+    if scheme == FLOAT16:
+        return dimension * 2
+    if scheme == INT8:
+        return dimension + 4
+    raise ValueError(f"Unknown quantization scheme {scheme!r}, expected one of {SCHEMES}")
+
+
+def threshold_agreement(embeddings, scheme: str, threshold: float = None) -> dict:
+    """
+    Measure how often a quantized representation reaches the same match decision as float32.
+
+    Every pair of rows of `embeddings` is compared once with float32 distances and once after
+    quantization, using the `Face.compare` rule (distance < threshold).
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        Real embeddings of shape (N, D), N >= 2, e.g. produced from tests/example/test_images.
+
+    scheme : str
+        Quantization scheme to evaluate.
+
+    threshold : float, optional
+        Defaults to `Face.COMPARE_THRESHOLD`.
+
+    Returns
+    -------
+    dict
+        pairs, agreement (fraction of pairs with the same decision), disagreements, max_abs_error,
+        mean_abs_error, bytes_per_embedding and compression (relative to float32).
+    """
+    if threshold is None:
+        from ..factor_modules.FaceModule import Face
+        threshold = Face.COMPARE_THRESHOLD
+
+    matrix = distance_utils.as_embedding_matrix(embeddings)
+    if matrix.shape[0] < 2:
+        raise ValueError("At least two embeddings are needed")
+    reference = distance_utils.get_distance_matrix(matrix, matrix)
+    approximate = distance_utils.get_distance_matrix(dequantize(*quantize(matrix, scheme)), matrix)
+    # Quantized gallery against float32 probes, as in 1:N search
+    rows, columns = np.triu_indices(matrix.shape[0], k=1)
+    reference, approximate = reference[rows, columns], approximate[rows, columns]
+    errors = np.abs(approximate - reference)
+    disagreements = int(np.count_nonzero((reference < threshold) != (approximate < threshold)))
+    return {
+        "scheme": scheme,
+        "pairs": int(reference.shape[0]),
+        "agreement": 1.0 - disagreements / reference.shape[0],
+        "disagreements": disagreements,
+        "max_abs_error": float(errors.max()),
+        "mean_abs_error": float(errors.mean()),
+        "bytes_per_embedding": bytes_per_embedding(matrix.shape[1], scheme),
+        "compression": bytes_per_embedding(matrix.shape[1], FLOAT32) / bytes_per_embedding(matrix.shape[1], scheme),
+    }
@@ -0,0 +1,100 @@
+import numpy as np
+
+from .GetEmbeddingResult import GetEmbeddingResult
+
+
+class BatchEmbeddingResult:
+    """
+    Result handler for get_embeddings_batch
+
+    Holds the whole batch column-wise: one (N, D) float32 matrix and per-image status and code arrays,
+    instead of N GetEmbeddingResult objects. Rows of failed images are zero; use `valid` to select
+    the others.
+    """
+    __slots__ = ("_status", "_embeddings", "_statuses", "_codes", "_messages", "_message")
+
+    CALL_STATUS_SUCCESS = 0
+    CALL_STATUS_ERROR = -1
+
+    def __init__(self, embeddings=None, statuses=None, codes=None, messages=None, status=CALL_STATUS_ERROR, message=""):
+        self._status = status
+        self._embeddings = embeddings
+        self._statuses = statuses
+        self._codes = codes
+        self._messages = messages if messages is not None else {}
+        self._message = message
+
+    @property
+    def status(self) -> int:
+        """
+        Returns the status of the operation
+
+        0 - If every image was embedded
+
+        -1 - If at least one image failed
+
+        """
+        return self._status
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """
+        Returns the embeddings as a float32 matrix of shape (N, D), in input order
+        """
+        return self._embeddings
+
+    @property
+    def statuses(self) -> np.ndarray:
+        """
+        Returns the status of each image as an int8 array of shape (N,)
+        """
+        return self._statuses
+
+    @property
+    def codes(self) -> np.ndarray:
+        """
+        Returns the `Message` code of each image as an int32 array of shape (N,), 0 on success
+        """
+        return self._codes
+
+    @property
+    def valid(self) -> np.ndarray:
+        """
+        Returns a boolean mask of the images that were embedded
+        """
+        return self._statuses == self.CALL_STATUS_SUCCESS
+
+    @property
+    def messages(self) -> dict:
+        """
+        Returns the messages of failed images, keyed by index
+        """
+        return self._messages
+
+    @property
+    def message(self) -> str:
+        """
+        Returns the message of the operation
+        """
+        return self._message
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+
+    @message.setter
+    def message(self, value):
+        self._message = value
+
+    def __len__(self) -> int:
+        return 0 if self._statuses is None else self._statuses.shape[0]
+
+    def __getitem__(self, index: int) -> GetEmbeddingResult:
+        """Returns image `index` as a GetEmbeddingResult; the embedding is a view into the matrix."""
+        if not -len(self) <= index < len(self):
+            raise IndexError("BatchEmbeddingResult index out of range")
+        index = index % len(self)
+        if self._statuses[index] == self.CALL_STATUS_SUCCESS:
+            return GetEmbeddingResult(embedding=self._embeddings[index], status=GetEmbeddingResult.CALL_STATUS_SUCCESS,
+                                      message="OK")
+        return GetEmbeddingResult(message=self._messages.get(index, ""))
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class ClusterResult:
+    __slots__ = ("_status", "_labels", "_message")
+
+    CALL_STATUS_SUCCESS = 0
+    CALL_STATUS_ERROR = -1
+
+    def __init__(self, labels=None, status=CALL_STATUS_ERROR, message=""):
+        """Result handler for cluster"""
+        self._status = status
+        self._labels = labels
+        self._message = message
+
+    @property
+    def status(self) -> int:
+        """
+        Returns the status of the operation
+
+        0 - If successfully obtained result
+
+        -1 - In case of error
+
+        """
+        return self._status
+
+    @property
+    def labels(self) -> np.ndarray:
+        """
+        Returns the cluster label of each image as an int64 array, -1 for images that failed
+        """
+        return self._labels
+
+    @property
+    def groups(self) -> list:
+        """
+        Returns the clusters with more than one image, as arrays of input indices
+        """
+        if self._labels is None:
+            return []
+        order = np.argsort(self._labels, kind="stable")
+        labels = self._labels[order]
+        boundaries = np.flatnonzero(np.diff(labels)) + 1
+        return [group for group in np.split(order, boundaries) if group.shape[0] > 1 and self._labels[group[0]] >= 0]
+
+    @property
+    def message(self) -> str:
+        """
+        Returns the message of the operation
+        """
+        return self._message
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+
+    @message.setter
+    def message(self, value):
+        self._message = value
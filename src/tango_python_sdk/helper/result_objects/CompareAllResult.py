@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class CompareAllResult:
+    __slots__ = ("_status", "_distances", "_is_similar", "_valid", "_message")
+
+    CALL_STATUS_SUCCESS = 0
+    CALL_STATUS_ERROR = -1
+
+    def __init__(self, distances=None, is_similar=None, valid=None, status=CALL_STATUS_ERROR, message=""):
+        """Result handler for compare_all"""
+        self._status = status
+        self._distances = distances
+        self._is_similar = is_similar
+        self._valid = valid
+        self._message = message
+
+    @property
+    def status(self) -> int:
+        """
+        Returns the status of the operation
+
+        0 - If successfully obtained result
+
+        -1 - In case of error
+
+        """
+        return self._status
+
+    @property
+    def distances(self) -> np.ndarray:
+        """
+        Returns the (N, N) float32 distance matrix, NaN in rows and columns of images that failed
+        """
+        return self._distances
+
+    @property
+    def is_similar(self) -> np.ndarray:
+        """
+        Returns the (N, N) boolean matrix of pairs below the compare threshold
+        """
+        return self._is_similar
+
+    @property
+    def valid(self) -> np.ndarray:
+        """
+        Returns a boolean mask of the images that were embedded
+        """
+        return self._valid
+
+    @property
+    def message(self) -> str:
+        """
+        Returns the message of the operation
+        """
+        return self._message
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+
+    @message.setter
+    def message(self, value):
+        self._message = value
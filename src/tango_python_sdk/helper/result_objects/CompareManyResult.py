@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class CompareManyResult:
+    __slots__ = ("_status", "_distances", "_is_similar", "_message")
+
+    CALL_STATUS_SUCCESS = 0
+    CALL_STATUS_ERROR = -1
+
+    def __init__(self, distances=None, is_similar=None, status=CALL_STATUS_ERROR, message=""):
+        """Result handler for compare_many"""
+        self._status = status
+        self._distances = distances
+        self._is_similar = is_similar
+        self._message = message
+
+    @property
+    def status(self) -> int:
+        """
+        Returns the status of the operation
+
+        0 - If successfully obtained result
+
+        -1 - In case of error
+
+        """
+        return self._status
+
+    @property
+    def distances(self) -> np.ndarray:
+        """
+        Returns the distance of each pair as a float32 array of shape (N,)
+        """
+        return self._distances
+
+    @property
+    def is_similar(self) -> np.ndarray:
+        """
+        Returns a boolean array of shape (N,), True where the pair is below the compare threshold
+        """
+        return self._is_similar
+
+    @property
+    def message(self) -> str:
+        """
+        Returns the message of the operation
+        """
+        return self._message
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+
+    @distances.setter
+    def distances(self, value):
+        self._distances = value
+
+    @is_similar.setter
+    def is_similar(self, value):
+        self._is_similar = value
+
+    @message.setter
+    def message(self, value):
+        self._message = value
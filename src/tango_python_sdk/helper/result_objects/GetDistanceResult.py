@@ -1,4 +1,6 @@
 class GetDistanceResult:
+    __slots__ = ("_status", "_distance", "_message")
+
     CALL_STATUS_SUCCESS = 0
     CALL_STATUS_ERROR = -1
 
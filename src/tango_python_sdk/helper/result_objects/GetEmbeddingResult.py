@@ -1,4 +1,9 @@
+import numpy as np
+
+
 class GetEmbeddingResult:
+    __slots__ = ("_status", "_embedding", "_message")
+
     CALL_STATUS_SUCCESS = 0
     CALL_STATUS_ERROR = -1
 
@@ -21,12 +26,48 @@ class GetEmbeddingResult:
         return self._status
 
     @property
-    def embedding(self) -> list:
+    def embedding(self) -> np.ndarray:
         """
-        Returns the embedding obtained from the operation
+        Returns the embedding obtained from the operation as a float32 numpy array
         """
         return self._embedding
 
+    @property
+    def embedding_list(self) -> list:
+        """
+        Returns the embedding obtained from the operation as a list of floats
+
+        Kept for backward compatibility with callers that expect a list.
+        """
+        if self._embedding is None:
+            return None
+        return np.asarray(self._embedding).tolist()
+
+    def to_bytes(self, scheme: str = "float32", checksum: bool = False) -> bytes:
+        """
+        Returns the embedding in the binary container of helper.wire_format: a 24-byte header followed
+        by little-endian float32 values, or float16 / int8 codes with `scheme`. About 4-5x smaller than
+        JSON, and exact for float32.
+        """
+        from ..wire_format import encode_embeddings
+
+        if self._embedding is None:
+            raise ValueError(f"No embedding to serialize: {self._message}")
+        return encode_embeddings(np.asarray(self._embedding).reshape(1, -1), scheme=scheme, checksum=checksum)
+
+    @classmethod
+    def from_bytes(cls, data, verify: bool = True) -> "GetEmbeddingResult":
+        """
+        Returns a successful result holding the embedding of a container made by `to_bytes`.
+        A float32 embedding is a read-only view of `data`, not a copy.
+        """
+        from ..wire_format import WireFormatError, decode_embeddings
+
+        embeddings = decode_embeddings(data, verify=verify)
+        if embeddings.shape[0] != 1:
+            raise WireFormatError(f"Expected one embedding, the container holds {embeddings.shape[0]}")
+        return cls(embedding=embeddings[0], status=cls.CALL_STATUS_SUCCESS, message="OK")
+
     @property
     def message(self) -> str:
         """
@@ -0,0 +1,61 @@
+class IdentifyResult:
+    __slots__ = ("_status", "_ids", "_distances", "_message")
+
+    CALL_STATUS_SUCCESS = 0
+    CALL_STATUS_ERROR = -1
+
+    def __init__(self, ids=None, distances=None, status=CALL_STATUS_ERROR, message=""):
+        """Result handler for identify"""
+        self._status = status
+        self._ids = ids
+        self._distances = distances
+        self._message = message
+
+    @property
+    def status(self) -> int:
+        """
+        Returns the status of the operation
+
+        0 - If successfully obtained result
+
+        -1 - In case of error
+
+        """
+        return self._status
+
+    @property
+    def ids(self):
+        """
+        Returns the ids of the matching enrolled embeddings, closest first
+        """
+        return self._ids
+
+    @property
+    def distances(self):
+        """
+        Returns the distances matching `ids`
+        """
+        return self._distances
+
+    @property
+    def message(self) -> str:
+        """
+        Returns the message of the operation
+        """
+        return self._message
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+
+    @ids.setter
+    def ids(self, value):
+        self._ids = value
+
+    @distances.setter
+    def distances(self, value):
+        self._distances = value
+
+    @message.setter
+    def message(self, value):
+        self._message = value
@@ -0,0 +1,34 @@
+from .IdentifyResult import IdentifyResult
+
+
+class ShardedIdentifyResult(IdentifyResult):
+    __slots__ = ("_partial", "_failed_shards")
+
+    def __init__(self, ids=None, distances=None, partial=False, failed_shards=None, status=IdentifyResult.CALL_STATUS_ERROR,
+                 message=""):
+        """Result handler for ShardedGallery.identify"""
+        super().__init__(ids=ids, distances=distances, status=status, message=message)
+        self._partial = partial
+        self._failed_shards = failed_shards if failed_shards is not None else []
+
+    @property
+    def partial(self) -> bool:
+        """
+        Returns True if some shards timed out or failed, so matches held by them may be missing
+        """
+        return self._partial
+
+    @property
+    def failed_shards(self) -> list:
+        """
+        Returns the indices of the shards missing from the result
+        """
+        return self._failed_shards
+
+    @partial.setter
+    def partial(self, value):
+        self._partial = value
+
+    @failed_shards.setter
+    def failed_shards(self, value):
+        self._failed_shards = value
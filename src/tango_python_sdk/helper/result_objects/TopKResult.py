@@ -0,0 +1,61 @@
+class TopKResult:
+    __slots__ = ("_status", "_indices", "_distances", "_message")
+
+    CALL_STATUS_SUCCESS = 0
+    CALL_STATUS_ERROR = -1
+
+    def __init__(self, indices=None, distances=None, status=CALL_STATUS_ERROR, message=""):
+        """Result handler for top_k"""
+        self._status = status
+        self._indices = indices
+        self._distances = distances
+        self._message = message
+
+    @property
+    def status(self) -> int:
+        """
+        Returns the status of the operation
+
+        0 - If successfully obtained result
+
+        -1 - In case of error
+
+        """
+        return self._status
+
+    @property
+    def indices(self):
+        """
+        Returns the gallery row indices of the nearest embeddings, closest first
+        """
+        return self._indices
+
+    @property
+    def distances(self):
+        """
+        Returns the distances matching `indices`
+        """
+        return self._distances
+
+    @property
+    def message(self) -> str:
+        """
+        Returns the message of the operation
+        """
+        return self._message
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+
+    @indices.setter
+    def indices(self, value):
+        self._indices = value
+
+    @distances.setter
+    def distances(self, value):
+        self._distances = value
+
+    @message.setter
+    def message(self, value):
+        self._message = value
@@ -1,4 +1,6 @@
 class CompareResult:
+    __slots__ = ("_status", "_is_similar", "_message")
+
     CALL_STATUS_SUCCESS = 0
     CALL_STATUS_ERROR = -1
 
@@ -0,0 +1,148 @@
+"""
+Compact binary container for embeddings, for message queues and databases.
+
+Layout (all integers little-endian):
+
+    offset  size  field
+    0       4     magic b"TGEM"
+    4       1     format version (1)
+    5       1     scheme: 0 float32, 1 float16, 2 int8
+    6       1     flags: bit 0 set when the checksum field is filled in
+    7       1     reserved (0)
+    8       4     number of embeddings N (uint32)
+    12      4     embedding length D (uint32)
+    16      4     CRC-32 of everything after the header, 0 without checksum
+    20      4     reserved (0)
+    24            payload
+
+The payload is N * D little-endian float32 or float16 values, row by row. For int8 it is N float32
+scales followed by N * D int8 codes (see helper.quantization). The header is 24 bytes, so the payload of
+a buffer aligned to 8 bytes is aligned too, and NumPy can read it in place.
+"""
+import struct
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from . import quantization
+
+MAGIC = b"TGEM"
+VERSION = 1
+FLAG_CHECKSUM = 0x01
+
+_HEADER = struct.Struct("<4sBBBBIIII")
+HEADER_SIZE = _HEADER.size
+
+_SCHEME_CODES = {quantization.FLOAT32: 0, quantization.FLOAT16: 1, quantization.INT8: 2}
+_SCHEMES = {code: scheme for scheme, code in _SCHEME_CODES.items()}
+_DTYPES = {quantization.FLOAT32: np.dtype("<f4"), quantization.FLOAT16: np.dtype("<f2"), quantization.INT8: np.dtype("i1")}
+_SCALE_DTYPE = np.dtype("<f4")
+
+
+class WireFormatError(ValueError):
+    """The buffer is not a valid embedding container."""
+
+
+# Parsed container: `codes` is an (N, D) view of the payload; `scales` is an (N,) view for int8, else None
+WireEmbeddings = namedtuple("WireEmbeddings", ["scheme", "codes", "scales"])
+
+
+def encode_embeddings(embeddings, scheme: str = quantization.FLOAT32, checksum: bool = False) -> bytes:
+    """
+    Serialize embeddings into the binary container.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray or list
+        Embeddings of shape (N, D) or a single embedding of shape (D,).
+
+    scheme : str, optional
+        "float32" (exact), "float16" or "int8", as in helper.quantization.
+
+    checksum : bool, optional
+        Store a CRC-32 of the payload, checked when the container is read.
+
+    Returns
+    -------
+    bytes
+        The header followed by the payload.
+    """
+    codes, scales = quantization.quantize(embeddings, scheme)
+    payload = [np.ascontiguousarray(codes, dtype=_DTYPES[scheme])]
+    if scales is not None:
+        payload.insert(0, np.ascontiguousarray(scales, dtype=_SCALE_DTYPE))
+    crc = 0
+    if checksum:
+        for part in payload:
+            crc = zlib.crc32(part, crc)
+    header = _HEADER.pack(MAGIC, VERSION, _SCHEME_CODES[scheme], FLAG_CHECKSUM if checksum else 0, 0,
+                          codes.shape[0], codes.shape[1], crc, 0)
+    # One copy of the payload, straight from the arrays' buffers
+    return b"".join([header] + [part.reshape(-1).view(np.uint8) for part in payload])
+
+
+def read_embeddings(buffer, verify: bool = True) -> WireEmbeddings:
+    """
+    Parse a container without copying its payload.
+
+    Parameters
+    ----------
+    buffer : bytes, bytearray, memoryview or any object supporting the buffer protocol
+        The whole container. The returned arrays are views of it; they are read-only when `buffer` is.
+
+    verify : bool, optional
+        Check the CRC-32 when the container has one.
+
+    Returns
+    -------
+    WireEmbeddings
+        (scheme, codes, scales) views of the payload.
+
+    Raises
+    ------
+    WireFormatError
+        If the buffer is truncated, has trailing bytes, has an unknown version or scheme, or fails the checksum.
+    """
+    view = memoryview(buffer).cast("B")
+    if view.nbytes < HEADER_SIZE:
+        raise WireFormatError(f"Buffer of {view.nbytes} bytes is shorter than the {HEADER_SIZE}-byte header")
+    magic, version, scheme_code, flags, _, count, dimension, crc, _ = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise WireFormatError("Not an embedding container (bad magic)")
+    if version != VERSION:
+        raise WireFormatError(f"Unsupported container version {version}, expected {VERSION}")
+    scheme = _SCHEMES.get(scheme_code)
+    if scheme is None:
+        raise WireFormatError(f"Unknown scheme code {scheme_code}")
+
+    dtype = _DTYPES[scheme]
+    scales_size = count * _SCALE_DTYPE.itemsize if scheme == quantization.INT8 else 0
+    expected = HEADER_SIZE + scales_size + count * dimension * dtype.itemsize
+    if view.nbytes != expected:
+        raise WireFormatError(f"Container of {count}x{dimension} {scheme} needs {expected} bytes, got {view.nbytes}")
+    if verify and flags & FLAG_CHECKSUM and zlib.crc32(view[HEADER_SIZE:]) != crc:
+        raise WireFormatError("Checksum mismatch")
+
+    scales = None
+    if scales_size:
+        scales = np.frombuffer(view, dtype=_SCALE_DTYPE, count=count, offset=HEADER_SIZE)
+    codes = np.frombuffer(view, dtype=dtype, count=count * dimension, offset=HEADER_SIZE + scales_size)
+    return WireEmbeddings(scheme, codes.reshape(count, dimension), scales)
+
+
+def decode_embeddings(buffer, verify: bool = True) -> np.ndarray:
+    """
+    Parse a container into an (N, D) float32 matrix. float32 payloads are returned as a view of
+    `buffer` without copying; float16 and int8 payloads are widened into a new array.
+    """
+    wire = read_embeddings(buffer, verify=verify)
+    if wire.scheme == quantization.FLOAT32:
+        return wire.codes
+    return quantization.dequantize(wire.codes, wire.scales)
+
+
+def encoded_size(count: int, dimension: int, scheme: str = quantization.FLOAT32) -> int:
+    """Size in bytes of a container of `count` embeddings of length `dimension`."""
+    return HEADER_SIZE + count * quantization.bytes_per_embedding(dimension, scheme)
+
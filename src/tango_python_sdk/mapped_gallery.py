@@ -0,0 +1,373 @@
+import os
+import struct
+import threading
+import traceback
+import zlib
+from typing import Iterable
+
+import numpy as np
+
+from .factor_modules.FaceModule import Face
+from .gallery import FaceGallery
+from .helper import distance as distance_utils
+from .helper.result_objects.IdentifyResult import IdentifyResult
+
+SEGMENT_FILE = "main.seg"
+JOURNAL_FILE = "journal.log"
+
+SEGMENT_MAGIC = b"TANGOSEG"
+JOURNAL_MAGIC = b"TANGOJNL"
+FORMAT_VERSION = 1
+
+# magic, version, dimension, count, ids offsets position, ids blob position
+_SEGMENT_HEADER = struct.Struct("<8sIIQQQ")
+_SEGMENT_HEADER_SIZE = 64
+# magic, version, dimension
+_JOURNAL_HEADER = struct.Struct("<8sII")
+# op, id length
+_RECORD_HEADER = struct.Struct("<BI")
+_RECORD_CRC = struct.Struct("<I")
+
+_OP_ENROLL = 1
+_OP_REMOVE = 2
+
+_WRITE_CHUNK_ROWS = 65536
+
+
+def _fsync_directory(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_segment(path: str, dimension: int, ids: Iterable[str], embeddings) -> None:
+    """
+    Write a main segment file atomically.
+
+    Layout (little-endian):
+    64-byte header, then the (count, dimension) float32 embedding matrix, then count + 1 uint64 offsets
+    into the id blob, then the UTF-8 id blob. Every section can be viewed straight from a memory map.
+    """
+    encoded_ids = [embedding_id.encode("utf-8") for embedding_id in ids]
+    count = len(encoded_ids)
+    if embeddings is None:
+        embeddings = np.empty((0, dimension), dtype=np.float32)
+    if len(embeddings) != count:
+        raise ValueError("Number of ids does not match number of embeddings")
+
+    offsets = np.zeros(count + 1, dtype="<u8")
+    if count:
+        np.cumsum([len(encoded) for encoded in encoded_ids], out=offsets[1:])
+    ids_position = _SEGMENT_HEADER_SIZE + count * dimension * 4
+    blob_position = ids_position + offsets.nbytes
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fp:
+        header = _SEGMENT_HEADER.pack(SEGMENT_MAGIC, FORMAT_VERSION, dimension, count, ids_position, blob_position)
+        fp.write(header.ljust(_SEGMENT_HEADER_SIZE, b"\0"))
+        for start in range(0, count, _WRITE_CHUNK_ROWS):
+            chunk = np.ascontiguousarray(embeddings[start:start + _WRITE_CHUNK_ROWS], dtype="<f4")
+            if chunk.ndim != 2 or chunk.shape[1] != dimension:
+                raise ValueError("Embeddings must have shape (count, dimension)")
+            fp.write(chunk.tobytes())
+        fp.write(offsets.tobytes())
+        fp.write(b"".join(encoded_ids))
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def write_empty_journal(path: str, dimension: int) -> None:
+    """Write an empty journal file atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(_JOURNAL_HEADER.pack(JOURNAL_MAGIC, FORMAT_VERSION, dimension))
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+class MappedFaceGallery:
+    """
+    Embedding gallery stored on disk and opened with a memory map.
+
+    A gallery is a directory holding a main segment and a journal. The main segment is mapped read-only,
+    so opening it costs no private heap and processes forked from (or opening) the same gallery share
+    its page-cache pages. Enrollments and removals are appended to the journal and kept in a small
+    in-memory tail; `compact` folds them back into a new main segment.
+
+    Only one process should open a gallery in append mode at a time. Readers see the journal as it
+    was when they opened the gallery.
+
+        Parameters
+        ----------
+        path : str
+            Gallery directory, created with `MappedFaceGallery.create` or `FaceGallery.save`.
+
+        mode : str, optional
+            "r" for read-only access, "a" to allow enroll, remove and compact.
+
+        sync : bool, optional
+            fsync the journal after every append.
+
+        Methods
+        -------
+        create
+        enroll
+        remove
+        identify
+        compact
+        close
+    """
+
+    def __init__(self, path: str, mode: str = "r", sync: bool = False):
+        if mode not in ("r", "a"):
+            raise ValueError("mode must be 'r' or 'a'")
+        self._path = os.fspath(path)
+        self._mode = mode
+        self._sync = sync
+        self._lock = threading.RLock()
+        self._journal = None
+        self._open()
+
+    @classmethod
+    def create(cls, path: str, dimension: int, ids: Iterable[str] = (), embeddings=None, mode: str = "a", sync: bool = False) -> "MappedFaceGallery":
+        """
+        Create a gallery directory, optionally seeded with embeddings, and open it.
+
+        Parameters
+        ----------
+        path : str
+            Directory to create. Existing gallery files in it are replaced.
+
+        dimension : int
+            Embedding length.
+
+        ids : iterable of str, optional
+            One id per embedding row.
+
+        embeddings : np.ndarray, optional
+            Embeddings of shape (N, dimension).
+        """
+        path = os.fspath(path)
+        os.makedirs(path, exist_ok=True)
+        write_segment(os.path.join(path, SEGMENT_FILE), dimension, list(ids), embeddings)
+        write_empty_journal(os.path.join(path, JOURNAL_FILE), dimension)
+        return cls(path, mode=mode, sync=sync)
+
+    def __len__(self) -> int:
+        return self._count - len(self._tombstones) + len(self._tail)
+
+    def __contains__(self, embedding_id) -> bool:
+        with self._lock:
+            return embedding_id in self._tail or self._main_row(embedding_id) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def dimension(self) -> int:
+        """
+        Returns the embedding length
+        """
+        return self._dimension
+
+    @property
+    def path(self) -> str:
+        """
+        Returns the gallery directory
+        """
+        return self._path
+
+    def enroll(self, embedding_id: str, embedding) -> None:
+        """
+        Add an embedding, or replace the one already enrolled under `embedding_id`. The change is
+        journaled before it becomes visible.
+        """
+        self._check_writable()
+        if not isinstance(embedding_id, str):
+            raise TypeError("Mapped gallery ids must be str")
+        vector = distance_utils.as_embedding_vector(embedding)
+        if vector.shape[0] != self._dimension:
+            raise ValueError(f"Embedding length {vector.shape[0]} does not match gallery dimension {self._dimension}")
+        with self._lock:
+            self._append_record(_OP_ENROLL, embedding_id, vector)
+            self._apply_enroll(embedding_id, vector)
+
+    def remove(self, embedding_id: str) -> None:
+        """
+        Remove the embedding enrolled under `embedding_id`.
+
+        Raises
+        ------
+        KeyError
+            If the id is not enrolled.
+        """
+        self._check_writable()
+        with self._lock:
+            if embedding_id not in self:
+                raise KeyError(embedding_id)
+            self._append_record(_OP_REMOVE, embedding_id, None)
+            self._apply_remove(embedding_id)
+
+    def identify(self, embedding, k: int = 1, threshold: float = None) -> IdentifyResult:
+        """
+        Find the enrolled embeddings that match a probe embedding, with the same semantics as
+        `FaceGallery.identify`.
+        """
+        if threshold is None:
+            threshold = Face.COMPARE_THRESHOLD
+        try:
+            if k < 1:
+                raise ValueError("k must be at least 1")
+            with self._lock:
+                query = distance_utils.as_embedding_vector(embedding)
+                distances = distance_utils.get_distances(query, self._embeddings)
+                if self._tombstones:
+                    distances[np.fromiter(self._tombstones, dtype=np.int64, count=len(self._tombstones))] = np.inf
+                if len(self._tail):
+                    distances = np.concatenate([distances, distance_utils.get_distances(query, self._tail.embeddings)])
+                rows, distances = distance_utils.select_top_k(distances, k)
+                matched = distances < threshold
+                rows, distances = rows[matched], distances[matched]
+                ids = [self._id_at(row) for row in rows]
+            return IdentifyResult(ids=ids, distances=distances,
+                                  status=IdentifyResult.CALL_STATUS_SUCCESS, message="OK")
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return IdentifyResult(message="Error occurred while identifying embedding.")
+
+    def compact(self) -> None:
+        """
+        Fold the journal into a new main segment and start an empty journal.
+
+        The new segment replaces the old one atomically. Processes that still map the old segment
+        keep reading it until they reopen the gallery.
+        """
+        self._check_writable()
+        with self._lock:
+            live_rows = np.ones(self._count, dtype=bool)
+            if self._tombstones:
+                live_rows[list(self._tombstones)] = False
+            live_rows = np.flatnonzero(live_rows)
+            ids = [self._main_id(row) for row in live_rows] + list(self._tail.ids)
+            embeddings = np.concatenate([self._embeddings[live_rows], self._tail.embeddings])
+            write_segment(os.path.join(self._path, SEGMENT_FILE), self._dimension, ids, embeddings)
+            write_empty_journal(os.path.join(self._path, JOURNAL_FILE), self._dimension)
+            self.close()
+            self._open()
+
+    def close(self) -> None:
+        """Close the journal and release the memory map."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            self._embeddings = None
+            self._offsets = None
+            self._blob = None
+            self._segment = None
+
+    def _open(self) -> None:
+        segment = np.memmap(os.path.join(self._path, SEGMENT_FILE), dtype=np.uint8, mode="r")
+        magic, version, dimension, count, ids_position, blob_position = _SEGMENT_HEADER.unpack_from(segment, 0)
+        if magic != SEGMENT_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self._path} is not a version {FORMAT_VERSION} gallery")
+        self._segment = segment
+        self._dimension = dimension
+        self._count = count
+        self._embeddings = segment[_SEGMENT_HEADER_SIZE:ids_position].view("<f4").reshape(count, dimension)
+        self._offsets = segment[ids_position:blob_position].view("<u8")
+        self._blob = segment[blob_position:]
+        self._index = None
+        self._tombstones = set()
+        self._tail = FaceGallery(dimension=dimension, initial_capacity=64)
+        self._replay_journal()
+
+    def _replay_journal(self) -> None:
+        journal_path = os.path.join(self._path, JOURNAL_FILE)
+        with open(journal_path, "rb") as fp:
+            data = fp.read()
+        magic, version, dimension = _JOURNAL_HEADER.unpack_from(data, 0)
+        if magic != JOURNAL_MAGIC or version != FORMAT_VERSION or dimension != self._dimension:
+            raise ValueError(f"{journal_path} does not belong to this gallery")
+
+        position = _JOURNAL_HEADER.size
+        vector_size = self._dimension * 4
+        while position + _RECORD_HEADER.size <= len(data):
+            op, id_length = _RECORD_HEADER.unpack_from(data, position)
+            body_end = position + _RECORD_HEADER.size + id_length + (vector_size if op == _OP_ENROLL else 0)
+            if op not in (_OP_ENROLL, _OP_REMOVE) or body_end + _RECORD_CRC.size > len(data):
+                break
+            (crc,) = _RECORD_CRC.unpack_from(data, body_end)
+            if crc != zlib.crc32(data[position:body_end]):
+                break
+            id_start = position + _RECORD_HEADER.size
+            embedding_id = data[id_start:id_start + id_length].decode("utf-8")
+            if op == _OP_ENROLL:
+                vector = np.frombuffer(data, dtype="<f4", count=self._dimension, offset=id_start + id_length)
+                self._apply_enroll(embedding_id, vector)
+            elif embedding_id in self:
+                self._apply_remove(embedding_id)
+            position = body_end + _RECORD_CRC.size
+
+        if self._mode == "a":
+            self._journal = open(journal_path, "r+b")
+            # Drop a torn record left by a crash mid-append
+            self._journal.truncate(position)
+            self._journal.seek(position)
+
+    def _append_record(self, op: int, embedding_id: str, vector) -> None:
+        encoded_id = embedding_id.encode("utf-8")
+        record = _RECORD_HEADER.pack(op, len(encoded_id)) + encoded_id
+        if vector is not None:
+            record += np.ascontiguousarray(vector, dtype="<f4").tobytes()
+        self._journal.write(record + _RECORD_CRC.pack(zlib.crc32(record)))
+        self._journal.flush()
+        if self._sync:
+            os.fsync(self._journal.fileno())
+
+    def _apply_enroll(self, embedding_id: str, vector) -> None:
+        row = self._main_row(embedding_id)
+        if row is not None:
+            self._tombstones.add(row)
+        self._tail.enroll(embedding_id, vector)
+
+    def _apply_remove(self, embedding_id: str) -> None:
+        if embedding_id in self._tail:
+            self._tail.remove(embedding_id)
+        else:
+            self._tombstones.add(self._main_row(embedding_id))
+
+    def _main_row(self, embedding_id):
+        # Built on first use so read-only searchers never decode the whole id table
+        if self._index is None:
+            self._index = {self._main_id(row): row for row in range(self._count)}
+        row = self._index.get(embedding_id)
+        if row is None or row in self._tombstones:
+            return None
+        return row
+
+    def _main_id(self, row: int) -> str:
+        return self._blob[self._offsets[row]:self._offsets[row + 1]].tobytes().decode("utf-8")
+
+    def _id_at(self, row: int) -> str:
+        if row < self._count:
+            return self._main_id(row)
+        return self._tail.ids[row - self._count]
+
+    def _check_writable(self) -> None:
+        if self._mode != "a":
+            raise PermissionError("Gallery was opened read-only")
@@ -0,0 +1,367 @@
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Iterable, List
+
+import numpy as np
+
+from .factor_modules.FaceModule import Face
+from .handler import distance_backends
+from .handler.nativeMethods import NativeMethods
+from .helper import distance as distance_utils
+from .helper.messages import Message
+from .helper.result_objects.GetDistanceResult import GetDistanceResult
+from .helper.result_objects.GetEmbeddingResult import GetEmbeddingResult
+
+logger = logging.getLogger(__name__)
+
+# Initial shared memory sizes, both grow on demand
+DEFAULT_INPUT_BYTES = 1920 * 1080 * 4
+DEFAULT_OUTPUT_BYTES = 4096 * 4
+
+_STATUS_OK = 0
+_STATUS_NO_EMBEDDING = -1
+_STATUS_ERROR = -2
+_STATUS_OUTPUT_TOO_SMALL = -3
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a segment owned by the parent without leaving it registered with the resource tracker."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument and registers every attachment with the resource tracker,
+        # which the parent shares. Unregistering drops the parent's entry as well; the parent registers
+        # the segment again once the worker has confirmed the attachment, see _retrack.
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+def _retrack(segment: shared_memory.SharedMemory) -> None:
+    """Restore the parent's resource tracker entry of a segment a worker has just attached to."""
+    if sys.version_info < (3, 13):
+        resource_tracker.register(segment._name, "shared_memory")
+
+
+def _worker_main(conn, input_name: str, output_name: str, initializer: Callable, initargs: tuple) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+    native = NativeMethods().load()
+    segments = {"input": _attach_shared_memory(input_name), "output": _attach_shared_memory(output_name)}
+    conn.send((_STATUS_OK, None))
+    try:
+        while True:
+            request = conn.recv()
+            command = request[0]
+            if command == "stop":
+                break
+            if command == "attach":
+                _, which, name = request
+                segments[which].close()
+                segments[which] = _attach_shared_memory(name)
+                conn.send((_STATUS_OK, None))
+                continue
+
+            _, shape = request
+            image = np.ndarray(shape, dtype=np.uint8, buffer=segments["input"].buf)
+            try:
+                embedding = native.get_embedding(image)
+            except Exception:
+                conn.send((_STATUS_ERROR, traceback.format_exc()))
+                continue
+            finally:
+                del image
+
+            if embedding is None or embedding.size == 0:
+                conn.send((_STATUS_NO_EMBEDDING, None))
+            elif embedding.nbytes > segments["output"].size:
+                conn.send((_STATUS_OUTPUT_TOO_SMALL, embedding.nbytes))
+            else:
+                output = np.ndarray(embedding.shape, dtype=np.float32, buffer=segments["output"].buf)
+                output[:] = embedding
+                del output
+                conn.send((_STATUS_OK, embedding.shape[0]))
+    finally:
+        for segment in segments.values():
+            segment.close()
+
+
+class _Worker:
+    """One inference process with its own input and output shared memory segments."""
+
+    def __init__(self, context, index: int, input_bytes: int, output_bytes: int, initializer, initargs):
+        self._context = context
+        self._index = index
+        self._initializer = initializer
+        self._initargs = initargs
+        self.process = None
+        self.conn = None
+        self.input = shared_memory.SharedMemory(create=True, size=input_bytes)
+        try:
+            self.output = shared_memory.SharedMemory(create=True, size=output_bytes)
+        except BaseException:
+            self.input.close()
+            self.input.unlink()
+            raise
+        try:
+            self.start()
+        except BaseException:
+            # The engine only cleans up workers that were fully created
+            self.stop()
+            self._release_segments()
+            raise
+
+    def start(self) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        self.process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.input.name, self.output.name, self._initializer, self._initargs),
+            name=f"tango-engine-{self._index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        # Wait until the native library is loaded, surfacing start-up failures here
+        try:
+            self.conn.recv()
+        except EOFError:
+            self.process.join()
+            raise RuntimeError(f"Engine worker {self._index} failed to start (exit code {self.process.exitcode})")
+        _retrack(self.input)
+        _retrack(self.output)
+
+    def restart(self) -> None:
+        self.stop()
+        self.start()
+
+    def grow(self, which: str, size: int) -> None:
+        old = getattr(self, which)
+        new = shared_memory.SharedMemory(create=True, size=max(size, old.size * 2))
+        try:
+            self.conn.send(("attach", which, new.name))
+            self.conn.recv()
+        except BaseException:
+            # E.g. the worker died while attaching: the segment is not referenced anywhere else
+            new.close()
+            new.unlink()
+            raise
+        _retrack(new)
+        setattr(self, which, new)
+        old.close()
+        old.unlink()
+
+    def embed(self, image: np.ndarray):
+        if image.nbytes > self.input.size:
+            self.grow("input", image.nbytes)
+        staged = np.ndarray(image.shape, dtype=np.uint8, buffer=self.input.buf)
+        staged[...] = image
+        del staged
+        while True:
+            self.conn.send(("embed", image.shape))
+            status, value = self.conn.recv()
+            if status != _STATUS_OUTPUT_TOO_SMALL:
+                break
+            self.grow("output", value)
+        if status != _STATUS_OK:
+            return status, value
+        embedding = np.ndarray((value,), dtype=np.float32, buffer=self.output.buf).copy()
+        return status, embedding
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+        if self.conn is not None:
+            try:
+                self.conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        if self.process.pid is not None:
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self.process = None
+
+    def close(self) -> None:
+        self.stop()
+        self._release_segments()
+
+    def _release_segments(self) -> None:
+        for segment in (self.input, self.output):
+            segment.close()
+            segment.unlink()
+
+
+class ProcessFaceEngine:
+    """
+    Inference engine backed by a pool of worker processes.
+
+    Every worker loads its own copy of the native library through NativeMethods, so native calls never
+    share a process. Decoded images reach a worker through a per-worker `multiprocessing.shared_memory`
+    segment and embeddings come back the same way; only shapes and status codes go through the pipe.
+    Calls are thread-safe: each one borrows an idle worker for its duration.
+
+    The engine exposes the same inference interface as Face, so it can be plugged into FaceFactor with
+    `FaceFactor.set_inference_engine`.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of worker processes. Defaults to the number of CPUs.
+
+        start_method : str, optional
+            multiprocessing start method. "spawn" (the default) is safe when the parent runs threads.
+
+        initializer : callable, optional
+            Called with `initargs` in every worker before the native library is loaded.
+
+        Methods
+        -------
+        get_embedding
+        get_embeddings
+        get_distance
+        get_pair_distances
+        compare_embeddings
+        preload
+        warmup
+        close
+    """
+
+    COMPARE_THRESHOLD = Face.COMPARE_THRESHOLD
+
+    def __init__(self, workers: int = None, start_method: str = "spawn",
+                 input_bytes: int = DEFAULT_INPUT_BYTES, output_bytes: int = DEFAULT_OUTPUT_BYTES,
+                 initializer: Callable = None, initargs: tuple = ()):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.message = Message()
+        self._context = multiprocessing.get_context(start_method)
+        self._workers = []
+        self._idle = queue.Queue()
+        try:
+            for index in range(workers):
+                worker = _Worker(self._context, index, input_bytes, output_bytes, initializer, initargs)
+                self._workers.append(worker)
+                self._idle.put(worker)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def workers(self) -> int:
+        """
+        Returns the number of worker processes
+        """
+        return len(self._workers)
+
+    def get_embedding(self, image_data: np.ndarray) -> GetEmbeddingResult:
+        try:
+            if image_data.dtype != np.uint8:
+                raise ValueError("Image should be of dtype uint8")
+            image_data = np.ascontiguousarray(image_data)
+            worker = self._idle.get()
+            if worker is None:
+                # Every worker was dropped; pass the marker on to the other waiting callers
+                self._idle.put(None)
+                raise RuntimeError("No engine workers left")
+            try:
+                try:
+                    status, value = worker.embed(image_data)
+                except (EOFError, BrokenPipeError, ConnectionResetError):
+                    # The worker died, most likely inside the native library. Replace it and report the failure
+                    logger.error("Engine worker exited unexpectedly, restarting it")
+                    try:
+                        worker.restart()
+                    except Exception as e:
+                        logger.error(f"Failed to restart engine worker, removing it from the pool: {e}")
+                        self._discard(worker)
+                        worker = None
+                    return GetEmbeddingResult(message=self.message.EXCEPTION_ERROR_GET_EMB)
+            finally:
+                if worker is not None:
+                    self._idle.put(worker)
+            if status == _STATUS_ERROR:
+                logger.error(f"Exception in engine worker: {value}")
+            if status != _STATUS_OK:
+                return GetEmbeddingResult(message=self.message.EXCEPTION_ERROR_GET_EMB)
+            return GetEmbeddingResult(embedding=value, status=GetEmbeddingResult.CALL_STATUS_SUCCESS, message="OK")
+        except Exception as e:
+            logger.error(f"Exception: {e}, Traceback: {traceback.format_exc()}")
+            return GetEmbeddingResult(message=self.message.EXCEPTION_ERROR_GET_EMB)
+
+    def _discard(self, worker: "_Worker") -> None:
+        """Drop a worker that cannot be restarted. Once none are left, calls fail instead of blocking."""
+        try:
+            self._workers.remove(worker)
+        except ValueError:
+            pass
+        worker.close()
+        if not self._workers:
+            self._idle.put(None)
+
+    def get_embeddings(self, images: Iterable[np.ndarray]) -> List[GetEmbeddingResult]:
+        """Embed decoded images on all workers at once. Results are in input order."""
+        with ThreadPoolExecutor(max_workers=max(len(self._workers), 1)) as executor:
+            return list(executor.map(self.get_embedding, images))
+
+    def get_distance(self, embedding_one: np.ndarray, embedding_two: np.ndarray) -> GetDistanceResult:
+        try:
+            distance = float(distance_utils.get_distances(embedding_one, np.asarray(embedding_two)[None, :])[0])
+            return GetDistanceResult(distance=distance, status=GetDistanceResult.CALL_STATUS_SUCCESS, message="OK")
+        except Exception as e:
+            logger.error(f"Exception: {e}, Traceback: {traceback.format_exc()}")
+            return GetDistanceResult(message=self.message.EXCEPTION_ERROR_GET_DISTANCE)
+
+    def set_distance_backend(self, name: str) -> None:
+        """Distances are computed in the calling process, where the native library is not loaded, so only
+        the "numpy" backend is available."""
+        if name != distance_backends.NUMPY:
+            raise ValueError("ProcessFaceEngine only supports the 'numpy' distance backend")
+
+    def get_pair_distances(self, embeddings_a: np.ndarray, embeddings_b: np.ndarray) -> np.ndarray:
+        """Distance of each row of `embeddings_a` to the same row of `embeddings_b`."""
+        return distance_utils.get_pair_distances(embeddings_a, embeddings_b)
+
+    compare_embeddings = Face.compare_embeddings
+
+    def preload(self) -> None:
+        """Workers load the native library when they start, nothing is left to do."""
+
+    def warmup(self, image_data: np.ndarray) -> GetEmbeddingResult:
+        """Run one inference on every worker. Returns the last result."""
+        image_data = np.ascontiguousarray(image_data)
+        borrowed = [self._idle.get() for _ in self._workers]
+        try:
+            for worker in borrowed:
+                if worker is not None:
+                    worker.embed(image_data)
+        finally:
+            for worker in borrowed:
+                self._idle.put(worker)
+        return self.get_embedding(image_data)
+
+    def compare(self, image_data_1: np.ndarray = None, image_data_2: np.ndarray = None):
+        return self.compare_embeddings(self.get_embedding(image_data_1), self.get_embedding(image_data_2))
+
+    def close(self) -> None:
+        """Stop the workers and free their shared memory."""
+        while self._workers:
+            self._workers.pop().close()
@@ -0,0 +1,506 @@
+"""
+Local HTTP inference server with dynamic micro-batching.
+
+    python -m tango_python_sdk.serve --port 8470 --gallery /var/lib/tango/gallery
+
+One server per node lets several services share one copy of the model. Requests to the same endpoint
+that arrive within --window-ms of each other (or until --max-batch are waiting) are processed as one
+batch. Every endpoint has its own admission limit and timeout:
+
+    --max-pending embedding=128 --timeout embedding=2.0
+
+Endpoints (images are base64 in JSON, or the raw encoded image as the body of /v1/embedding):
+    POST /v1/embedding  {"image": b64}                                  -> {"status", "message", "embedding"}
+    POST /v1/compare    {"image_1": b64, "image_2": b64}                -> {"status", "message", "is_similar", "distance"}
+    POST /v1/identify   {"image": b64 | "embedding": [...], "k", "threshold"} -> {"status", "message", "ids", "distances"}
+    GET  /health
+    GET  /metrics       Prometheus text format
+
+A full endpoint answers 503 with Retry-After, a request that is not done within its timeout 504, and a
+malformed request 400. Failures of the operation itself are reported as in the SDK: HTTP 200 with
+"status": -1 and a "message".
+"""
+import argparse
+import base64
+import binascii
+import json
+import os
+import queue
+import sys
+import threading
+import traceback
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from timeit import default_timer
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from .handler.nativeMethods import NativeMethods
+from .helper.metrics import metrics
+
+ENDPOINT_EMBEDDING = "embedding"
+ENDPOINT_COMPARE = "compare"
+ENDPOINT_IDENTIFY = "identify"
+ENDPOINTS = (ENDPOINT_EMBEDDING, ENDPOINT_COMPARE, ENDPOINT_IDENTIFY)
+
+DEFAULT_PORT = 8470
+DEFAULT_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH = 16
+DEFAULT_MAX_BODY_BYTES = 20 * 1024 * 1024
+
+
+class EndpointConfig:
+    """Admission limit (requests queued or running) and timeout in seconds of one endpoint."""
+    __slots__ = ("max_pending", "timeout")
+
+    def __init__(self, max_pending: int = 64, timeout: float = 5.0):
+        if max_pending < 1 or timeout <= 0:
+            raise ValueError("max_pending must be at least 1 and timeout positive")
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+
+class RequestError(Exception):
+    """A malformed request, answered with HTTP 400."""
+
+
+class MicroBatcher:
+    """
+    Groups submitted items into batches for `process_batch(items) -> results`.
+
+    A batch is closed `window` seconds after its first item arrived, or as soon as it holds `max_batch`
+    items, and is processed on the batcher's own thread. Items whose future was cancelled while waiting
+    (e.g. their request timed out) are left out of the batch.
+    """
+
+    def __init__(self, process_batch: Callable[[List], List], window: float, max_batch: int, name: str = "batcher"):
+        if window < 0 or max_batch < 1:
+            raise ValueError("window must be non-negative and max_batch at least 1")
+        self._process_batch = process_batch
+        self._window = window
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        self._closed = False
+        self._stage = f"{name}_batch"
+        self._thread = threading.Thread(target=self._run, name=f"tango-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = default_timer() + self._window
+            stop = False
+            while len(batch) < self._max_batch:
+                remaining = deadline - default_timer()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._execute(batch)
+            if stop:
+                return
+
+    def _execute(self, batch) -> None:
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            with metrics.timed(self._stage):
+                results = self._process_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+class InferenceServer:
+    """
+    HTTP front end sharing one FaceFactor between all clients of a node.
+
+        Parameters
+        ----------
+        face_factor : FaceFactor, optional
+            Defaults to the process-wide instance.
+
+        gallery : FaceGallery or MappedFaceGallery, optional
+            Gallery searched by /v1/identify. Without one the endpoint answers 404.
+
+        host, port : str, int
+            Address to listen on. Port 0 picks a free port, see `address`.
+
+        window : float
+            Batching window in seconds.
+
+        max_batch : int
+            Largest batch sent to the engine at once.
+
+        workers : int, optional
+            Threads decoding and embedding the images of a batch. Defaults to the number of CPUs.
+
+        endpoints : dict, optional
+            EndpointConfig per endpoint name ("embedding", "compare", "identify").
+
+        Methods
+        -------
+        start
+        serve_forever
+        shutdown
+    """
+
+    def __init__(self, face_factor=None, gallery=None, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 window: float = DEFAULT_WINDOW_MS / 1000, max_batch: int = DEFAULT_MAX_BATCH, workers: int = None,
+                 endpoints: Dict[str, EndpointConfig] = None, max_body_bytes: int = DEFAULT_MAX_BODY_BYTES):
+        if face_factor is None:
+            from .factor import FaceFactor
+            face_factor = FaceFactor()
+        self.face_factor = face_factor
+        self.gallery = gallery
+        self.workers = workers or os.cpu_count() or 1
+        self.max_body_bytes = max_body_bytes
+        self.endpoints = {name: EndpointConfig() for name in ENDPOINTS}
+        self.endpoints.update(endpoints or {})
+        self._admission = {name: threading.BoundedSemaphore(config.max_pending) for name, config in self.endpoints.items()}
+        self._batchers = {
+            ENDPOINT_EMBEDDING: MicroBatcher(self._embed_batch, window, max_batch, "serve_embedding"),
+            ENDPOINT_COMPARE: MicroBatcher(self._compare_batch, window, max_batch, "serve_compare"),
+            ENDPOINT_IDENTIFY: MicroBatcher(self._identify_batch, window, max_batch, "serve_identify"),
+        }
+        self._http = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._http.daemon_threads = True
+        self._http.app = self
+        self._thread = None
+
+    @property
+    def address(self):
+        """(host, port) the server listens on."""
+        return self._http.server_address[:2]
+
+    def start(self) -> "InferenceServer":
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self._http.serve_forever, name="tango-serve", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._http.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop accepting requests and stop the batchers."""
+        if self._thread is not None:
+            self._http.shutdown()
+            self._thread.join()
+        self._http.server_close()
+        for batcher in self._batchers.values():
+            batcher.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def call(self, endpoint: str, item):
+        """
+        Run one request through admission, batching and timeout.
+
+        Returns
+        -------
+        tuple
+            (HTTPStatus, response dict)
+        """
+        admission = self._admission[endpoint]
+        if not admission.acquire(blocking=False):
+            metrics.count_outcome(f"serve_{endpoint}", int(HTTPStatus.SERVICE_UNAVAILABLE))
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"status": -1, "message": f"Too many pending {endpoint} requests"}
+        future = None
+        try:
+            future = self._batchers[endpoint].submit(item)
+            result = future.result(timeout=self.endpoints[endpoint].timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            metrics.count_outcome(f"serve_{endpoint}", int(HTTPStatus.GATEWAY_TIMEOUT))
+            return HTTPStatus.GATEWAY_TIMEOUT, {"status": -1, "message": f"{endpoint} request timed out"}
+        finally:
+            # A request still queued or running keeps its slot until the batch is done with it
+            if future is None or future.done():
+                admission.release()
+            else:
+                future.add_done_callback(lambda _: admission.release())
+        metrics.count_outcome(f"serve_{endpoint}", int(HTTPStatus.OK))
+        return HTTPStatus.OK, result
+
+    def _embed_batch(self, images: List[bytes]) -> List[dict]:
+        return [_embedding_response(result) for result in self.face_factor.get_embeddings(images, max_workers=self.workers)]
+
+    def _compare_batch(self, pairs: List[tuple]) -> List[dict]:
+        results = self.face_factor.get_embeddings([image for pair in pairs for image in pair], max_workers=self.workers)
+        responses = [{"status": -1, "message": "Failed to get embeddings for one or both images.", "is_similar": False}
+                     for _ in pairs]
+        embedded = [index for index in range(len(pairs)) if results[2 * index].status == 0 and results[2 * index + 1].status == 0]
+        if embedded:
+            # One distance per pair for the whole batch; is_similar is derived from it with the compare threshold
+            compared = self.face_factor.compare_many((np.stack([results[2 * index].embedding for index in embedded]),
+                                                      np.stack([results[2 * index + 1].embedding for index in embedded])))
+            for position, index in enumerate(embedded):
+                if compared.status != 0:
+                    responses[index]["message"] = compared.message
+                    continue
+                responses[index] = {"status": 0, "message": "Comparison successful.",
+                                    "is_similar": bool(compared.is_similar[position]),
+                                    "distance": float(compared.distances[position])}
+        return responses
+
+    def _identify_batch(self, requests: List[dict]) -> List[dict]:
+        to_embed = [index for index, request in enumerate(requests) if "image" in request]
+        embedded = self.face_factor.get_embeddings([requests[index]["image"] for index in to_embed], max_workers=self.workers)
+        embeddings = {index: result for index, result in zip(to_embed, embedded)}
+        responses = []
+        for index, request in enumerate(requests):
+            embedding = request.get("embedding")
+            if index in embeddings:
+                if embeddings[index].status != 0:
+                    responses.append({"status": embeddings[index].status, "message": embeddings[index].message})
+                    continue
+                embedding = embeddings[index].embedding
+            result = self.gallery.identify(embedding, k=request["k"], threshold=request["threshold"])
+            response = {"status": result.status, "message": result.message}
+            if result.status == 0:
+                response["ids"] = list(result.ids)
+                response["distances"] = np.asarray(result.distances, dtype=np.float64).tolist()
+            responses.append(response)
+        return responses
+
+
+def _embedding_response(result) -> dict:
+    response = {"status": result.status, "message": result.message}
+    if result.status == 0:
+        response["embedding"] = result.embedding_list
+    return response
+
+
+def _decode_image(value, field: str) -> bytes:
+    if not isinstance(value, str):
+        raise RequestError(f"'{field}' must be a base64 string")
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise RequestError(f"'{field}' is not valid base64")
+
+
+def _native_buffer_metrics(prefix: str = "tango") -> str:
+    """Native embedding buffer counts of this process, to spot leaks in long-running servers."""
+    stats = NativeMethods.allocation_stats()
+    return (f"# HELP {prefix}_native_buffers_allocated_total Embedding buffers received from the native library.\n"
+            f"# TYPE {prefix}_native_buffers_allocated_total counter\n"
+            f"{prefix}_native_buffers_allocated_total {stats['allocated']}\n"
+            f"# HELP {prefix}_native_buffers_outstanding Embedding buffers not yet returned to the native library.\n"
+            f"# TYPE {prefix}_native_buffers_outstanding gauge\n"
+            f"{prefix}_native_buffers_outstanding {stats['outstanding']}\n")
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "tango-serve"
+
+    def log_message(self, format, *args):
+        # Access logs would dominate the cost of small requests
+        pass
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, {"status": 0, "message": "OK"})
+        elif self.path == "/metrics":
+            self._send(HTTPStatus.OK, (metrics.to_prometheus() + _native_buffer_metrics()).encode("utf-8"),
+                       "text/plain; version=0.0.4")
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"status": -1, "message": "Not found"})
+
+    def do_POST(self):
+        app = self.server.app
+        routes = {"/v1/embedding": (ENDPOINT_EMBEDDING, self._parse_embedding),
+                  "/v1/compare": (ENDPOINT_COMPARE, self._parse_compare),
+                  "/v1/identify": (ENDPOINT_IDENTIFY, self._parse_identify)}
+        route = routes.get(self.path)
+        try:
+            body = self._read_body()
+            if route is None:
+                self._send_json(HTTPStatus.NOT_FOUND, {"status": -1, "message": "Not found"})
+                return
+            endpoint, parse = route
+            if endpoint == ENDPOINT_IDENTIFY and app.gallery is None:
+                self._send_json(HTTPStatus.NOT_FOUND, {"status": -1, "message": "No gallery loaded"})
+                return
+            status, response = app.call(endpoint, parse(body))
+            self._send_json(status, response)
+        except RequestError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"status": -1, "message": str(e)})
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"status": -1, "message": "Internal error"})
+
+    def _read_body(self) -> bytes:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise RequestError("Invalid Content-Length")
+        if length < 0:
+            # rfile.read(-1) would block until the client closes the connection
+            self.close_connection = True
+            raise RequestError("Invalid Content-Length")
+        if length > self.server.app.max_body_bytes:
+            self.close_connection = True
+            raise RequestError("Request body too large")
+        return self.rfile.read(length)
+
+    def _json_body(self, body: bytes) -> dict:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise RequestError("Body is not valid JSON")
+        if not isinstance(payload, dict):
+            raise RequestError("Body must be a JSON object")
+        return payload
+
+    def _parse_embedding(self, body: bytes) -> bytes:
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return _decode_image(self._json_body(body).get("image"), "image")
+        if not body:
+            raise RequestError("Empty body")
+        return body
+
+    def _parse_compare(self, body: bytes) -> tuple:
+        payload = self._json_body(body)
+        return _decode_image(payload.get("image_1"), "image_1"), _decode_image(payload.get("image_2"), "image_2")
+
+    def _parse_identify(self, body: bytes) -> dict:
+        payload = self._json_body(body)
+        request = {"k": payload.get("k", 1), "threshold": payload.get("threshold")}
+        if not isinstance(request["k"], int) or isinstance(request["k"], bool) or request["k"] < 1:
+            raise RequestError("'k' must be a positive integer")
+        if request["threshold"] is not None and (not isinstance(request["threshold"], (int, float))
+                                                 or isinstance(request["threshold"], bool)):
+            raise RequestError("'threshold' must be a number")
+        if "embedding" in payload:
+            try:
+                request["embedding"] = np.asarray(payload["embedding"], dtype=np.float32)
+            except (TypeError, ValueError):
+                raise RequestError("'embedding' must be a list of numbers")
+            if request["embedding"].ndim != 1:
+                raise RequestError("'embedding' must be a list of numbers")
+        else:
+            request["image"] = _decode_image(payload.get("image"), "image")
+        return request
+
+    def _send_json(self, status: HTTPStatus, payload: dict) -> None:
+        headers = {"Retry-After": "1"} if status == HTTPStatus.SERVICE_UNAVAILABLE else None
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json", headers)
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _endpoint_values(values, cast, option: str) -> dict:
+    parsed = {}
+    for value in values or ():
+        name, _, number = value.partition("=")
+        if name not in ENDPOINTS or not number:
+            raise argparse.ArgumentTypeError(f"{option} expects ENDPOINT=VALUE with ENDPOINT one of {ENDPOINTS}")
+        parsed[name] = cast(number)
+    return parsed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tango_python_sdk.serve", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS, help="Batching window in milliseconds")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Largest batch per endpoint")
+    parser.add_argument("--workers", type=int, help="Threads decoding and embedding each batch")
+    parser.add_argument("--processes", type=int, default=0, help="Run inference in a ProcessFaceEngine with this many workers")
+    parser.add_argument("--gallery", help="MappedFaceGallery directory served by /v1/identify")
+    parser.add_argument("--max-pending", action="append", metavar="ENDPOINT=N",
+                        help="Admission limit of an endpoint, e.g. compare=32 (repeatable)")
+    parser.add_argument("--timeout", action="append", metavar="ENDPOINT=SECONDS",
+                        help="Timeout of an endpoint, e.g. embedding=2.5 (repeatable)")
+    parser.add_argument("--no-warmup", action="store_true", help="Do not run a dummy inference before serving")
+    args = parser.parse_args(argv)
+    try:
+        args.max_pending = _endpoint_values(args.max_pending, int, "--max-pending")
+        args.timeout = _endpoint_values(args.timeout, float, "--timeout")
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from .factor import FaceFactor
+
+    face_factor = FaceFactor()
+    engine = None
+    if args.processes:
+        from .process_engine import ProcessFaceEngine
+        engine = ProcessFaceEngine(workers=args.processes)
+        face_factor.set_inference_engine(engine)
+    if not args.no_warmup:
+        face_factor.warmup()
+
+    gallery = None
+    if args.gallery:
+        from .mapped_gallery import MappedFaceGallery
+        gallery = MappedFaceGallery(args.gallery)
+
+    endpoints = {}
+    for name in ENDPOINTS:
+        defaults = EndpointConfig()
+        endpoints[name] = EndpointConfig(max_pending=args.max_pending.get(name, defaults.max_pending),
+                                         timeout=args.timeout.get(name, defaults.timeout))
+    server = InferenceServer(face_factor, gallery=gallery, host=args.host, port=args.port, window=args.window_ms / 1000,
+                             max_batch=args.max_batch, workers=args.workers, endpoints=endpoints)
+    print(f"tango-serve: listening on http://{server.address[0]}:{server.address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        if gallery is not None:
+            gallery.close()
+        if engine is not None:
+            face_factor.set_inference_engine(None)
+            engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import traceback
+import urllib.error
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from timeit import default_timer
+from typing import Iterable, List
+
+import numpy as np
+
+from .factor_modules.FaceModule import Face
+from .helper import distance as distance_utils
+from .helper.result_objects.ShardedIdentifyResult import ShardedIdentifyResult
+
+logger = logging.getLogger(__name__)
+
+
+class ShardTimeout(Exception):
+    """A shard did not answer in time."""
+
+
+class ShardError(Exception):
+    """A shard answered with an error."""
+
+
+def split_gallery(path: str, shard_count: int, ids: Iterable[str], embeddings) -> List[str]:
+    """
+    Write a gallery as `shard_count` MappedFaceGallery directories `path/shard-<i>`.
+
+    An id goes to shard crc32(id) % shard_count, the same rule as `tango-embed --shard`, so outputs of a
+    sharded tango-embed job can be enrolled into the matching gallery shards directly.
+
+    Returns
+    -------
+    list of str
+        The shard directories, in shard order.
+    """
+    from .mapped_gallery import MappedFaceGallery
+
+    if shard_count < 1:
+        raise ValueError("shard_count must be at least 1")
+    ids = list(ids)
+    matrix = distance_utils.as_embedding_matrix(embeddings)
+    if matrix.shape[0] != len(ids):
+        raise ValueError("Number of ids does not match number of embeddings")
+    assignment = np.fromiter((zlib.crc32(embedding_id.encode("utf-8")) % shard_count for embedding_id in ids),
+                             dtype=np.int64, count=len(ids))
+    paths = []
+    for shard in range(shard_count):
+        rows = np.flatnonzero(assignment == shard)
+        shard_path = os.path.join(path, f"shard-{shard}")
+        MappedFaceGallery.create(shard_path, matrix.shape[1], [ids[row] for row in rows], matrix[rows]).close()
+        paths.append(shard_path)
+    return paths
+
+
+class LocalShard:
+    """
+    A gallery in this process: FaceGallery, MappedFaceGallery, IVFPQIndex or anything with `identify`.
+
+    `timeout` is accepted for interface compatibility but not enforced: an in-process search cannot be
+    interrupted. ShardedGallery still stops waiting for the shard at its deadline and reports it in
+    `failed_shards`; the search then finishes in the background.
+    """
+
+    def __init__(self, gallery):
+        self.gallery = gallery
+
+    def search(self, embedding: np.ndarray, k: int, threshold: float, timeout: float = None):
+        # timeout is not enforced, see the class docstring
+        result = self.gallery.identify(embedding, k=k, threshold=threshold)
+        if result.status != 0:
+            raise ShardError(result.message)
+        return list(result.ids), np.asarray(result.distances, dtype=np.float32)
+
+    def close(self) -> None:
+        pass
+
+
+def _shard_worker_main(conn, path: str) -> None:
+    from .mapped_gallery import MappedFaceGallery
+
+    try:
+        gallery = MappedFaceGallery(path)
+    except Exception:
+        conn.send((None, -1, traceback.format_exc(), None, None))
+        return
+    conn.send((None, 0, "OK", None, None))
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            request_id, embedding, k, threshold = request
+            result = gallery.identify(embedding, k=k, threshold=threshold)
+            conn.send((request_id, result.status, result.message, result.ids, result.distances))
+    finally:
+        gallery.close()
+
+
+class ProcessShard:
+    """
+    A MappedFaceGallery directory searched by a dedicated worker process. The worker is restarted if it
+    dies. Requests carry ids, so an answer that arrives after its request timed out is discarded.
+    """
+
+    def __init__(self, path: str, start_method: str = "spawn"):
+        self.path = path
+        self._context = multiprocessing.get_context(start_method)
+        self._lock = threading.Lock()
+        self._request_id = 0
+        self._process = None
+        self._conn = None
+        self._start()
+
+    def _start(self, deadline: float = None) -> None:
+        """Start a worker, replacing a dead one. Raises ShardTimeout if it is not ready by `deadline`."""
+        self._stop_worker()
+        if deadline is not None and deadline <= default_timer():
+            raise ShardTimeout(self.path)
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(target=_shard_worker_main, args=(child_conn, self.path),
+                                              name="tango-shard", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        remaining = None if deadline is None else deadline - default_timer()
+        if remaining is not None and (remaining <= 0 or not self._conn.poll(remaining)):
+            # Stopped here, so the next search starts a fresh worker
+            self._stop_worker()
+            raise ShardTimeout(self.path)
+        try:
+            _, status, message, _, _ = self._conn.recv()
+        except EOFError:
+            status, message = -1, "worker exited during start-up"
+        if status != 0:
+            self._stop_worker()
+            raise RuntimeError(f"Failed to open shard {self.path}: {message}")
+
+    def _stop_worker(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def search(self, embedding: np.ndarray, k: int, threshold: float, timeout: float = None):
+        deadline = None if timeout is None else default_timer() + timeout
+        if not self._lock.acquire(timeout=-1 if timeout is None else max(timeout, 0)):
+            raise ShardTimeout(self.path)
+        try:
+            if self._process is None or not self._process.is_alive():
+                logger.error(f"Shard worker for {self.path} is not running, restarting it")
+                self._start(deadline)
+            self._request_id += 1
+            request_id = self._request_id
+            self._conn.send((request_id, np.asarray(embedding, dtype=np.float32), k, threshold))
+            while True:
+                remaining = None if deadline is None else deadline - default_timer()
+                if remaining is not None and (remaining <= 0 or not self._conn.poll(remaining)):
+                    raise ShardTimeout(self.path)
+                answer_id, status, message, ids, distances = self._conn.recv()
+                if answer_id == request_id:
+                    break
+        finally:
+            self._lock.release()
+        if status != 0:
+            raise ShardError(message)
+        return list(ids), np.asarray(distances, dtype=np.float32)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            if self._process is not None:
+                self._process.join(timeout=5)
+            self._stop_worker()
+
+
+class HttpShard:
+    """A shard served by `python -m tango_python_sdk.serve --gallery ...`, searched through /v1/identify."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/") + "/v1/identify"
+
+    def search(self, embedding: np.ndarray, k: int, threshold: float, timeout: float = None):
+        body = json.dumps({"embedding": np.asarray(embedding, dtype=np.float32).tolist(), "k": k,
+                           "threshold": threshold}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code == 504:
+                raise ShardTimeout(self.url)
+            raise ShardError(f"{self.url} answered {e.code}")
+        except OSError as e:
+            # Connect timeouts arrive wrapped in URLError, read timeouts as socket.timeout
+            if isinstance(getattr(e, "reason", e), TimeoutError) or "timed out" in str(e):
+                raise ShardTimeout(self.url)
+            raise ShardError(f"{self.url}: {e}")
+        if payload.get("status") != 0:
+            raise ShardError(payload.get("message", ""))
+        return payload["ids"], np.asarray(payload["distances"], dtype=np.float32)
+
+    def close(self) -> None:
+        pass
+
+
+class ShardedGallery:
+    """
+    Scatter-gather 1:N search over gallery shards.
+
+    Each probe is sent to every shard at once; every shard returns its own top-k matches and the
+    coordinator merges them into the global top-k. The merge is exact: any global top-k match is in
+    the top-k of its own shard. Shards that fail or do not answer within the timeout are left out and
+    the result is flagged `partial`.
+
+        Parameters
+        ----------
+        shards : list
+            LocalShard, ProcessShard or HttpShard objects. Plain galleries (anything with `identify`)
+            are wrapped in LocalShard.
+
+        timeout : float, optional
+            Default per-query timeout in seconds. None waits for every shard.
+
+        Methods
+        -------
+        identify
+        close
+    """
+
+    def __init__(self, shards: Iterable, timeout: float = None):
+        self.shards = [shard if hasattr(shard, "search") else LocalShard(shard) for shard in shards]
+        if not self.shards:
+            raise ValueError("At least one shard is needed")
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="tango-shard")
+
+    @classmethod
+    def from_directories(cls, paths: Iterable[str], timeout: float = None, start_method: str = "spawn") -> "ShardedGallery":
+        """One ProcessShard per MappedFaceGallery directory, e.g. as written by `split_gallery`."""
+        return cls([ProcessShard(path, start_method=start_method) for path in paths], timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def identify(self, embedding, k: int = 1, threshold: float = None, timeout: float = None) -> ShardedIdentifyResult:
+        """
+        Find the enrolled embeddings that match a probe across all shards.
+
+        Parameters
+        ----------
+        embedding : np.ndarray or list
+            The probe embedding vector.
+
+        k : int, optional
+            Maximum number of matches to return.
+
+        threshold : float, optional
+            Distance threshold. Defaults to `Face.COMPARE_THRESHOLD`.
+
+        timeout : float, optional
+            Seconds to wait for the shards. Defaults to the gallery's timeout.
+
+        Returns
+        -------
+        ShardedIdentifyResult
+            - status: int [0 if at least one shard answered, -1 otherwise]
+            - message: str [Message from the operation]
+            - ids: list [Ids of the matches, closest first]
+            - distances: np.ndarray [Distances matching `ids`]
+            - partial: bool [True if some shards are missing from the result]
+            - failed_shards: list [Indices of the shards that timed out or failed]
+        """
+        if threshold is None:
+            threshold = Face.COMPARE_THRESHOLD
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            if k < 1:
+                raise ValueError("k must be at least 1")
+            embedding = distance_utils.as_embedding_vector(embedding)
+            futures = [self._executor.submit(shard.search, embedding, k, threshold, timeout) for shard in self.shards]
+            wait(futures, timeout=timeout)
+
+            ids, distances, failed = [], [], []
+            for index, future in enumerate(futures):
+                if not future.done():
+                    future.cancel()
+                    failed.append(index)
+                    continue
+                try:
+                    shard_ids, shard_distances = future.result()
+                except Exception as e:
+                    logger.error(f"Shard {index} failed: {e!r}")
+                    failed.append(index)
+                    continue
+                ids.extend(shard_ids)
+                distances.append(shard_distances)
+
+            if len(failed) == len(self.shards):
+                return ShardedIdentifyResult(partial=True, failed_shards=failed, message="No shard answered.")
+            distances = np.concatenate(distances) if distances else np.empty(0, dtype=np.float32)
+            selected, distances = distance_utils.select_top_k(distances, k)
+            message = "OK" if not failed else f"{len(failed)} of {len(self.shards)} shards did not answer."
+            return ShardedIdentifyResult(ids=[ids[row] for row in selected], distances=distances, partial=bool(failed),
+                                         failed_shards=failed, status=ShardedIdentifyResult.CALL_STATUS_SUCCESS,
+                                         message=message)
+        except Exception as e:
+            print(f"Oops: {e}\nTrace: {traceback.format_exc()}")
+            return ShardedIdentifyResult(message="Error occurred while identifying embedding.")
+
+    def close(self) -> None:
+        """Close every shard and stop the coordinator threads."""
+        self._executor.shutdown(wait=False)
+        for shard in self.shards:
+            shard.close()
@@ -0,0 +1,320 @@
+"""
+Throughput and latency benchmarks for the Python side of the SDK.
+
+Runs over tests/example/test_images and writes machine-readable JSON. With --stub the native library is
+replaced by tests/benchmark/stub/tango_stub.c, so the benchmarks run without the proprietary OpenCV and
+TensorFlow Lite dependencies; --latency-us and --embedding-size shape the stub.
+
+    python tests/benchmark/bench.py --stub --latency-us 2000 --output bench.json
+    python tests/benchmark/bench.py --stub --latency-us 2000 --baseline bench.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import ctypes
+import json
+import os
+import pathlib
+import platform
+import sys
+from timeit import default_timer
+
+import numpy as np
+
+BENCHMARK_DIR = pathlib.Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCHMARK_DIR.parent.parent.joinpath("src")))
+sys.path.insert(0, str(BENCHMARK_DIR))
+
+from stub_library import use_stub  # noqa: E402
+
+SCHEMA_VERSION = 1
+DEFAULT_IMAGES_DIR = BENCHMARK_DIR.parent.joinpath("example", "test_images")
+
+
+def summarize(name: str, latencies: list, items: int = None, **extra) -> dict:
+    """Latency percentiles and throughput for a list of per-call durations in seconds."""
+    latencies = np.asarray(latencies, dtype=np.float64)
+    total = float(latencies.sum())
+    items = len(latencies) if items is None else items
+    result = {
+        "name": name,
+        "calls": int(len(latencies)),
+        "items": int(items),
+        "total_s": total,
+        "throughput_per_s": items / total if total > 0 else None,
+        "mean_ms": float(latencies.mean() * 1e3),
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+    }
+    result.update(extra)
+    return result
+
+
+def timed_calls(function, arguments, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        for argument in arguments:
+            start_time = default_timer()
+            function(argument)
+            latencies.append(default_timer() - start_time)
+    return latencies
+
+
+def bench_decode(image_paths, repeat):
+    from tango_python_sdk.helper.utils import image_path_to_array
+
+    yield summarize("decode", timed_calls(lambda path: image_path_to_array(path, "rgb"), image_paths, repeat))
+    yield summarize("decode_max_side_512",
+                    timed_calls(lambda path: image_path_to_array(path, "rgb", max_side=512), image_paths, repeat))
+
+
+def bench_native(images, repeat):
+    from tango_python_sdk.handler.nativeMethods import NativeMethods
+
+    native = NativeMethods().load()
+    yield summarize("native_embedding", timed_calls(native.get_embedding, images, repeat))
+
+
+def bench_conversion(embedding_size, repeat):
+    from tango_python_sdk.helper.result_objects.GetEmbeddingResult import GetEmbeddingResult
+
+    buffer = (ctypes.c_float * embedding_size)(*np.random.default_rng(0).random(embedding_size))
+    pointer = ctypes.cast(buffer, ctypes.POINTER(ctypes.c_float))
+    calls = [None] * 1000
+
+    def per_element(_):
+        return [pointer[i] for i in range(embedding_size)]
+
+    def bulk(_):
+        return np.ctypeslib.as_array(pointer, shape=(embedding_size,)).astype(np.float32, copy=True)
+
+    result = GetEmbeddingResult(embedding=bulk(None), status=0)
+    yield summarize("output_conversion_per_element", timed_calls(per_element, calls, repeat))
+    yield summarize("output_conversion_bulk", timed_calls(bulk, calls, repeat))
+    yield summarize("embedding_list_view", timed_calls(lambda _: result.embedding_list, calls, repeat))
+
+
+def bench_serialization(embedding_size, repeat, batch_size=256):
+    from tango_python_sdk.helper import wire_format
+
+    rng = np.random.default_rng(0)
+    embedding = rng.random(embedding_size, dtype=np.float32)
+    batch = rng.random((batch_size, embedding_size), dtype=np.float32)
+    calls = [None] * 1000
+    as_json = json.dumps(embedding.tolist())
+    as_wire = wire_format.encode_embeddings(embedding)
+    yield summarize("serialize_json", timed_calls(lambda _: json.dumps(embedding.tolist()), calls, repeat),
+                    bytes=len(as_json))
+    yield summarize("serialize_wire", timed_calls(lambda _: wire_format.encode_embeddings(embedding), calls, repeat),
+                    bytes=len(as_wire))
+    yield summarize("parse_json", timed_calls(lambda _: np.asarray(json.loads(as_json), dtype=np.float32), calls, repeat))
+    yield summarize("parse_wire", timed_calls(lambda _: wire_format.decode_embeddings(as_wire), calls, repeat))
+    for scheme in ("float32", "int8"):
+        encoded = wire_format.encode_embeddings(batch, scheme=scheme, checksum=True)
+        yield summarize(f"parse_wire_batch_{scheme}_checksum",
+                        timed_calls(lambda _: wire_format.decode_embeddings(encoded), [None] * 100, repeat),
+                        items=100 * repeat * batch_size, bytes=len(encoded))
+
+
+def bench_distance(face_factor, embedding_size, gallery_size, repeat):
+    from tango_python_sdk.helper import distance as distance_utils
+
+    rng = np.random.default_rng(0)
+    gallery = rng.random((gallery_size, embedding_size), dtype=np.float32)
+    queries = list(gallery[:100] + 0.01)
+    yield summarize("distance_pair", timed_calls(lambda query: face_factor.get_distance(query, gallery[0]), queries, repeat))
+    yield summarize("distances_one_to_many", timed_calls(lambda query: distance_utils.get_distances(query, gallery), queries, repeat),
+                    items=len(queries) * repeat * gallery_size, gallery_size=gallery_size)
+    yield summarize("top_k_10", timed_calls(lambda query: distance_utils.top_k(query, gallery, 10), queries, repeat),
+                    gallery_size=gallery_size)
+
+
+def bench_distance_backends(embedding_size, repeat, pairs=4096):
+    from tango_python_sdk.handler import distance_backends
+    from tango_python_sdk.handler.nativeMethods import NativeMethods
+
+    rng = np.random.default_rng(0)
+    embeddings_a = rng.random((pairs, embedding_size), dtype=np.float32)
+    embeddings_b = rng.random((pairs, embedding_size), dtype=np.float32)
+    native = NativeMethods()
+    for name in distance_backends.BACKENDS:
+        backend = distance_backends.create_distance_backend(name, native)
+        yield summarize(f"pair_distances_{name}",
+                        timed_calls(lambda _: backend.pair_distances(embeddings_a, embeddings_b), [None] * 10, repeat),
+                        items=10 * repeat * pairs, pairs=pairs, backend=name)
+
+
+def bench_gallery_storage(embedding_size, gallery_size, repeat):
+    from tango_python_sdk.gallery import FaceGallery
+    from tango_python_sdk.helper import quantization
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((gallery_size, embedding_size), dtype=np.float32)
+    queries = list(embeddings[:100] + 0.01)
+    ids = [str(i) for i in range(gallery_size)]
+    for storage in quantization.SCHEMES:
+        gallery = FaceGallery(dimension=embedding_size, initial_capacity=gallery_size, storage=storage)
+        gallery.enroll_many(ids, embeddings)
+        yield summarize(f"identify_{storage}", timed_calls(lambda query: gallery.identify(query, k=10), queries, repeat),
+                        gallery_size=gallery_size, storage=storage, gallery_bytes=gallery.nbytes)
+
+
+def quantization_accuracy(embeddings) -> list:
+    """Match-decision agreement of each storage scheme against float32 on the benchmark embeddings."""
+    from tango_python_sdk.helper import quantization
+
+    return [quantization.threshold_agreement(embeddings, scheme) for scheme in quantization.SCHEMES[1:]]
+
+
+def bench_compare(face_factor, image_paths, repeat):
+    pairs = [(image_paths[i], image_paths[(i + 1) % len(image_paths)]) for i in range(len(image_paths))]
+    yield summarize("compare", timed_calls(lambda pair: face_factor.compare(image_path_1=pair[0], image_path_2=pair[1]),
+                                           pairs, repeat))
+
+
+def bench_concurrency(face_factor, image_paths, repeat, worker_counts):
+    batch = image_paths * repeat
+    for workers in worker_counts:
+        start_time = default_timer()
+        face_factor.get_embeddings(batch, max_workers=workers)
+        yield summarize(f"get_embeddings_workers_{workers}", [default_timer() - start_time], items=len(batch), workers=workers)
+
+    start_time = default_timer()
+    for _ in face_factor.embed_stream(batch):
+        pass
+    yield summarize("embed_stream", [default_timer() - start_time], items=len(batch))
+
+    from tango_python_sdk.async_factor import AsyncFaceFactor
+
+    async def run_async(async_face_factor):
+        async def one(path):
+            start = default_timer()
+            await async_face_factor.get_embedding(image_path=path)
+            return default_timer() - start
+        return await asyncio.gather(*(one(path) for path in batch))
+
+    with_workers = max(worker_counts)
+    async_face_factor = AsyncFaceFactor(max_workers=with_workers, face_factor=face_factor)
+    start_time = default_timer()
+    latencies = asyncio.run(run_async(async_face_factor))
+    total = default_timer() - start_time
+    async_face_factor.close()
+    result = summarize(f"async_get_embedding_workers_{with_workers}", latencies, workers=with_workers)
+    result["total_s"] = total
+    result["throughput_per_s"] = len(batch) / total
+    yield result
+
+
+def environment(args) -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "native": "stub" if args.stub else "libtango",
+        "stub_latency_us": args.latency_us if args.stub else None,
+        "stub_busy": args.busy if args.stub else None,
+        "embedding_size": args.embedding_size if args.stub else None,
+        "repeat": getattr(args, "repeat", None),
+    }
+
+
+def find_regressions(results: list, baseline: dict, max_regression: float) -> list:
+    """Benchmarks whose throughput dropped by more than `max_regression` (a fraction) against the baseline."""
+    previous = {entry["name"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        old = previous.get(entry["name"])
+        if not old or not old.get("throughput_per_s") or not entry.get("throughput_per_s"):
+            continue
+        change = entry["throughput_per_s"] / old["throughput_per_s"] - 1.0
+        if change < -max_regression:
+            regressions.append({"name": entry["name"], "change": change})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=str(DEFAULT_IMAGES_DIR), help="Directory of benchmark images")
+    parser.add_argument("--stub", action="store_true", help="Use the stand-in native library")
+    parser.add_argument("--latency-us", type=int, default=1000, help="Stub inference latency in microseconds")
+    parser.add_argument("--busy", action="store_true", help="Stub spins the CPU instead of sleeping")
+    parser.add_argument("--embedding-size", type=int, default=128, help="Stub embedding length")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the image set per benchmark")
+    parser.add_argument("--gallery-size", type=int, default=50000, help="Gallery rows for one-to-many distance")
+    parser.add_argument("--workers", type=int, nargs="+", help="Thread counts for the batch benchmarks")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare throughput against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed throughput drop against --baseline, as a fraction")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.stub:
+        use_stub(latency_us=args.latency_us, embedding_size=args.embedding_size, busy=args.busy)
+
+    from tango_python_sdk.factor import FaceFactor
+    from tango_python_sdk.helper.pipeline import iter_image_paths
+    from tango_python_sdk.helper.utils import image_path_to_array
+
+    image_paths = list(iter_image_paths(args.images))
+    if not image_paths:
+        print(f"No images found in {args.images}", file=sys.stderr)
+        return 2
+    images = [image_path_to_array(path, "rgb") for path in image_paths]
+    worker_counts = args.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    face_factor = FaceFactor()
+    face_factor.warmup()
+    embedding_size = face_factor.get_embedding(image_data=images[0]).embedding.shape[0]
+
+    results = []
+    for benchmark in (bench_decode(image_paths, args.repeat),
+                      bench_native(images, args.repeat),
+                      bench_conversion(embedding_size, args.repeat),
+                      bench_serialization(embedding_size, args.repeat),
+                      bench_distance(face_factor, embedding_size, args.gallery_size, args.repeat),
+                      bench_distance_backends(embedding_size, args.repeat),
+                      bench_gallery_storage(embedding_size, args.gallery_size, args.repeat),
+                      bench_compare(face_factor, image_paths, args.repeat),
+                      bench_concurrency(face_factor, image_paths, args.repeat, worker_counts)):
+        for result in benchmark:
+            print(f"{result['name']:<40} {result['throughput_per_s'] or 0:>14.1f}/s "
+                  f"p50 {result['p50_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms", file=sys.stderr)
+            results.append(result)
+
+    embeddings = np.stack([face_factor.get_embedding(image_data=image).embedding for image in images])
+    accuracy = quantization_accuracy(embeddings) if len(embeddings) >= 2 else []
+    for entry in accuracy:
+        print(f"{entry['scheme']:<8} agreement {entry['agreement']:.4%} over {entry['pairs']} pairs, "
+              f"max error {entry['max_abs_error']:.2e}, {entry['compression']:.2f}x smaller", file=sys.stderr)
+
+    from tango_python_sdk.handler import distance_backends
+    from tango_python_sdk.handler.nativeMethods import NativeMethods
+
+    fastest, timings = distance_backends.select_fastest_backend(NativeMethods(), dimension=embedding_size)
+    print(f"fastest distance backend: {fastest}", file=sys.stderr)
+
+    report = {"schema_version": SCHEMA_VERSION, "environment": environment(args), "results": results,
+              "accuracy": accuracy, "distance_backend": {"fastest": fastest, "seconds_per_pair": timings}}
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = find_regressions(results, json.load(fp), args.max_regression)
+        report["regressions"] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']}: {regression['change']:+.1%} throughput", file=sys.stderr)
+        exit_code = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
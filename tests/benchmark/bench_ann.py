@@ -0,0 +1,101 @@
+"""
+Recall against exact search, and query latency, of IVFPQIndex for a sweep of nprobe values.
+
+The gallery is synthetic: unit-length embeddings drawn around a set of latent identities, and probes
+are slightly perturbed gallery rows, so neighbourhoods look like those of real face embeddings.
+
+    python tests/benchmark/bench_ann.py --gallery-size 1000000 --nlist 2048 --pq 16 --output ann.json
+"""
+import argparse
+import json
+import pathlib
+import sys
+from timeit import default_timer
+
+import numpy as np
+
+BENCHMARK_DIR = pathlib.Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCHMARK_DIR.parent.parent.joinpath("src")))
+sys.path.insert(0, str(BENCHMARK_DIR))
+
+from bench import summarize  # noqa: E402
+
+
+def synthetic_gallery(size: int, dimension: int, identities: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    latent = rng.standard_normal((identities, dimension), dtype=np.float32)
+    embeddings = np.empty((size, dimension), dtype=np.float32)
+    for start in range(0, size, 65536):
+        stop = min(start + 65536, size)
+        block = latent[rng.integers(0, identities, stop - start)]
+        block += rng.standard_normal(block.shape, dtype=np.float32) * 0.5
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        embeddings[start:stop] = block
+    return embeddings
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gallery-size", type=int, default=200000)
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--identities", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq", type=int, help="PQ sub-vectors; omit for IVF-Flat")
+    parser.add_argument("--rerank-store", help="Memory-map the re-ranking embeddings from this file")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--train-rows", type=int, default=100000)
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    from tango_python_sdk.ann_index import IVFPQIndex
+    from tango_python_sdk.helper import distance as distance_utils
+
+    embeddings = synthetic_gallery(args.gallery_size, args.dimension, args.identities)
+    rng = np.random.default_rng(1)
+    queries = embeddings[rng.integers(0, args.gallery_size, args.queries)]
+    queries = queries + rng.standard_normal(queries.shape, dtype=np.float32) * 0.02
+
+    exact_latencies, truth = [], []
+    for query in queries:
+        start_time = default_timer()
+        rows, _ = distance_utils.top_k(query, embeddings, args.k)
+        exact_latencies.append(default_timer() - start_time)
+        truth.append(set(rows.tolist()))
+    results = [summarize("exact", exact_latencies, recall=1.0)]
+
+    index = IVFPQIndex(nlist=args.nlist, pq_subvectors=args.pq, rerank_store=args.rerank_store)
+    start_time = default_timer()
+    index.train(embeddings, max_rows=args.train_rows)
+    train_s = default_timer() - start_time
+    start_time = default_timer()
+    index.add(range(args.gallery_size), embeddings)
+    add_s = default_timer() - start_time
+    print(f"train {train_s:.1f} s, add {add_s:.1f} s", file=sys.stderr)
+
+    for nprobe in args.nprobe:
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start_time = default_timer()
+            ids, _ = index.search(query, k=args.k, nprobe=nprobe)
+            latencies.append(default_timer() - start_time)
+            hits += len(expected.intersection(ids.tolist()))
+        results.append(summarize(f"ivf_nprobe_{nprobe}", latencies, nprobe=nprobe, recall=hits / (args.k * args.queries)))
+
+    for result in results:
+        print(f"{result['name']:<20} recall@{args.k} {result['recall']:.4f}  p50 {result['p50_ms']:>8.3f} ms  "
+              f"p99 {result['p99_ms']:>8.3f} ms", file=sys.stderr)
+
+    report = {"config": vars(args), "train_s": train_s, "add_s": add_s, "results": results}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Soak test: run embed/compare cycles for a long time in one process and watch for slow memory growth
+and latency drift.
+
+Each cycle embeds an image, computes a distance and compares two images (three native embeddings).
+Every --sample-every cycles the process RSS, the native buffer counts of NativeMethods.allocation_stats
+(and of the stub library itself with --stub), the number of live Python objects and the latency
+percentiles of the window are recorded. The report separates the two usual suspects: RSS that grows
+while the Python heap (--tracemalloc) and object count stay flat points at native memory; outstanding
+buffers above zero point at the SDK.
+
+    python tests/benchmark/soak.py --stub --cycles 2000000 --output soak.json
+    python tests/benchmark/soak.py --cycles 1000000 --images tests/example/test_images --max-rss-growth-mb 16
+"""
+import argparse
+import ctypes
+import gc
+import json
+import os
+import pathlib
+import sys
+import tracemalloc
+from timeit import default_timer
+
+import numpy as np
+
+BENCHMARK_DIR = pathlib.Path(__file__).parent.resolve()
+sys.path.insert(0, str(BENCHMARK_DIR.parent.parent.joinpath("src")))
+sys.path.insert(0, str(BENCHMARK_DIR))
+
+from bench import environment  # noqa: E402
+from stub_library import use_stub  # noqa: E402
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes. Falls back to the peak RSS where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def stub_outstanding():
+    """Buffers the stub library has handed out and not yet been given back, or None without the stub."""
+    library_path = os.environ.get("TANGO_LIBRARY_PATH")
+    if not library_path:
+        return None
+    function = getattr(ctypes.CDLL(library_path), "tango_stub_outstanding_embeddings", None)
+    if function is None:
+        return None
+    function.restype = ctypes.c_long
+    return function
+
+
+def synthetic_images(count: int, size: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def slope_per_million(cycles, values) -> float:
+    """Least-squares slope of `values` against `cycles`, per million cycles."""
+    if len(cycles) < 2:
+        return 0.0
+    return float(np.polyfit(np.asarray(cycles, dtype=np.float64), np.asarray(values, dtype=np.float64), 1)[0] * 1e6)
+
+
+def analyze(samples: list, warmup: int) -> dict:
+    """RSS growth and latency drift after the first `warmup` samples, when allocator pools have settled."""
+    steady = samples[warmup:] if len(samples) > warmup + 1 else samples
+    first, last = steady[0], steady[-1]
+    cycles = [sample["cycles"] for sample in steady]
+    return {
+        "steady_from_cycle": first["cycles"],
+        "rss_growth_mb": (last["rss_bytes"] - first["rss_bytes"]) / 2 ** 20,
+        "rss_slope_mb_per_million": slope_per_million(cycles, [sample["rss_bytes"] / 2 ** 20 for sample in steady]),
+        "objects_growth": last["python_objects"] - first["python_objects"],
+        "python_heap_growth_mb": (None if first["python_heap_bytes"] is None
+                                  else (last["python_heap_bytes"] - first["python_heap_bytes"]) / 2 ** 20),
+        "p50_drift": last["p50_ms"] / first["p50_ms"] - 1.0 if first["p50_ms"] else None,
+        "p50_slope_ms_per_million": slope_per_million(cycles, [sample["p50_ms"] for sample in steady]),
+        "p99_drift": last["p99_ms"] / first["p99_ms"] - 1.0 if first["p99_ms"] else None,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=1000000, help="Embed/compare cycles to run")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds even if cycles remain")
+    parser.add_argument("--sample-every", type=int, default=10000, help="Cycles per sample")
+    parser.add_argument("--warmup-samples", type=int, default=2, help="Samples excluded from growth and drift")
+    parser.add_argument("--images", help="Directory of images; defaults to synthetic images")
+    parser.add_argument("--image-size", type=int, default=112, help="Side of the synthetic images")
+    parser.add_argument("--stub", action="store_true", help="Use the stand-in native library")
+    parser.add_argument("--latency-us", type=int, default=0, help="Stub inference latency in microseconds")
+    parser.add_argument("--busy", action="store_true", help="Stub spins the CPU instead of sleeping")
+    parser.add_argument("--embedding-size", type=int, default=128, help="Stub embedding length")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Also trace the Python heap and list the biggest growing allocation sites (slow)")
+    parser.add_argument("--max-rss-growth-mb", type=float, help="Exit with status 1 if steady-state RSS grows more")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.cycles < 1 or args.sample_every < 1:
+        parser.error("--cycles and --sample-every must be at least 1")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.stub:
+        use_stub(latency_us=args.latency_us, embedding_size=args.embedding_size, busy=args.busy)
+
+    from tango_python_sdk.factor import FaceFactor
+    from tango_python_sdk.handler.nativeMethods import NativeMethods
+
+    if args.images:
+        from tango_python_sdk.helper.pipeline import iter_image_paths
+        from tango_python_sdk.helper.utils import image_path_to_array
+
+        images = [image_path_to_array(path, "rgb") for path in iter_image_paths(args.images)]
+        if len(images) < 2:
+            print(f"Need at least two images in {args.images}", file=sys.stderr)
+            return 2
+    else:
+        images = synthetic_images(8, args.image_size)
+
+    face_factor = FaceFactor()
+    face_factor.warmup()
+    library_outstanding = stub_outstanding()
+    reference = face_factor.get_embedding(image_data=images[0]).embedding
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    samples, failures, baseline_snapshot = [], 0, None
+    latencies = np.empty(args.sample_every, dtype=np.float64)
+    start_time = default_timer()
+    cycle, window = 0, 0
+    while cycle < args.cycles:
+        image = images[cycle % len(images)]
+        other = images[(cycle + 1) % len(images)]
+        call_start = default_timer()
+        embedding = face_factor.get_embedding(image_data=image)
+        if embedding.status == 0:
+            face_factor.get_distance(embedding.embedding, reference)
+        compared = face_factor.compare(image_data_1=image, image_data_2=other)
+        latencies[window] = default_timer() - call_start
+        failures += (embedding.status != 0) + (compared.status != 0)
+        cycle += 1
+        window += 1
+
+        elapsed = default_timer() - start_time
+        out_of_time = args.duration is not None and elapsed >= args.duration
+        if window == args.sample_every or cycle == args.cycles or out_of_time:
+            del embedding, compared
+            gc.collect()
+            allocations = NativeMethods.allocation_stats()
+            window_latencies = latencies[:window]
+            sample = {
+                "cycles": cycle,
+                "elapsed_s": elapsed,
+                "rss_bytes": current_rss(),
+                "python_heap_bytes": tracemalloc.get_traced_memory()[0] if args.tracemalloc else None,
+                "python_objects": len(gc.get_objects()),
+                "native_allocated": allocations["allocated"],
+                "native_outstanding": allocations["outstanding"],
+                "library_outstanding": library_outstanding() if library_outstanding else None,
+                "p50_ms": float(np.percentile(window_latencies, 50) * 1e3),
+                "p99_ms": float(np.percentile(window_latencies, 99) * 1e3),
+            }
+            samples.append(sample)
+            print(f"{cycle:>10} cycles  rss {sample['rss_bytes'] / 2 ** 20:>8.1f} MB  "
+                  f"objects {sample['python_objects']:>8}  outstanding {sample['native_outstanding']}  "
+                  f"p50 {sample['p50_ms']:.3f} ms  p99 {sample['p99_ms']:.3f} ms", file=sys.stderr)
+            if args.tracemalloc and len(samples) == args.warmup_samples:
+                baseline_snapshot = tracemalloc.take_snapshot()
+            window = 0
+            if out_of_time:
+                break
+
+    summary = analyze(samples, args.warmup_samples)
+    summary["cycles"] = cycle
+    summary["failed_calls"] = failures
+    summary["native"] = NativeMethods.allocation_stats()
+    summary["library_outstanding"] = samples[-1]["library_outstanding"]
+    if baseline_snapshot is not None:
+        growth = tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")
+        summary["python_heap_top_growth"] = [{"site": str(stat.traceback), "size_diff_bytes": stat.size_diff,
+                                              "count_diff": stat.count_diff} for stat in growth[:10]]
+
+    print(f"RSS {summary['rss_growth_mb']:+.2f} MB after warmup ({summary['rss_slope_mb_per_million']:+.2f} MB per "
+          f"million cycles), p50 drift {summary['p50_drift'] or 0:+.1%}, native buffers allocated "
+          f"{summary['native']['allocated']}, outstanding {summary['native']['outstanding']}", file=sys.stderr)
+
+    exit_code = 0
+    if summary["native"]["outstanding"] or summary["library_outstanding"]:
+        print("LEAK: native embedding buffers were not freed", file=sys.stderr)
+        exit_code = 1
+    if args.max_rss_growth_mb is not None and summary["rss_growth_mb"] > args.max_rss_growth_mb:
+        print(f"LEAK: RSS grew by more than {args.max_rss_growth_mb} MB", file=sys.stderr)
+        exit_code = 1
+
+    report = {"environment": environment(args), "config": vars(args), "summary": summary, "samples": samples}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+/*
+ * Stand-in for libtango.so used by the benchmarks.
+ *
+ * Exports the same tango_get_embedding / tango_free_embedding / tango_get_embeddings_distance ABI
+ * without OpenCV or TensorFlow Lite. Embeddings are derived from the image pixels, so equal images
+ * get equal embeddings. Behaviour is configured through environment variables read once:
+ *
+ *   TANGO_STUB_EMBEDDING_SIZE  floats per embedding (default 128)
+ *   TANGO_STUB_LATENCY_US      simulated inference time per call in microseconds (default 0)
+ *   TANGO_STUB_BUSY            1 to spin the CPU for the latency instead of sleeping (default 0)
+ *
+ * tango_stub_outstanding_embeddings() returns the number of embedding buffers not yet freed, so the
+ * soak test can check the SDK's bookkeeping against the library's.
+ *
+ * Build: cc -shared -fPIC -O2 -o libtango_stub.so tango_stub.c -lm
+ */
+#define _POSIX_C_SOURCE 199309L
+
+#include <math.h>
+#include <pthread.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <time.h>
+
+static int embedding_size = 128;
+static long latency_us = 0;
+static int busy = 0;
+static pthread_once_t config_once = PTHREAD_ONCE_INIT;
+static long outstanding_embeddings = 0;
+
+static void read_config(void) {
+    const char *value;
+    if ((value = getenv("TANGO_STUB_EMBEDDING_SIZE")) != NULL && atoi(value) > 0)
+        embedding_size = atoi(value);
+    if ((value = getenv("TANGO_STUB_LATENCY_US")) != NULL && atol(value) > 0)
+        latency_us = atol(value);
+    if ((value = getenv("TANGO_STUB_BUSY")) != NULL)
+        busy = atoi(value) != 0;
+}
+
+static double now_us(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1e6 + ts.tv_nsec / 1e3;
+}
+
+static void simulate_latency(void) {
+    if (latency_us <= 0)
+        return;
+    if (busy) {
+        double end = now_us() + latency_us;
+        while (now_us() < end) {
+        }
+    } else {
+        struct timespec ts = {latency_us / 1000000, (latency_us % 1000000) * 1000};
+        nanosleep(&ts, NULL);
+    }
+}
+
+bool tango_get_embedding(const uint8_t *image_bytes, const int image_width, const int image_height,
+                         float **embedding_buffer_out, int *embedding_buffer_length_out) {
+    pthread_once(&config_once, read_config);
+    if (image_bytes == NULL || image_width <= 0 || image_height <= 0)
+        return false;
+
+    /* Sample the image sparsely so the cost stays small next to the simulated latency */
+    uint64_t state = 1469598103934665603ULL;
+    long pixels = (long)image_width * image_height;
+    for (long i = 0; i < pixels; i += 61)
+        state = (state ^ image_bytes[i]) * 1099511628211ULL;
+
+    float *embedding = malloc(sizeof(float) * embedding_size);
+    if (embedding == NULL)
+        return false;
+    for (int i = 0; i < embedding_size; i++) {
+        state = state * 6364136223846793005ULL + 1442695040888963407ULL;
+        embedding[i] = (float)((state >> 40) % 10000) / 10000.0f / 8.0f;
+    }
+
+    simulate_latency();
+    __atomic_add_fetch(&outstanding_embeddings, 1, __ATOMIC_RELAXED);
+    *embedding_buffer_out = embedding;
+    *embedding_buffer_length_out = embedding_size;
+    return true;
+}
+
+void tango_free_embedding(const float *embedding_buffer) {
+    if (embedding_buffer != NULL)
+        __atomic_sub_fetch(&outstanding_embeddings, 1, __ATOMIC_RELAXED);
+    free((void *)embedding_buffer);
+}
+
+long tango_stub_outstanding_embeddings(void) {
+    return __atomic_load_n(&outstanding_embeddings, __ATOMIC_RELAXED);
+}
+
+float tango_get_embeddings_distance(const float *embedding_one, const int embedding_one_length,
+                                    const float *embedding_two, const int embedding_two_length) {
+    int length = embedding_one_length < embedding_two_length ? embedding_one_length : embedding_two_length;
+    double sum = 0.0;
+    for (int i = 0; i < length; i++) {
+        double difference = (double)embedding_one[i] - embedding_two[i];
+        sum += difference * difference;
+    }
+    return (float)sqrt(sum);
+}
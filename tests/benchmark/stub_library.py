@@ -0,0 +1,31 @@
+import os
+import pathlib
+import subprocess
+import tempfile
+
+STUB_SOURCE = pathlib.Path(__file__).parent.joinpath("stub", "tango_stub.c").resolve()
+
+
+def build_stub(output_dir: str = None) -> pathlib.Path:
+    """Compile the stand-in libtango and return its path. Rebuilt only when the source is newer."""
+    output_dir = pathlib.Path(output_dir or os.path.join(tempfile.gettempdir(), "tango_stub"))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    library = output_dir.joinpath("libtango_stub.so")
+    if not library.exists() or library.stat().st_mtime < STUB_SOURCE.stat().st_mtime:
+        compiler = os.environ.get("CC", "cc")
+        subprocess.run([compiler, "-shared", "-fPIC", "-O2", "-o", str(library), str(STUB_SOURCE), "-lm", "-lpthread"],
+                       check=True)
+    return library
+
+
+def use_stub(latency_us: int = 0, embedding_size: int = 128, busy: bool = False, output_dir: str = None) -> pathlib.Path:
+    """
+    Build the stub and point NativeMethods at it. Must run before the SDK loads its native library;
+    the settings are inherited by worker processes.
+    """
+    library = build_stub(output_dir)
+    os.environ["TANGO_LIBRARY_PATH"] = str(library)
+    os.environ["TANGO_STUB_LATENCY_US"] = str(latency_us)
+    os.environ["TANGO_STUB_EMBEDDING_SIZE"] = str(embedding_size)
+    os.environ["TANGO_STUB_BUSY"] = "1" if busy else "0"
+    return library
@@ -0,0 +1,48 @@
+"""
+Shared set-up of the unit tests.
+
+The tests run against the bundled libtango when it can be loaded, otherwise against the stand-in
+library of tests/benchmark/stub (a C compiler is required). Set TANGO_LIBRARY_PATH to force a library.
+"""
+import os
+import pathlib
+import shutil
+import sys
+
+import pytest
+
+TESTS_DIR = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(TESTS_DIR.parent.joinpath("src")))
+sys.path.insert(0, str(TESTS_DIR.joinpath("benchmark")))
+
+TEST_IMAGES_DIR = TESTS_DIR.joinpath("example", "test_images")
+
+
+def _select_native_library() -> str:
+    """Returns "libtango", "stub", "override" or None when no library can be used."""
+    if os.environ.get("TANGO_LIBRARY_PATH"):
+        return "override"
+    from tango_python_sdk.handler.nativeMethods import NativeMethods
+
+    try:
+        NativeMethods().load()
+        return "libtango"
+    except RuntimeError:
+        pass
+    if shutil.which(os.environ.get("CC", "cc")) is None:
+        return None
+    from stub_library import use_stub
+
+    use_stub()
+    return "stub"
+
+
+NATIVE_LIBRARY = _select_native_library()
+
+
+@pytest.fixture
+def native_library() -> str:
+    """Name of the native library in use; skips the test when there is none."""
+    if NATIVE_LIBRARY is None:
+        pytest.skip("libtango cannot be loaded and no C compiler is available to build the stub")
+    return NATIVE_LIBRARY
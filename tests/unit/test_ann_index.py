@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from tango_python_sdk.ann_index import IVFPQIndex
+from tango_python_sdk.helper import distance as distance_utils
+
+K = 10
+
+
+@pytest.fixture(scope="module")
+def data():
+    # Unit-length embeddings around latent identities; probes are perturbed gallery rows
+    rng = np.random.default_rng(0)
+    latent = rng.standard_normal((100, 32)).astype(np.float32)
+    embeddings = latent[rng.integers(0, 100, 3000)] + rng.standard_normal((3000, 32)).astype(np.float32) * 0.5
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = embeddings[rng.integers(0, 3000, 30)] + rng.standard_normal((30, 32)).astype(np.float32) * 0.02
+    return embeddings, queries
+
+
+def _build(embeddings, **kwargs):
+    index = IVFPQIndex(nlist=32, **kwargs)
+    index.train(embeddings, iterations=5)
+    # Two batches, so rows added later are regrouped with the earlier ones
+    index.add(range(2000), embeddings[:2000])
+    index.add(range(2000, 3000), embeddings[2000:])
+    return index
+
+
+def _recall(index, embeddings, queries, **kwargs):
+    hits = 0
+    for query in queries:
+        expected, _ = distance_utils.top_k(query, embeddings, K)
+        ids, distances = index.search(query, k=K, **kwargs)
+        # Distances are exact whatever the approximation
+        np.testing.assert_allclose(distances, distance_utils.get_distances(query, embeddings[ids.astype(np.int64)]), rtol=1e-6)
+        assert np.all(np.diff(distances) >= 0)
+        hits += len(set(expected.tolist()).intersection(ids.tolist()))
+    return hits / (K * len(queries))
+
+
+def test_flat_search_of_every_list_is_exact(data):
+    embeddings, queries = data
+    index = _build(embeddings)
+    assert len(index) == 3000
+    assert _recall(index, embeddings, queries, nprobe=32) == 1.0
+
+
+@pytest.mark.parametrize("pq_subvectors", [4, 8])
+def test_pq_recall(data, pq_subvectors):
+    embeddings, queries = data
+    index = _build(embeddings, pq_subvectors=pq_subvectors)
+    assert _recall(index, embeddings, queries, nprobe=8) >= 0.8
+    assert _recall(index, embeddings, queries, nprobe=32, rerank=3000) == 1.0
+
+
+def test_memory_mapped_store_gives_the_same_results(data, tmp_path):
+    embeddings, queries = data
+    in_memory = _build(embeddings, pq_subvectors=8)
+    mapped = _build(embeddings, pq_subvectors=8, rerank_store=str(tmp_path / "rerank.f32"))
+    assert isinstance(mapped._embeddings, np.memmap)
+    for query in queries[:10]:
+        ids, distances = in_memory.search(query, k=K)
+        mapped_ids, mapped_distances = mapped.search(query, k=K)
+        assert ids.tolist() == mapped_ids.tolist()
+        np.testing.assert_array_equal(distances, mapped_distances)
+
+
+def test_identify_applies_the_threshold(data):
+    embeddings, _ = data
+    index = _build(embeddings)
+    result = index.identify(embeddings[5], k=3, threshold=1e-3, nprobe=32)
+    assert result.status == 0 and result.ids == [5]
+    assert index.identify(embeddings[5], k=0).status == -1
@@ -0,0 +1,17 @@
+import asyncio
+
+from conftest import TEST_IMAGES_DIR
+from tango_python_sdk.async_factor import AsyncFaceFactor
+from tango_python_sdk.helper.pipeline import iter_image_paths
+
+IMAGE_PATHS = list(iter_image_paths(str(TEST_IMAGES_DIR)))[:2]
+
+
+def test_usable_from_several_event_loops(native_library):
+    async_face_factor = AsyncFaceFactor(max_workers=2, max_concurrency=1)
+    try:
+        for _ in range(2):
+            results = asyncio.run(async_face_factor.get_embeddings(IMAGE_PATHS + [42]))
+            assert [result.status for result in results] == [0, 0, -1]
+    finally:
+        async_face_factor.close()
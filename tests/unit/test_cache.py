@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from tango_python_sdk.helper.cache import EmbeddingCache
+
+
+def test_truncated_disk_entry_is_a_miss_and_removed(tmp_path):
+    cache = EmbeddingCache(directory=str(tmp_path), dimension=4)
+    key = EmbeddingCache.key_for_bytes(b"image")
+    cache.put(key, np.arange(4, dtype=np.float32))
+    path = cache._disk_path(key)
+    with open(path, "r+b") as file:
+        file.truncate(6)
+
+    reopened = EmbeddingCache(directory=str(tmp_path), dimension=4)
+    assert reopened.get(key) is None
+    assert not os.path.exists(path)
+    assert reopened.stats()["misses"] == 1
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a")[0] == 1.0
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == 1.0 and cache.get("c")[0] == 3.0
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 3, 1)
+
+
+def test_cached_embeddings_are_read_only():
+    cache = EmbeddingCache()
+    embedding = cache.put("a", np.ones(4))
+    assert embedding.dtype == np.float32 and not embedding.flags.writeable
+    assert cache.get("a") is embedding
+
+
+def test_disk_tier_serves_entries_evicted_from_memory_and_survives_restarts(tmp_path):
+    cache = EmbeddingCache(max_entries=1, directory=str(tmp_path))
+    cache.put("ba0", np.arange(4))
+    cache.put("bb0", np.arange(4) + 1)
+    np.testing.assert_array_equal(cache.get("ba0"), np.arange(4))
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["disk_writes"] == 2
+
+    reopened = EmbeddingCache(directory=str(tmp_path))
+    np.testing.assert_array_equal(reopened.get("bb0"), np.arange(4) + 1)
+    assert reopened.stats()["disk_hits"] == 1
+    assert not [name for _, _, names in os.walk(str(tmp_path)) for name in names if name.endswith(".tmp")]
+
+
+def test_disk_entries_of_another_model_are_not_served(native_library, tmp_path, monkeypatch):
+    from conftest import TEST_IMAGES_DIR
+    from tango_python_sdk.factor import FaceFactor
+    from tango_python_sdk.handler.nativeMethods import NativeMethods
+    from tango_python_sdk.helper.pipeline import iter_image_paths
+
+    path = next(iter_image_paths(str(TEST_IMAGES_DIR)))
+    face_factor = FaceFactor()
+    previous = face_factor.embedding_cache
+    try:
+        face_factor.embedding_cache = EmbeddingCache(directory=str(tmp_path))
+        assert face_factor.get_embedding(image_path=path).status == 0
+        assert face_factor.embedding_cache.stats()["disk_writes"] == 1
+
+        # A restart on the same model is served from disk
+        face_factor.embedding_cache = EmbeddingCache(directory=str(tmp_path))
+        assert face_factor.get_embedding(image_path=path).status == 0
+        assert face_factor.embedding_cache.stats()["disk_hits"] == 1
+
+        # After a library upgrade the old entry is not used
+        monkeypatch.setattr(NativeMethods, "_model_identity", "another model")
+        face_factor.embedding_cache = EmbeddingCache(directory=str(tmp_path))
+        assert face_factor.get_embedding(image_path=path).status == 0
+        assert face_factor.embedding_cache.stats()["disk_hits"] == 0
+        assert face_factor.embedding_cache.stats()["disk_writes"] == 1
+    finally:
+        face_factor.embedding_cache = previous
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from conftest import TEST_IMAGES_DIR
+from tango_python_sdk import cli
+from tango_python_sdk.helper.pipeline import iter_image_paths
+
+IMAGE_PATHS = list(iter_image_paths(str(TEST_IMAGES_DIR)))[:3]
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    # Ids with characters that str.splitlines would break at must survive the round trip
+    ids = ["plain", "line\u2028separator", "file\x1cseparator"]
+    path = tmp_path / "manifest.txt"
+    path.write_text("".join(f"{embedding_id}\t{image}\n" for embedding_id, image in zip(ids, IMAGE_PATHS)), encoding="utf-8")
+    return str(path), ids
+
+
+def test_embed_and_resume(native_library, manifest, tmp_path):
+    path, ids = manifest
+    output = str(tmp_path / "out")
+    assert cli.main([path, "-o", output, "--chunk-size", "2", "--quiet"]) == 0
+    loaded_ids, embeddings = cli.load_embeddings(output)
+    assert loaded_ids == ids and embeddings.shape[0] == 3
+
+    assert cli.main([path, "-o", output, "--quiet"]) == 0
+    again_ids, again = cli.load_embeddings(output)
+    assert again_ids == ids
+    np.testing.assert_array_equal(again, embeddings)
+
+
+def test_changed_max_side_does_not_resume(native_library, manifest, tmp_path):
+    path, _ = manifest
+    output = str(tmp_path / "out")
+    assert cli.main([path, "-o", output, "--max-side", "256", "--quiet"]) == 0
+    assert cli.main([path, "-o", output, "--quiet"]) == 2
+    assert cli.main([path, "-o", output, "--max-side", "512", "--quiet"]) == 2
+    assert cli.main([path, "-o", output, "--max-side", "256", "--quiet"]) == 0
+    assert cli.main([path, "-o", output, "--max-side", "512", "--restart", "--quiet"]) == 0
+
+
+def test_ids_with_line_breaks_are_rejected(tmp_path):
+    path = tmp_path / "manifest.txt"
+    path.write_bytes(b"a\rb\t" + IMAGE_PATHS[0].encode("utf-8") + b"\n")
+    assert cli.main([str(path), "-o", str(tmp_path / "out"), "--quiet"]) == 2
+    assert not (tmp_path / "out").exists()
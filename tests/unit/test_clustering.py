@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from conftest import TEST_IMAGES_DIR
+from tango_python_sdk.helper import distance as distance_utils
+from tango_python_sdk.helper.clustering import threshold_components
+from tango_python_sdk.helper.pipeline import iter_image_paths
+
+
+def _components(linked: np.ndarray) -> np.ndarray:
+    """Reference labelling of the graph given as a dense adjacency matrix, numbered by first appearance."""
+    labels = np.full(linked.shape[0], -1, dtype=np.int64)
+    label = 0
+    for start in range(linked.shape[0]):
+        if labels[start] >= 0:
+            continue
+        stack = [start]
+        labels[start] = label
+        while stack:
+            node = stack.pop()
+            for neighbour in np.flatnonzero(linked[node] & (labels < 0)):
+                labels[neighbour] = label
+                stack.append(neighbour)
+        label += 1
+    return labels
+
+
+@pytest.fixture
+def near_duplicates():
+    # Every row has one copy 0.021-0.024 away; distinct rows are far apart. In float32 the norm
+    # expansion cancels to noise at this scale.
+    rng = np.random.default_rng(0)
+    originals = (rng.normal(size=(64, 512)) * 10).astype(np.float32)
+    copies = originals + (rng.normal(size=originals.shape) * 1e-3).astype(np.float32)
+    return np.concatenate([originals, copies])
+
+
+def test_near_duplicates_are_linked_below_the_threshold(near_duplicates):
+    labels = threshold_components(near_duplicates, 0.05, row_block=17, column_block=23)
+    np.testing.assert_array_equal(labels[:64], np.arange(64))
+    np.testing.assert_array_equal(labels[64:], np.arange(64))
+
+
+def test_near_duplicates_are_not_linked_above_the_threshold(near_duplicates):
+    labels = threshold_components(near_duplicates, 0.01)
+    np.testing.assert_array_equal(labels, np.arange(128))
+
+
+@pytest.mark.parametrize("threshold", [0.01, 0.05, 0.3])
+def test_components_match_the_distance_matrix(near_duplicates, threshold):
+    embeddings = np.concatenate([near_duplicates, near_duplicates[:8] * 1.00001])
+    linked = distance_utils.get_distance_matrix(embeddings, embeddings) < threshold
+    np.testing.assert_array_equal(threshold_components(embeddings, threshold), _components(linked))
+
+
+def test_empty_input():
+    assert threshold_components(np.empty((0, 4), dtype=np.float32), 1.0).shape == (0,)
+
+
+def test_cluster_agrees_with_compare_all(native_library):
+    from tango_python_sdk.factor import FaceFactor
+    from tango_python_sdk.helper.utils import image_path_to_array
+
+    paths = list(iter_image_paths(str(TEST_IMAGES_DIR)))[:6]
+    # Decoded copies embed to the same values as their files, so they must join their clusters
+    images = paths + [image_path_to_array(paths[0], "rgb"), image_path_to_array(paths[3], "rgb"), "missing.jpg"]
+    face_factor = FaceFactor()
+
+    compared = face_factor.compare_all(images)
+    valid = compared.valid
+    assert valid.tolist() == [True] * 8 + [False]
+    distances = compared.distances[np.ix_(valid, valid)]
+    threshold = float(np.median(distances[np.triu_indices(8, 1)]))
+
+    clustered = face_factor.cluster(images, threshold=threshold)
+    assert clustered.labels[-1] == -1
+    np.testing.assert_array_equal(clustered.labels[valid], _components(distances < threshold))
+    assert clustered.labels[0] == clustered.labels[6] and clustered.labels[3] == clustered.labels[7]
@@ -0,0 +1,51 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import TEST_IMAGES_DIR
+from tango_python_sdk.helper.pipeline import iter_image_paths
+from tango_python_sdk.helper.utils import image_path_to_array
+
+IMAGE_PATHS = list(iter_image_paths(str(TEST_IMAGES_DIR)))
+
+
+@pytest.mark.parametrize("max_side", [None, 256])
+def test_decoded_images_are_writable(max_side):
+    for path in IMAGE_PATHS:
+        image = image_path_to_array(path, "rgb", max_side=max_side)
+        assert image.flags.writeable, path
+        image[0, 0] = 0
+
+
+def test_max_side_bounds_longest_side():
+    for path in IMAGE_PATHS:
+        image = image_path_to_array(path, "rgb", max_side=256)
+        assert max(image.shape[:2]) <= 256, path
+        assert image.dtype == np.uint8 and image.shape[2] == 3
+
+
+def test_max_side_keeps_compare_decisions(native_library):
+    if native_library != "libtango":
+        pytest.skip("Needs the real libtango: stub embeddings are a hash of the pixels, so any resize changes them")
+    from tango_python_sdk.factor import FaceFactor
+    from tango_python_sdk.factor_modules.FaceModule import Face
+    from tango_python_sdk.helper import distance as distance_utils
+
+    face_factor = FaceFactor()
+    previous = face_factor.decode_max_side
+    try:
+        face_factor.decode_max_side = None
+        full = face_factor.get_embeddings_batch(IMAGE_PATHS)
+        face_factor.decode_max_side = 1024
+        reduced = face_factor.get_embeddings_batch(IMAGE_PATHS)
+    finally:
+        face_factor.decode_max_side = previous
+
+    np.testing.assert_array_equal(full.valid, reduced.valid)
+    valid = full.valid
+    same_full = distance_utils.get_distance_matrix(full.embeddings[valid], full.embeddings[valid]) < Face.COMPARE_THRESHOLD
+    same_reduced = distance_utils.get_distance_matrix(reduced.embeddings[valid], reduced.embeddings[valid]) < Face.COMPARE_THRESHOLD
+    pairs = list(itertools.combinations(range(int(valid.sum())), 2))
+    disagreements = [pair for pair in pairs if same_full[pair] != same_reduced[pair]]
+    assert not disagreements
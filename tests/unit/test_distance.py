@@ -0,0 +1,27 @@
+import numpy as np
+
+from tango_python_sdk.helper import distance as distance_utils
+
+
+def test_distance_matrix_matches_direct_differences_for_near_identical_rows():
+    rng = np.random.default_rng(0)
+    embeddings = (rng.normal(size=(64, 512)) * 10).astype(np.float32)
+    nearby = embeddings + (rng.normal(size=embeddings.shape) * 1e-3).astype(np.float32)
+
+    matrix = distance_utils.get_distance_matrix(embeddings, nearby, block_size=7)
+
+    np.testing.assert_allclose(np.diag(matrix), distance_utils.get_pair_distances(embeddings, nearby), rtol=1e-5)
+    np.testing.assert_allclose(matrix[3], distance_utils.get_distances(embeddings[3], nearby), rtol=1e-5)
+
+
+def test_distance_matrix_tiles_match_direct_differences(monkeypatch):
+    # Small tiles force several row and column blocks, including ragged last ones
+    monkeypatch.setattr(distance_utils, "_MATRIX_BLOCK_ELEMENTS", 100)
+    rng = np.random.default_rng(1)
+    embeddings_a = rng.normal(size=(13, 16)).astype(np.float32)
+    embeddings_b = rng.normal(size=(29, 16)).astype(np.float32)
+
+    matrix = distance_utils.get_distance_matrix(embeddings_a, embeddings_b, block_size=5)
+
+    for row in range(13):
+        np.testing.assert_allclose(matrix[row], distance_utils.get_distances(embeddings_a[row], embeddings_b), rtol=1e-6)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from tango_python_sdk.handler import distance_backends
+from tango_python_sdk.helper import distance as distance_utils
+
+
+@pytest.fixture
+def pairs():
+    rng = np.random.default_rng(0)
+    return rng.random((50, 128), dtype=np.float32), rng.random((50, 128), dtype=np.float32)
+
+
+@pytest.fixture
+def native(native_library):
+    from tango_python_sdk.handler.nativeMethods import NativeMethods
+
+    return NativeMethods()
+
+
+@pytest.mark.parametrize("name", sorted(distance_backends.BACKENDS))
+def test_backends_agree_with_numpy(native, pairs, name):
+    backend = distance_backends.create_distance_backend(name, native)
+    embeddings_a, embeddings_b = pairs
+    reference = distance_utils.get_pair_distances(embeddings_a, embeddings_b)
+    np.testing.assert_allclose(backend.pair_distances(embeddings_a, embeddings_b), reference, rtol=1e-5)
+    assert backend.distance(embeddings_a[3], embeddings_b[3]) == pytest.approx(float(reference[3]), rel=1e-5)
+
+
+def test_unknown_backend_and_missing_library_handle_are_rejected():
+    with pytest.raises(ValueError):
+        distance_backends.create_distance_backend("gpu")
+    with pytest.raises(ValueError):
+        distance_backends.create_distance_backend(distance_backends.NATIVE)
+
+
+def test_select_fastest_backend_times_every_backend(native):
+    fastest, timings = distance_backends.select_fastest_backend(native, pairs=64, repeat=1)
+    assert set(timings) == set(distance_backends.BACKENDS)
+    assert timings[fastest] == min(timing for timing in timings.values() if timing is not None)
+
+
+def test_compare_many_accepts_every_pair_layout(native, pairs):
+    from tango_python_sdk.factor import FaceFactor
+    from tango_python_sdk.factor_modules.FaceModule import Face
+
+    face_factor = FaceFactor()
+    embeddings_a, embeddings_b = pairs
+    embeddings_b[:10] = embeddings_a[:10]
+    reference = distance_utils.get_pair_distances(embeddings_a, embeddings_b)
+    try:
+        for name in sorted(distance_backends.BACKENDS):
+            face_factor.set_distance_backend(name)
+            for layout in ((embeddings_a, embeddings_b), np.stack([embeddings_a, embeddings_b], axis=1),
+                           list(zip(embeddings_a, embeddings_b))):
+                result = face_factor.compare_many(layout)
+                assert result.status == 0
+                np.testing.assert_allclose(result.distances, reference, rtol=1e-5)
+                np.testing.assert_array_equal(result.is_similar, reference < Face.COMPARE_THRESHOLD)
+                assert result.is_similar[:10].all()
+    finally:
+        face_factor.set_distance_backend("numpy")
+    assert face_factor.compare_many(np.zeros((3, 4))).status == -1
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import numpy as np
+
+from tango_python_sdk.helper.frame_stream import FrameStream
+
+
+def _frames(count, size=64):
+    # Every frame differs clearly from the previous one
+    for index in range(count):
+        yield np.full((size, size, 3), (index * 40) % 256, dtype=np.uint8)
+
+
+def test_recording_is_sampled_on_its_own_timeline():
+    stream = FrameStream(_frames(30), lambda frame: int(frame[0, 0, 0]), target_fps=5, min_change=0, source_fps=30)
+    indices = [index for index, _ in stream]
+    assert indices == [0, 6, 12, 18, 24]
+    assert stream.stats.as_dict() == {"received": 30, "embedded": 5, "skipped_rate": 25,
+                                      "skipped_unchanged": 0, "dropped_stale": 0}
+
+
+def test_unchanged_frames_are_skipped():
+    still = np.zeros((64, 64, 3), dtype=np.uint8)
+    moved = still.copy()
+    moved[:, :32] = 255
+    frames = [still, still.copy(), still + 1, moved, moved.copy()]
+    stream = FrameStream(frames, lambda frame: None, min_change=2.0, source_fps=30)
+    assert [index for index, _ in stream] == [0, 3]
+    assert stream.stats.skipped_unchanged == 3
+
+
+def test_live_mode_drops_frames_that_arrive_during_inference():
+    def camera():
+        for frame in _frames(200):
+            time.sleep(0.001)
+            yield frame
+
+    def slow_embed(frame):
+        time.sleep(0.01)
+        return frame
+
+    stream = FrameStream(camera(), slow_embed, min_change=0)
+    embedded = [index for index, _ in stream]
+    stats = stream.stats
+    assert stats.received == 200 and stats.dropped_stale > 0
+    assert stats.embedded == len(embedded) == 200 - stats.dropped_stale
+    assert embedded == sorted(embedded)
+
+
+def test_close_stops_the_reader():
+    def endless():
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        while True:
+            frame = 255 - frame
+            yield frame
+
+    before = threading.active_count()
+    with FrameStream(endless(), lambda frame: None, min_change=0) as stream:
+        for _, (index, _) in zip(range(3), stream):
+            pass
+    deadline = time.monotonic() + 5
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == before
+
+
+def test_embed_frames_returns_embeddings(native_library):
+    from tango_python_sdk.factor import FaceFactor
+
+    face_factor = FaceFactor()
+    results = list(face_factor.embed_frames(_frames(6), source_fps=30))
+    assert [index for index, _ in results] == list(range(6))
+    assert all(result.status == 0 for _, result in results)
+    second = list(_frames(2))[1]
+    np.testing.assert_array_equal(results[1][1].embedding, face_factor.get_embedding(image_data=second).embedding)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from tango_python_sdk.gallery import FaceGallery
+
+
+def _embeddings(count, dimension=8):
+    return np.random.default_rng(count).normal(size=(count, dimension)).astype(np.float32)
+
+
+def _check_rows(gallery, expected):
+    """Every id maps to the row holding its embedding, and `expected` is the id -> embedding truth."""
+    assert len(gallery) == len(expected)
+    assert sorted(gallery.ids.tolist()) == sorted(expected)
+    for row, embedding_id in enumerate(gallery.ids):
+        np.testing.assert_array_equal(gallery.embeddings[row], expected[embedding_id])
+        np.testing.assert_array_equal(gallery.get(embedding_id), expected[embedding_id])
+
+
+def test_remove_swaps_last_row_into_the_hole():
+    embeddings = _embeddings(5)
+    gallery = FaceGallery(initial_capacity=2)
+    gallery.enroll_many(["a", "b", "c", "d", "e"], embeddings)
+    expected = dict(zip("abcde", embeddings))
+
+    gallery.remove("b")
+    del expected["b"]
+    assert gallery.ids.tolist() == ["a", "e", "c", "d"]
+    _check_rows(gallery, expected)
+
+    gallery.remove("d")
+    del expected["d"]
+    assert gallery.ids.tolist() == ["a", "e", "c"]
+    _check_rows(gallery, expected)
+
+    with pytest.raises(KeyError):
+        gallery.remove("b")
+
+
+def test_reenroll_after_remove_and_identify_follow_the_moved_row():
+    embeddings = _embeddings(4)
+    gallery = FaceGallery()
+    gallery.enroll_many(["a", "b", "c", "d"], embeddings)
+    gallery.remove("a")
+    gallery.enroll("b", embeddings[0])
+    gallery.enroll("a", embeddings[1])
+    expected = {"a": embeddings[1], "b": embeddings[0], "c": embeddings[2], "d": embeddings[3]}
+    _check_rows(gallery, expected)
+
+    result = gallery.identify(embeddings[3], k=1, threshold=1e-3)
+    assert result.status == 0 and result.ids == ["d"]
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_quantized_storage_keeps_the_nearest_match(storage):
+    embeddings = _embeddings(50, dimension=32)
+    gallery = FaceGallery(storage=storage)
+    gallery.enroll_many(range(50), embeddings)
+    gallery.remove(7)
+    for row in (0, 12, 49):
+        result = gallery.identify(embeddings[row], k=1, threshold=10.0)
+        assert result.status == 0 and result.ids == [row]
+    assert gallery.identify(embeddings[0], k=0).status == -1
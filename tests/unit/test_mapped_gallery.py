@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+
+from tango_python_sdk.mapped_gallery import JOURNAL_FILE, MappedFaceGallery
+
+
+def _embeddings(count, dimension=8):
+    return np.random.default_rng(count).normal(size=(count, dimension)).astype(np.float32)
+
+
+def test_journal_replay_ignores_a_torn_final_record(tmp_path):
+    path = str(tmp_path / "gallery")
+    embeddings = _embeddings(4)
+    gallery = MappedFaceGallery.create(path, 8, ["a", "b"], embeddings[:2])
+    gallery.enroll("c", embeddings[2])
+    gallery.remove("a")
+    gallery.close()
+    journal_path = os.path.join(path, JOURNAL_FILE)
+    intact_size = os.path.getsize(journal_path)
+
+    # A crash in the middle of the next append leaves a partial record behind
+    with open(journal_path, "ab") as fp:
+        fp.write(b"\x01\x01\x00\x00\x00d\x00\x00")
+
+    with MappedFaceGallery(path) as reader:
+        assert len(reader) == 2
+        assert "a" not in reader and "b" in reader and "c" in reader
+        assert reader.identify(embeddings[2], threshold=1e-3).ids == ["c"]
+
+    with MappedFaceGallery(path, mode="a") as writer:
+        assert os.path.getsize(journal_path) == intact_size
+        writer.enroll("d", embeddings[3])
+
+    with MappedFaceGallery(path) as reader:
+        assert len(reader) == 3
+        assert reader.identify(embeddings[3], threshold=1e-3).ids == ["d"]
+
+
+def test_mapped_identify_rejects_k_below_one(tmp_path):
+    embeddings = _embeddings(2)
+    with MappedFaceGallery.create(str(tmp_path / "gallery"), 8, ["a", "b"], embeddings) as gallery:
+        assert gallery.identify(embeddings[0], k=0).status == -1
+        assert gallery.identify(embeddings[0], k=1).ids == ["a"]
+
+
+def test_saved_gallery_survives_compaction(tmp_path):
+    from tango_python_sdk.gallery import FaceGallery
+
+    path = str(tmp_path / "gallery")
+    embeddings = _embeddings(6)
+    gallery = FaceGallery()
+    gallery.enroll_many(["a", "b", "c", "d"], embeddings[:4])
+    gallery.save(path).close()
+
+    with MappedFaceGallery(path, mode="a") as mapped:
+        mapped.remove("b")
+        mapped.enroll("e", embeddings[4])
+        mapped.enroll("a", embeddings[5])
+        mapped.compact()
+        assert os.path.getsize(os.path.join(path, JOURNAL_FILE)) == 16
+    with MappedFaceGallery(path) as reopened:
+        assert len(reopened) == 4 and "b" not in reopened
+        for embedding_id, row in (("a", 5), ("c", 2), ("d", 3), ("e", 4)):
+            assert reopened.identify(embeddings[row], threshold=1e-3).ids == [embedding_id]
@@ -0,0 +1,34 @@
+import threading
+
+from tango_python_sdk.helper.metrics import MetricsRegistry
+
+
+def test_hooks_can_be_added_while_recording():
+    registry = MetricsRegistry()
+    stop = threading.Event()
+    errors = []
+
+    def record():
+        try:
+            while not stop.is_set():
+                registry.observe("decode", 0.001)
+                registry.count_outcome("get_embedding", 0)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=record) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    calls = []
+    for _ in range(200):
+        registry.add_duration_hook(lambda stage, seconds: calls.append(stage))
+        registry.add_outcome_hook(lambda operation, code: calls.append(operation))
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    calls.clear()
+    registry.observe("decode", 0.001)
+    registry.count_outcome("get_embedding", 0)
+    assert calls.count("decode") == 200 and calls.count("get_embedding") == 200
@@ -0,0 +1,55 @@
+import threading
+import time
+
+import numpy as np
+
+from conftest import TEST_IMAGES_DIR
+from tango_python_sdk.helper.pipeline import iter_image_paths, run_stages
+
+
+def test_results_and_errors_are_yielded():
+    def check(value):
+        if value == 3:
+            raise ValueError("three")
+        return value * 10
+
+    results = dict(run_stages(((i, i) for i in range(6)), [(check, 2), (str, 1)], queue_size=2,
+                              on_error=lambda key, error: repr(error)))
+    assert results == {0: "0", 1: "10", 2: "20", 3: "ValueError('three')", 4: "40", 5: "50"}
+
+
+def test_early_close_stops_every_worker():
+    consumed = []
+
+    def source():
+        for i in range(10000):
+            consumed.append(i)
+            yield i, i
+
+    def slow(value):
+        time.sleep(0.001)
+        return value
+
+    before = threading.active_count()
+    stream = run_stages(source(), [(slow, 3), (slow, 2)], queue_size=4, on_error=lambda key, error: None)
+    for _ in range(5):
+        next(stream)
+    stream.close()
+
+    assert threading.active_count() == before
+    # Bounded queues keep the feeder from running ahead of the consumer
+    assert len(consumed) < 100
+
+
+def test_embed_stream_matches_get_embedding(native_library):
+    from tango_python_sdk.factor import FaceFactor
+
+    paths = list(iter_image_paths(str(TEST_IMAGES_DIR)))[:4]
+    face_factor = FaceFactor()
+    results = dict(face_factor.embed_stream(paths + ["missing.jpg"], decode_workers=2, inference_workers=2, queue_size=2))
+
+    assert sorted(results) == sorted(paths + ["missing.jpg"])
+    assert results["missing.jpg"].status == -1
+    for path in paths:
+        assert results[path].status == 0
+        np.testing.assert_array_equal(results[path].embedding, face_factor.get_embedding(image_path=path).embedding)
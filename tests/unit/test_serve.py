@@ -0,0 +1,113 @@
+import base64
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from tango_python_sdk.gallery import FaceGallery
+from tango_python_sdk.helper.result_objects.GetEmbeddingResult import GetEmbeddingResult
+from tango_python_sdk.serve import EndpointConfig, InferenceServer
+
+
+class FakeFactor:
+    """Embeds an image as its first four bytes; blocks while `gate` is cleared."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def get_embeddings(self, images, max_workers=None):
+        self.gate.wait()
+        return [GetEmbeddingResult(np.frombuffer(image[:4].ljust(4, b"\0"), dtype=np.uint8).astype(np.float32), 0)
+                for image in images]
+
+
+@pytest.fixture(scope="module")
+def server():
+    gallery = FaceGallery()
+    gallery.enroll("a", np.array([1, 2, 3, 4], dtype=np.float32))
+    gallery.enroll("b", np.array([9, 9, 9, 9], dtype=np.float32))
+    server = InferenceServer(FakeFactor(), gallery=gallery, port=0, window=0.001,
+                             endpoints={"embedding": EndpointConfig(max_pending=1, timeout=0.2)})
+    with server:
+        yield server
+
+
+def request(server, method, path, body=b"", headers=None):
+    connection = http.client.HTTPConnection(*server.address, timeout=5)
+    try:
+        connection.putrequest(method, path)
+        headers = dict(headers or {})
+        headers.setdefault("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders(body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def post_json(server, path, payload):
+    return request(server, "POST", path, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"})
+
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def test_embedding_and_identify(server):
+    status, response = request(server, "POST", "/v1/embedding", bytes([1, 2, 3, 4]))
+    assert status == 200 and response["embedding"] == [1, 2, 3, 4]
+    status, response = post_json(server, "/v1/identify", {"image": b64(bytes([9, 9, 9, 8])), "k": 2, "threshold": 100})
+    assert status == 200 and response["ids"] == ["b", "a"]
+    status, response = post_json(server, "/v1/identify", {"embedding": [1, 2, 3, 4], "threshold": 0.5})
+    assert status == 200 and response["ids"] == ["a"]
+
+
+@pytest.mark.parametrize("path, payload", [
+    ("/v1/identify", {"embedding": [1, 2, 3, 4], "k": True}),
+    ("/v1/identify", {"embedding": [1, 2, 3, 4], "k": 0}),
+    ("/v1/identify", {"embedding": [1, 2, 3, 4], "k": 1.5}),
+    ("/v1/identify", {"embedding": [1, 2, 3, 4], "threshold": False}),
+    ("/v1/identify", {"embedding": [1, 2, 3, 4], "threshold": "0.5"}),
+    ("/v1/identify", {"embedding": [[1, 2], [3, 4]]}),
+    ("/v1/identify", {"embedding": ["x"]}),
+    ("/v1/identify", {"image": "not base64!"}),
+    ("/v1/identify", [1, 2]),
+    ("/v1/compare", {"image_1": b64(b"abcd")}),
+    ("/v1/embedding", {"image": 5}),
+])
+def test_malformed_payloads_are_rejected(server, path, payload):
+    status, response = post_json(server, path, payload)
+    assert status == 400 and response["status"] == -1
+
+
+def test_malformed_bodies_are_rejected(server, monkeypatch):
+    assert request(server, "POST", "/v1/compare", b"{not json", {"Content-Type": "application/json"})[0] == 400
+    assert request(server, "POST", "/v1/embedding", b"")[0] == 400
+    assert request(server, "POST", "/v1/embedding", b"", {"Content-Length": "abc"})[0] == 400
+    # A negative length must be refused, not read until the client hangs up
+    assert request(server, "POST", "/v1/embedding", b"", {"Content-Length": "-1"})[0] == 400
+    monkeypatch.setattr(server, "max_body_bytes", 8)
+    assert request(server, "POST", "/v1/embedding", b"x" * 9)[0] == 400
+
+
+def test_unknown_paths_and_missing_gallery(server, monkeypatch):
+    assert request(server, "GET", "/v2/health")[0] == 404
+    assert request(server, "POST", "/v1/unknown", b"{}")[0] == 404
+    monkeypatch.setattr(server, "gallery", None)
+    assert post_json(server, "/v1/identify", {"embedding": [1, 2, 3, 4]})[0] == 404
+    assert request(server, "GET", "/health") == (200, {"status": 0, "message": "OK"})
+
+
+def test_full_endpoint_answers_503_and_slow_request_504(server):
+    server.face_factor.gate.clear()
+    try:
+        assert request(server, "POST", "/v1/embedding", b"abcd")[0] == 504
+        # The timed-out request keeps its admission slot until its batch is done with it
+        assert request(server, "POST", "/v1/embedding", b"abcd")[0] == 503
+    finally:
+        server.face_factor.gate.set()
@@ -0,0 +1,101 @@
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from tango_python_sdk.gallery import FaceGallery
+from tango_python_sdk.mapped_gallery import MappedFaceGallery
+from tango_python_sdk.sharded_gallery import LocalShard, ProcessShard, ShardedGallery, ShardError, split_gallery
+
+DIMENSION = 16
+THRESHOLD = 100.0
+
+
+@pytest.fixture(scope="module")
+def enrolled():
+    rng = np.random.default_rng(0)
+    ids = [f"person-{index}" for index in range(300)]
+    return ids, rng.standard_normal((len(ids), DIMENSION)).astype(np.float32)
+
+
+def _gallery(ids, embeddings):
+    gallery = FaceGallery()
+    gallery.enroll_many(ids, embeddings)
+    return gallery
+
+
+def _in_memory_shards(ids, embeddings, count):
+    assignment = [zlib.crc32(embedding_id.encode("utf-8")) % count for embedding_id in ids]
+    return [_gallery([embedding_id for embedding_id, shard in zip(ids, assignment) if shard == index],
+                     embeddings[[shard == index for shard in assignment]]) for index in range(count)]
+
+
+class FailingShard:
+    def search(self, embedding, k, threshold, timeout=None):
+        raise ShardError("offline")
+
+    def close(self):
+        pass
+
+
+class StalledShard(FailingShard):
+    def __init__(self):
+        self.release = threading.Event()
+
+    def search(self, embedding, k, threshold, timeout=None):
+        self.release.wait()
+        return [], np.empty(0, dtype=np.float32)
+
+    def close(self):
+        self.release.set()
+
+
+def test_merge_matches_a_single_gallery(enrolled, tmp_path):
+    ids, embeddings = enrolled
+    reference = _gallery(ids, embeddings)
+    probes = embeddings[:20] + 0.3 * np.random.default_rng(1).standard_normal((20, DIMENSION)).astype(np.float32)
+    mapped = [MappedFaceGallery(path) for path in split_gallery(str(tmp_path), 3, ids, embeddings)]
+    try:
+        for shards in (_in_memory_shards(ids, embeddings, 4), mapped):
+            with ShardedGallery([LocalShard(shard) for shard in shards]) as sharded:
+                for probe in probes:
+                    expected = reference.identify(probe, k=10, threshold=THRESHOLD)
+                    result = sharded.identify(probe, k=10, threshold=THRESHOLD)
+                    assert result.status == 0 and not result.partial and result.failed_shards == []
+                    assert list(result.ids) == list(expected.ids)
+                    np.testing.assert_allclose(result.distances, expected.distances, rtol=1e-5)
+    finally:
+        for gallery in mapped:
+            gallery.close()
+
+
+def test_failed_and_slow_shards_make_the_result_partial(enrolled):
+    ids, embeddings = enrolled
+    shards = _in_memory_shards(ids, embeddings, 2)
+    stalled = StalledShard()
+    with ShardedGallery([shards[0], FailingShard(), stalled, shards[1]], timeout=0.2) as sharded:
+        result = sharded.identify(embeddings[0], k=3, threshold=THRESHOLD)
+        assert result.status == 0 and result.partial and result.failed_shards == [1, 2]
+        assert result.ids[0] == ids[0]
+
+
+def test_no_shard_answering_is_an_error(enrolled):
+    ids, embeddings = enrolled
+    with ShardedGallery([FailingShard(), FailingShard()]) as sharded:
+        result = sharded.identify(embeddings[0])
+        assert result.status == -1 and result.partial and result.failed_shards == [0, 1]
+        assert sharded.identify(embeddings[0], k=0).status == -1
+
+
+def test_process_shard_restarts_its_worker(enrolled, tmp_path):
+    ids, embeddings = enrolled
+    path, = split_gallery(str(tmp_path), 1, ids, embeddings)
+    shard = ProcessShard(path, start_method="fork")
+    try:
+        assert shard.search(embeddings[5], 1, THRESHOLD, timeout=10)[0] == [ids[5]]
+        shard._process.kill()
+        shard._process.join()
+        assert shard.search(embeddings[7], 1, THRESHOLD, timeout=10)[0] == [ids[7]]
+    finally:
+        shard.close()
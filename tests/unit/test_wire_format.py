@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from tango_python_sdk.helper import wire_format
+from tango_python_sdk.helper.wire_format import HEADER_SIZE, WireFormatError
+
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).normal(size=(5, 16)).astype(np.float32)
+
+
+@pytest.mark.parametrize("scheme", ["float32", "float16", "int8"])
+def test_round_trip(embeddings, scheme):
+    data = wire_format.encode_embeddings(embeddings, scheme=scheme, checksum=True)
+    assert len(data) == wire_format.encoded_size(5, 16, scheme)
+    decoded = wire_format.decode_embeddings(data)
+    assert decoded.shape == (5, 16) and decoded.dtype == np.float32
+    if scheme == "float32":
+        np.testing.assert_array_equal(decoded, embeddings)
+    else:
+        np.testing.assert_allclose(decoded, embeddings, atol=0.05)
+
+
+def test_round_trip_of_a_single_and_of_no_embedding(embeddings):
+    single = wire_format.decode_embeddings(wire_format.encode_embeddings(embeddings[0]))
+    np.testing.assert_array_equal(single, embeddings[:1])
+    empty = wire_format.decode_embeddings(wire_format.encode_embeddings(embeddings[:0]))
+    assert empty.shape == (0, 16)
+
+
+def _corrupt(data, offset, value):
+    data = bytearray(data)
+    data[offset] = value
+    return bytes(data)
+
+
+@pytest.mark.parametrize("offset, value, message", [
+    (0, ord("X"), "bad magic"),
+    (4, 2, "version"),
+    (5, 9, "scheme"),
+    (8, 6, "needs"),
+    (12, 17, "needs"),
+])
+def test_corrupt_header_is_rejected(embeddings, offset, value, message):
+    data = _corrupt(wire_format.encode_embeddings(embeddings), offset, value)
+    with pytest.raises(WireFormatError, match=message):
+        wire_format.read_embeddings(data)
+
+
+def test_truncated_and_padded_buffers_are_rejected(embeddings):
+    data = wire_format.encode_embeddings(embeddings)
+    for buffer in (data[:HEADER_SIZE - 1], data[:-1], data + b"\x00"):
+        with pytest.raises(WireFormatError):
+            wire_format.read_embeddings(buffer)
+
+
+def test_checksum_detects_payload_corruption(embeddings):
+    data = wire_format.encode_embeddings(embeddings, checksum=True)
+    corrupted = _corrupt(data, HEADER_SIZE + 3, data[HEADER_SIZE + 3] ^ 0xFF)
+    with pytest.raises(WireFormatError, match="Checksum"):
+        wire_format.read_embeddings(corrupted)
+    wire_format.read_embeddings(corrupted, verify=False)